@@ -10,7 +10,11 @@ from models.base import Base
 from models.log import Log
 from models.users import User
 from models.catalog_items import CatalogItem
+from models.catalog_duplicates import CatalogDuplicateBucket
+from models.listing_versions import ListingVersion
 from models.user_generations import UserGeneration
+from models.catalog_load_jobs import CatalogLoadJob
+from models.sima_land_payloads import SimaLandPayload, SimaLandPage
 from config import Config
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,56 @@
+"""add_user_generations_search
+
+Revision ID: a7c9e1f3b5d6
+Revises: f6b8d3e0a2c4
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from models.user_generations import POSTGRES_SEARCH_DDL, SQLITE_SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c9e1f3b5d6'
+down_revision: Union[str, Sequence[str], None] = 'f6b8d3e0a2c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for statement in POSTGRES_SEARCH_DDL:
+            op.execute(statement)
+        # Триггер заполняет search_vector существующих генераций
+        op.execute("UPDATE user_generations SET catalog_item_id = catalog_item_id")
+    elif dialect == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        op.execute(
+            "INSERT INTO user_generations_fts(rowid, owner, name, ai_keywords, ai_description) "
+            "SELECT g.id, 'u' || g.user_id, c.name, g.ai_keywords, g.ai_description "
+            "FROM user_generations g LEFT JOIN catalog_items c ON c.id = g.catalog_item_id"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS user_generations_catalog_name_au ON catalog_items")
+        op.execute("DROP TRIGGER IF EXISTS user_generations_search_vector_biu ON user_generations")
+        op.execute("DROP FUNCTION IF EXISTS user_generations_catalog_name()")
+        op.execute("DROP FUNCTION IF EXISTS user_generations_search_vector()")
+        op.execute("DROP INDEX IF EXISTS ix_user_generations_search")
+        op.execute("ALTER TABLE user_generations DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        for trigger in (
+            'user_generations_fts_ai', 'user_generations_fts_ad',
+            'user_generations_fts_au', 'user_generations_fts_name_au',
+        ):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS user_generations_fts")
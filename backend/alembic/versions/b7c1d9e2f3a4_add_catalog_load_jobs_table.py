@@ -0,0 +1,51 @@
+"""add_catalog_load_jobs_table
+
+Revision ID: b7c1d9e2f3a4
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c1d9e2f3a4'
+down_revision: Union[str, Sequence[str], None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'catalog_load_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('requested_count', sa.Integer(), nullable=False),
+        sa.Column('last_page', sa.Integer(), nullable=False),
+        sa.Column('processed_count', sa.Integer(), nullable=False),
+        sa.Column('inserted_count', sa.Integer(), nullable=False),
+        sa.Column('skipped_count', sa.Integer(), nullable=False),
+        sa.Column('error_count', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_catalog_load_jobs_id'), 'catalog_load_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_catalog_load_jobs_user_id'), 'catalog_load_jobs', ['user_id'], unique=False)
+    op.create_index(op.f('ix_catalog_load_jobs_status'), 'catalog_load_jobs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_catalog_load_jobs_status'), table_name='catalog_load_jobs')
+    op.drop_index(op.f('ix_catalog_load_jobs_user_id'), table_name='catalog_load_jobs')
+    op.drop_index(op.f('ix_catalog_load_jobs_id'), table_name='catalog_load_jobs')
+    op.drop_table('catalog_load_jobs')
@@ -0,0 +1,37 @@
+"""add_catalog_browse_indexes
+
+Revision ID: b8d0f2a4c6e8
+Revises: a7c9e1f3b5d6
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d0f2a4c6e8'
+down_revision: Union[str, Sequence[str], None] = 'a7c9e1f3b5d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_catalog_items_category_price', 'catalog_items', ['category_id', 'price'])
+    op.create_index('ix_catalog_items_stuff_price', 'catalog_items', ['stuff', 'price'])
+    op.create_index(
+        'ix_catalog_items_in_stock_category_price', 'catalog_items', ['category_id', 'price'],
+        sqlite_where=sa.text('balance > 0'), postgresql_where=sa.text('balance > 0'),
+    )
+    op.create_index('ix_catalog_items_price', 'catalog_items', ['price'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_catalog_items_price', table_name='catalog_items')
+    op.drop_index('ix_catalog_items_in_stock_category_price', table_name='catalog_items')
+    op.drop_index('ix_catalog_items_stuff_price', table_name='catalog_items')
+    op.drop_index('ix_catalog_items_category_price', table_name='catalog_items')
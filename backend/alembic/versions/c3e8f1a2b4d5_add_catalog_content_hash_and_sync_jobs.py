@@ -0,0 +1,45 @@
+"""add_catalog_content_hash_and_sync_jobs
+
+Revision ID: c3e8f1a2b4d5
+Revises: b7c1d9e2f3a4
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8f1a2b4d5'
+down_revision: Union[str, Sequence[str], None] = 'b7c1d9e2f3a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Хеш содержимого товара; у существующих строк NULL — первая синхронизация их заполнит
+    with op.batch_alter_table('catalog_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=32), nullable=True))
+
+    with op.batch_alter_table('catalog_load_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('mode', sa.String(length=20), nullable=False, server_default='load'))
+        batch_op.add_column(sa.Column('write_budget', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('updated_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('unchanged_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('deferred_count', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('catalog_load_jobs', schema=None) as batch_op:
+        batch_op.drop_column('deferred_count')
+        batch_op.drop_column('unchanged_count')
+        batch_op.drop_column('updated_count')
+        batch_op.drop_column('write_budget')
+        batch_op.drop_column('mode')
+
+    with op.batch_alter_table('catalog_items', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,47 @@
+"""add_catalog_duplicate_groups
+
+Revision ID: c9e1a3b5d7f0
+Revises: b8d0f2a4c6e8
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e1a3b5d7f0'
+down_revision: Union[str, Sequence[str], None] = 'b8d0f2a4c6e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Существующие товары получат группы при пересчёте (POST /sima-land/duplicates/rebuild)
+    with op.batch_alter_table('catalog_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('duplicate_group_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_catalog_items_duplicate_group_id'), ['duplicate_group_id'], unique=False)
+
+    op.create_table(
+        'catalog_duplicate_buckets',
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.Column('catalog_item_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['catalog_item_id'], ['catalog_items.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('bucket', 'catalog_item_id')
+    )
+    op.create_index(
+        op.f('ix_catalog_duplicate_buckets_catalog_item_id'), 'catalog_duplicate_buckets', ['catalog_item_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_catalog_duplicate_buckets_catalog_item_id'), table_name='catalog_duplicate_buckets')
+    op.drop_table('catalog_duplicate_buckets')
+    with op.batch_alter_table('catalog_items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_catalog_items_duplicate_group_id'))
+        batch_op.drop_column('duplicate_group_id')
@@ -0,0 +1,34 @@
+"""add_listing_versions
+
+Revision ID: d0f2b4c6e8a1
+Revises: c9e1a3b5d7f0
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0f2b4c6e8a1'
+down_revision: Union[str, Sequence[str], None] = 'c9e1a3b5d7f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Строки версий создаются первой записью; до неё версия считается нулевой
+    op.create_table(
+        'listing_versions',
+        sa.Column('scope', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('scope')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('listing_versions')
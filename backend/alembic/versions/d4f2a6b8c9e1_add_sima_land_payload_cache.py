@@ -0,0 +1,59 @@
+"""add_sima_land_payload_cache
+
+Revision ID: d4f2a6b8c9e1
+Revises: c3e8f1a2b4d5
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f2a6b8c9e1'
+down_revision: Union[str, Sequence[str], None] = 'c3e8f1a2b4d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sima_land_payloads',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sima_land_payloads_id'), 'sima_land_payloads', ['id'], unique=False)
+    op.create_index(op.f('ix_sima_land_payloads_sha256'), 'sima_land_payloads', ['sha256'], unique=True)
+
+    op.create_table(
+        'sima_land_pages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('page_number', sa.Integer(), nullable=False),
+        sa.Column('payload_hash', sa.String(length=64), nullable=False),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sima_land_pages_id'), 'sima_land_pages', ['id'], unique=False)
+    op.create_index(op.f('ix_sima_land_pages_page_number'), 'sima_land_pages', ['page_number'], unique=True)
+    op.create_index(op.f('ix_sima_land_pages_payload_hash'), 'sima_land_pages', ['payload_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_sima_land_pages_payload_hash'), table_name='sima_land_pages')
+    op.drop_index(op.f('ix_sima_land_pages_page_number'), table_name='sima_land_pages')
+    op.drop_index(op.f('ix_sima_land_pages_id'), table_name='sima_land_pages')
+    op.drop_table('sima_land_pages')
+    op.drop_index(op.f('ix_sima_land_payloads_sha256'), table_name='sima_land_payloads')
+    op.drop_index(op.f('ix_sima_land_payloads_id'), table_name='sima_land_payloads')
+    op.drop_table('sima_land_payloads')
@@ -0,0 +1,44 @@
+"""add_catalog_full_text_search
+
+Revision ID: e5a7c2d9f1b3
+Revises: d4f2a6b8c9e1
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from models.catalog_items import POSTGRES_SEARCH_DDL, SQLITE_SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c2d9f1b3'
+down_revision: Union[str, Sequence[str], None] = 'd4f2a6b8c9e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for statement in POSTGRES_SEARCH_DDL:
+            op.execute(statement)
+    elif dialect == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        # Индексируем уже загруженный каталог
+        op.execute("INSERT INTO catalog_items_fts(catalog_items_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_catalog_items_search_vector")
+        op.execute("ALTER TABLE catalog_items DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        for trigger in ('catalog_items_fts_ai', 'catalog_items_fts_ad', 'catalog_items_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS catalog_items_fts")
@@ -0,0 +1,45 @@
+"""add_catalog_trigram_search
+
+Revision ID: f6b8d3e0a2c4
+Revises: e5a7c2d9f1b3
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from models.catalog_items import POSTGRES_TRIGRAM_DDL, SQLITE_TRIGRAM_DDL, TRIGRAM_COLUMNS
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b8d3e0a2c4'
+down_revision: Union[str, Sequence[str], None] = 'e5a7c2d9f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for statement in POSTGRES_TRIGRAM_DDL:
+            op.execute(statement)
+    elif dialect == 'sqlite':
+        for statement in SQLITE_TRIGRAM_DDL:
+            op.execute(statement)
+        # Индексируем уже загруженный каталог
+        op.execute("INSERT INTO catalog_items_trgm(catalog_items_trgm) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Расширение pg_trgm не удаляем: им могут пользоваться другие объекты
+        for column in TRIGRAM_COLUMNS:
+            op.execute(f"DROP INDEX IF EXISTS ix_catalog_items_{column}_trgm")
+    elif dialect == 'sqlite':
+        for trigger in ('catalog_items_trgm_ai', 'catalog_items_trgm_ad', 'catalog_items_trgm_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS catalog_items_trgm")
@@ -0,0 +1,64 @@
+"""
+Задержка подсчёта фасетов просмотра каталога (`CatalogFacetIndex.facets`)
+и память индекса на синтетическом каталоге: категории и материалы с
+неравномерной частотой, логнормальные цены, часть товаров не в наличии.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_facets --items 1000000
+"""
+import argparse
+import time
+from typing import Optional
+
+import numpy as np
+
+from services.catalog_events import CatalogChange
+from services.catalog_facets import BrowseFilters, CatalogFacetIndex
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--categories", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    categories = (rng.zipf(1.3, args.items) % args.categories).tolist()
+    stuffs = (rng.zipf(1.5, args.items) % 200).tolist()
+    prices = np.round(rng.lognormal(6.5, 1.2, args.items), 2).tolist()
+    balances = rng.integers(-3, 50, args.items).tolist()
+
+    index = CatalogFacetIndex()
+    started = time.perf_counter()
+    index.upsert(
+        CatalogChange(item_id, "", "", balances[item_id - 1], f"cat-{categories[item_id - 1]}",
+                      prices[item_id - 1], f"stuff-{stuffs[item_id - 1]}")
+        for item_id in range(1, args.items + 1)
+    )
+    print(f"build: {args.items} items in {time.perf_counter() - started:.1f}s")
+
+    cases = {
+        "no filters": lambda: BrowseFilters(),
+        "in stock": lambda: BrowseFilters(in_stock=True),
+        "category + in stock": lambda: BrowseFilters(category_id=f"cat-{rng.integers(1, 50)}", in_stock=True),
+        "all filters": lambda: BrowseFilters(
+            category_id=f"cat-{rng.integers(1, 50)}", stuff=f"stuff-{rng.integers(1, 10)}",
+            price_min=300, price_max=3000, in_stock=True,
+        ),
+    }
+    for name, make_filters in cases.items():
+        samples = []
+        for _ in range(args.queries):
+            filters = make_filters()
+            started = time.perf_counter()
+            index.facets(filters)
+            samples.append((time.perf_counter() - started) * 1000)
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        print(f"facets ({name}): p50 {p50:.1f} ms  p95 {p95:.1f} ms  p99 {p99:.1f} ms")
+    report = index.memory_report()
+    print(f"memory: {report['total_mb']} MB, {report['categories']} categories")
+
+
+if __name__ == "__main__":
+    main()
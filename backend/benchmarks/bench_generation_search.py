@@ -0,0 +1,64 @@
+"""
+Задержка поиска по генерациям пользователя (`search_generations_page`) при
+большом числе генераций у него и у других пользователей (SQLite FTS5).
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_generation_search --users 50 --per-user 5000
+"""
+import argparse
+import asyncio
+import tempfile
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.bench_search import fill, timed
+from models.base import Base
+from models.user_generations import UserGeneration
+from models.users import User
+from services.generation_search import search_generations_page
+
+QUERIES = ["кружка", "тарелки", "игрушка плюш", "красная свеча", "органайзеры"]
+
+
+async def run(database_url: str, users: int, per_user: int, repeat: int) -> None:
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await fill(session_factory, per_user)
+
+    async with session_factory() as db:
+        await db.execute(insert(User), [
+            {"email": f"bench-{n}@example.com", "hashed_password": "-"} for n in range(1, users + 1)
+        ])
+        for user_id in range(1, users + 1):
+            await db.execute(insert(UserGeneration), [
+                {"user_id": user_id, "catalog_item_id": item_id, "ai_keywords": "подарок, дом, декор"}
+                for item_id in range(1, per_user + 1)
+            ])
+        await db.commit()
+
+        for query in QUERIES:
+            async def search():
+                await search_generations_page(db, users // 2, query, limit=50)
+
+            print(f"{users * per_user:>9} generations {query:<16} {await timed(search, repeat):>8.2f} ms")
+    await engine.dispose()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--per-user", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(f"sqlite+aiosqlite:///{tmp}/generations.db", args.users, args.per_user, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Время ответа списочных эндпоинтов без учёта БД: прежний путь (словарь на
+строку → jsonable_encoder / валидация response_model → json) против
+`FastJSONResponse` (строки → orjson). Приложение FastAPI вызывается
+в процессе через ASGI, так что в замер входит вся обработка ответа.
+
+- items: список товаров (`/get_items`, `/search_item_to_word`);
+- generations: генерации с вложенным товаром (`/get_items_sellers`),
+  прежде валидировались `UserGenerationView` через from_attributes.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_json --rows 1000 10000 100000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI
+
+from schemas.catalog import UserGenerationView
+from services.catalog_browse import ITEM_COLUMNS
+from services.fast_json import FastJSONResponse, row_dicts
+from services.generation_search import GENERATION_COLUMNS
+
+ITEM_KEYS = [column.key for column in ITEM_COLUMNS]
+GENERATION_KEYS = [column.key for column in GENERATION_COLUMNS]
+
+
+def item_row(number: int) -> tuple:
+    created = datetime(2026, 1, 1) + timedelta(seconds=number)
+    return (
+        number, f"art-{number}", f"uid-{number}", f"sid-{number}", f"Кружка керамическая {number}, 300 мл",
+        f"kruzhka-{number}", "керамика", f"cat-{number % 500}", f"https://cdn.example.com/{number}.jpg",
+        f"Кружка {number}", "Кружка из керамики с глазурью, подходит для посудомоечной машины. " * 3,
+        round(99 + number % 1000 * 1.5, 2), number % 40, created, created,
+    )
+
+
+def generation_row(number: int) -> tuple:
+    created = datetime(2026, 2, 1) + timedelta(seconds=number)
+    return (
+        number, 1, number, "Основной вариант", "Описание товара для карточки маркетплейса. " * 8,
+        "кружка, керамика, посуда, подарок", "v2", "not_exported", 0, created, created,
+    ) + item_row(number)
+
+
+def build_app(items: list[tuple], generations: list[tuple]) -> FastAPI:
+    app = FastAPI()
+    # Прежний путь: объекты ORM (здесь — атрибуты) → словари / схемы pydantic
+    item_objects = [SimpleNamespace(**dict(zip(ITEM_KEYS, row))) for row in items]
+    split = len(GENERATION_KEYS)
+    generation_objects = [
+        SimpleNamespace(**dict(zip(GENERATION_KEYS, row[:split])),
+                        catalog_item=SimpleNamespace(**dict(zip(ITEM_KEYS, row[split:]))))
+        for row in generations
+    ]
+
+    @app.get("/old/items", response_model=list[dict])
+    async def old_items() -> list[dict]:
+        return [{key: getattr(item, key) for key in ITEM_KEYS} for item in item_objects]
+
+    @app.get("/new/items", response_class=FastJSONResponse)
+    async def new_items() -> FastJSONResponse:
+        return FastJSONResponse(row_dicts(items, ITEM_COLUMNS))
+
+    @app.get("/old/generations", response_model=list[UserGenerationView])
+    async def old_generations() -> list:
+        return generation_objects
+
+    @app.get("/new/generations", response_class=FastJSONResponse)
+    async def new_generations() -> FastJSONResponse:
+        return FastJSONResponse(row_dicts(generations, GENERATION_COLUMNS, nested=("catalog_item", ITEM_COLUMNS)))
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, repeats: int) -> tuple[float, int]:
+    """Лучшее время ответа (мс) и размер тела"""
+    best = float("inf")
+    size = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        response = await client.get(path)
+        best = min(best, (time.perf_counter() - started) * 1000)
+        size = len(response.content)
+    return best, size
+
+
+async def run(rows: list[int], repeats: int) -> None:
+    for count in rows:
+        items = [item_row(number) for number in range(1, count + 1)]
+        generations = [generation_row(number) for number in range(1, count + 1)]
+        transport = httpx.ASGITransport(app=build_app(items, generations))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in ("items", "generations"):
+                old, old_size = await measure(client, f"/old/{name}", repeats)
+                new, new_size = await measure(client, f"/new/{name}", repeats)
+                print(f"{name:<11} {count:>7} rows: old {old:8.1f} ms  fast {new:7.1f} ms  "
+                      f"x{old / new:4.1f}  ({new_size / 1024 / 1024:.1f} MB, old {old_size / 1024 / 1024:.1f} MB)")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.rows, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Задержка поиска по каталогу: ILIKE '%слово%' против режимов `search_catalog`
+(fulltext, substring, similar) на каталогах растущего размера (SQLite FTS5).
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_search --sizes 10000 100000 1000000 --modes substring
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from typing import Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.fake_sima_land import make_item
+from models.base import Base
+from models.catalog_items import CatalogItem
+from models.users import User  # noqa: F401 — FK catalog_load_jobs.user_id
+from services.catalog_search import SEARCH_MODES, search_catalog
+from services.sima_land_client import map_api_data_to_item
+
+QUERIES = ["кружка", "тарелки", "игрушка плюш", "красная свеча", "органайзеры", "йзер", "арт. 12"]
+CHUNK = 5000
+
+
+async def fill(session_factory, size: int) -> None:
+    async with session_factory() as db:
+        for start in range(0, size, CHUNK):
+            rows = [map_api_data_to_item(make_item(item_id + 1)) for item_id in range(start, min(start + CHUNK, size))]
+            await db.execute(insert(CatalogItem), rows)
+        await db.commit()
+
+
+async def timed(call, repeat: int) -> float:
+    """Медиана времени вызова, мс"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def run_size(database_url: str, size: int, modes: list[str], repeat: int) -> None:
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await fill(session_factory, size)
+
+    async with session_factory() as db:
+        for query in QUERIES:
+            async def ilike():
+                await db.execute(select(CatalogItem).where(CatalogItem.name.ilike(f"%{query}%")).limit(100))
+
+            line = f"{size:>9} {query:<16} ilike {await timed(ilike, repeat):>8.2f} ms"
+            for mode in modes:
+                async def search():
+                    await search_catalog(db, query, limit=100, mode=mode)
+
+                line += f"   {mode} {await timed(search, repeat):>8.2f} ms"
+            print(line)
+    await engine.dispose()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--modes", nargs="+", choices=SEARCH_MODES, default=list(SEARCH_MODES))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            asyncio.run(run_size(f"sqlite+aiosqlite:///{tmp}/search.db", size, args.modes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Задержка поиска по инвертированному индексу каталога в памяти
+(`CatalogSearchIndex.search`, без чтения строк из БД) и его размер.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_search_index --items 500000
+"""
+import argparse
+import random
+import time
+from typing import Optional
+
+import numpy as np
+
+from benchmarks.fake_sima_land import make_item
+from services.catalog_events import CatalogChange
+from services.search_index import CatalogSearchIndex
+
+QUERIES = [
+    "кружка", "кружки белые", "тарелка фарфор", "мягкие игрушки", "органайзер пластик",
+    "свечи декоративные", "ножницы", "красная кружка", "подарочная упаковка", "серия",
+]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=500000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    index = CatalogSearchIndex()
+    started = time.perf_counter()
+    for start in range(0, args.items, 10000):
+        index.upsert(
+            CatalogChange(item_id, item["name"], item["slug"])
+            for item_id in range(start + 1, min(start + 10000, args.items) + 1)
+            for item in (make_item(item_id),)
+        )
+    print(f"build: {args.items} items in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(0)
+    samples = []
+    for _ in range(args.queries):
+        query = rng.choice(QUERIES)
+        started = time.perf_counter()
+        index.search(query, limit=100)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    print(f"search: p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms")
+    report = index.memory_report()
+    print(f"memory: {report['total_mb']} MB, {report['terms']} terms, {report['postings']} postings")
+
+
+if __name__ == "__main__":
+    main()
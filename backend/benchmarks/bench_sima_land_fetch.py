@@ -0,0 +1,67 @@
+"""
+Бенчмарк загрузки страниц Sima-Land: старая схема (новый клиент на каждую
+страницу, последовательно) против общего пула соединений с параллельной загрузкой.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_sima_land_fetch --items 10000 --latency 0.05
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.fake_sima_land import FakeSimaLandServer, create_app
+from services.sima_land_client import SimaLandClient
+
+
+async def fetch_serial(base_url: str, pages: int) -> int:
+    """Повторяет прежнее поведение loader.py: клиент на страницу, страницы по одной"""
+    total = 0
+    for page_number in range(1, pages + 1):
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            response = await client.get(f"/item/?page={page_number}")
+            response.raise_for_status()
+            total += len(response.json().get("items", []))
+    return total
+
+
+async def fetch_pooled(base_url: str, pages: int, concurrency: int) -> int:
+    client = SimaLandClient(base_url=base_url, concurrency=concurrency)
+    total = 0
+    try:
+        async for _, items in client.iter_pages(range(1, pages + 1)):
+            total += len(items)
+    finally:
+        await client.aclose()
+    return total
+
+
+async def run(args: argparse.Namespace, base_url: str) -> None:
+    pages = (args.items // args.page_size) + 1
+
+    for title, coro in (
+        ("serial, client per page", fetch_serial(base_url, pages)),
+        (f"pooled, concurrency={args.concurrency}", fetch_pooled(base_url, pages, args.concurrency)),
+    ):
+        started = time.perf_counter()
+        total = await coro
+        elapsed = time.perf_counter() - started
+        print(f"{title:<32} {total:>7} items  {elapsed:7.2f}s  {total / elapsed:9.0f} items/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка ответа API, сек")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    app = create_app(page_size=args.page_size, latency=args.latency)
+    with FakeSimaLandServer(app) as server:
+        asyncio.run(run(args, server.base_url))
+
+
+if __name__ == "__main__":
+    main()
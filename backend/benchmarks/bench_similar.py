@@ -0,0 +1,60 @@
+"""
+Задержка поиска похожих товаров (`CatalogSimilarIndex.similar`) и память
+индекса на синтетическом каталоге: названия из частых «товарных» слов,
+случайных слов и чисел, материал и заголовок изображения.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_similar --items 200000
+"""
+import argparse
+import random
+import time
+from typing import Optional
+
+import numpy as np
+
+from services.catalog_events import CatalogChange
+from services.similar_index import CatalogSimilarIndex
+
+ALPHABET = "абвгдежзийклмнопрстуфхцчшщыэюя"
+NOUNS = ["кружка", "тарелка", "свеча", "ваза", "лейка", "набор", "подставка", "крышка", "салфетница", "гирлянда"]
+ADJECTIVES = ["белый", "керамический", "стеклянный", "новогодний", "садовый", "большой", "ароматический"]
+STUFFS = ["керамика", "стекло", "пластик", "металл", "дерево", "воск", "текстиль"]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    words = ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(4, 10))) for _ in range(20000)]
+
+    def name() -> str:
+        parts = [rng.choice(NOUNS), rng.choice(ADJECTIVES), *rng.sample(words, rng.randint(1, 3))]
+        return " ".join(parts) + f" {rng.randint(1, 500)} шт"
+
+    index = CatalogSimilarIndex()
+    started = time.perf_counter()
+    index.upsert(
+        CatalogChange(item_id, name(), "", stuff=rng.choice(STUFFS), image_title=rng.choice(NOUNS))
+        for item_id in range(1, args.items + 1)
+    )
+    index._refresh_norms()
+    print(f"build: {args.items} items in {time.perf_counter() - started:.1f}s")
+
+    samples = []
+    for _ in range(args.queries):
+        item_id = rng.randint(1, args.items)
+        started = time.perf_counter()
+        index.similar(item_id, 10)
+        samples.append((time.perf_counter() - started) * 1000)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    print(f"similar (top 10): p50 {p50:.1f} ms  p95 {p95:.1f} ms  p99 {p99:.1f} ms")
+    report = index.memory_report()
+    print(f"memory: {report['total_mb']} MB, {report['ngrams']} n-grams")
+
+
+if __name__ == "__main__":
+    main()
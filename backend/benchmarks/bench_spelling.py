@@ -0,0 +1,72 @@
+"""
+Задержка исправления опечаток (`CatalogSpellingIndex.correct`) и размер
+словаря на синтетическом словаре: случайные «слова» из русских букв и
+запросы из слов словаря с 1–2 случайными правками.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_spelling --words 500000
+"""
+import argparse
+import random
+import time
+from typing import Optional
+
+import numpy as np
+
+from services.spelling_index import CatalogSpellingIndex
+
+ALPHABET = "абвгдежзийклмнопрстуфхцчшщъыьэюя"
+
+
+def typo(word: str, rng: random.Random, edits: int) -> str:
+    for _ in range(edits):
+        position = rng.randrange(len(word))
+        kind = rng.choice(("replace", "delete", "insert", "swap"))
+        if kind == "replace":
+            word = word[:position] + rng.choice(ALPHABET) + word[position + 1:]
+        elif kind == "delete" and len(word) > 4:
+            word = word[:position] + word[position + 1:]
+        elif kind == "insert":
+            word = word[:position] + rng.choice(ALPHABET) + word[position:]
+        elif position + 1 < len(word):
+            word = word[:position] + word[position + 1] + word[position] + word[position + 2:]
+    return word
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=500000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    vocabulary = list({
+        "".join(rng.choice(ALPHABET) for _ in range(rng.randint(4, 14)))
+        for _ in range(args.words)
+    })
+
+    index = CatalogSpellingIndex()
+    started = time.perf_counter()
+    index.add_words(vocabulary)
+    index.compact()
+    print(f"build: {len(vocabulary)} words in {time.perf_counter() - started:.1f}s")
+
+    samples = []
+    corrected = 0
+    for _ in range(args.queries):
+        words = rng.sample(vocabulary, 2)
+        query = " ".join(typo(word, rng, rng.randint(1, 2)) for word in words)
+        started = time.perf_counter()
+        result = index.correct(query)
+        samples.append((time.perf_counter() - started) * 1000)
+        corrected += result == " ".join(words)
+
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    print(f"correct (2 words): p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms")
+    print(f"restored exactly: {corrected / args.queries:.0%}")
+    report = index.memory_report()
+    print(f"memory: {report['total_mb']} MB, {report['variants']} variants")
+
+
+if __name__ == "__main__":
+    main()
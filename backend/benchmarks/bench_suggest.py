@@ -0,0 +1,68 @@
+"""
+Задержка подсказок по началу названия (`CatalogSuggestIndex.suggest`), время
+пересборки массива и размер индекса на синтетическом каталоге.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_suggest --items 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Optional
+
+import numpy as np
+
+from benchmarks.fake_sima_land import make_item
+from services.catalog_events import CatalogChange
+from services.suggest_index import CatalogSuggestIndex
+
+PREFIXES = ["к", "кр", "круж", "кружка «кр", "та", "тарелка «бе", "иг", "сумка", "ор", "ножни"]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    def change(item_id: int, rename: bool = False) -> CatalogChange:
+        item = make_item(item_id)
+        name = f"{item['name']} (новинка)" if rename else item["name"]
+        return CatalogChange(item_id, name, item["slug"], item["balance"] or 0)
+
+    index = CatalogSuggestIndex(delta_limit=args.updates * 2)
+    started = time.perf_counter()
+    index.load(change(item_id) for item_id in range(1, args.items + 1))
+    print(f"build: {args.items} items in {time.perf_counter() - started:.1f}s")
+    rng = random.Random(0)
+    index.add_generations({rng.randint(1, args.items): rng.randint(1, 20) for _ in range(args.items // 100)})
+
+    def measure(label: str) -> None:
+        samples = []
+        for _ in range(args.queries):
+            prefix = rng.choice(PREFIXES)
+            started = time.perf_counter()
+            index.suggest(prefix, limit=10)
+            samples.append((time.perf_counter() - started) * 1000)
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        print(f"suggest {label}: p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms")
+
+    measure("(array)")
+
+    started = time.perf_counter()
+    index.upsert(change(rng.randint(1, args.items), rename=True) for _ in range(args.updates))
+    print(f"updates: {args.updates} in {time.perf_counter() - started:.2f}s")
+    measure(f"(array + delta {len(index._delta)})")
+
+    started = time.perf_counter()
+    asyncio.run(index.compact())
+    print(f"compaction: {time.perf_counter() - started:.1f}s")
+
+    report = index.memory_report()
+    print(f"memory: {report['total_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
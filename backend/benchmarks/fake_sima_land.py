@@ -0,0 +1,138 @@
+"""
+Локальная замена Sima-Land API (`/api/v3/item/`) для бенчмарков и ручной
+проверки загрузчика.
+
+Отдельный запуск (затем SIMA_LAND_BASE_URL=http://127.0.0.1:8081/api/v3):
+    python -m benchmarks.fake_sima_land --port 8081 --catalog-size 100000 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+import uuid
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+CATEGORIES = [
+    (1201, "Кружка", "керамика"),
+    (1315, "Тарелка", "фарфор"),
+    (2044, "Мягкая игрушка", "плюш"),
+    (3120, "Органайзер", "пластик"),
+    (4410, "Ножницы", "металл"),
+    (5002, "Свеча декоративная", "парафин"),
+]
+ADJECTIVES = ["новогодняя серия", "детская серия", "подарочная упаковка", "классика", "яркий дизайн"]
+COLORS = ["белый", "красный", "синий", "зелёный", "чёрный", "розовый"]
+
+
+def make_item(item_id: int) -> dict:
+    """
+    Синтетический товар в формате ответа Sima-Land: поля, которые читает
+    `map_api_data_to_item`, и лишние поля, которые загрузчик должен игнорировать.
+    Для одного id всегда одинаков.
+    """
+    rng = random.Random(item_id)
+    category_id, category, material = rng.choice(CATEGORIES)
+    name = f"{category} «{rng.choice(COLORS)}», {rng.choice(ADJECTIVES)}, арт. {rng.randint(1000, 9999)}"
+    return {
+        "id": item_id,
+        "uid": str(uuid.UUID(int=rng.getrandbits(128))),
+        "sid": str(1000000 + item_id),
+        "name": name,
+        "slug": f"{category_id}-{item_id}",
+        "stuff": material,
+        "category_id": category_id,
+        "photoUrl": f"https://cdn.sima-land.ru/items/{item_id}/0/700.jpg",
+        "image_title": name[:150],
+        "price": round(rng.uniform(19, 4999), 2),
+        "balance": rng.choice([None, "", rng.randint(0, 5000)]),
+        # Поля ответа, не используемые загрузчиком
+        "trademark_id": rng.randint(1, 500),
+        "is_adult": False,
+        "min_qty": rng.choice([1, 2, 5, 10]),
+        "description": f"{name}. Материал: {material}. " * rng.randint(1, 4),
+        "barcodes": [str(4600000000000 + item_id)],
+    }
+
+
+def create_app(
+    page_size: int = 50,
+    latency: float = 0.05,
+    error_rate: float = 0.0,
+    catalog_size: Optional[int] = None,
+    seed: int = 0,
+) -> FastAPI:
+    """
+    Приложение с синтетическим каталогом:
+    - latency: задержка ответа, сек (±20% случайного разброса)
+    - error_rate: доля ответов 503/429 (с Retry-After) вместо страницы
+    - catalog_size: число товаров; страницы за концом каталога пустые
+    """
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.requests = 0
+    app.state.errors = 0
+
+    @app.get("/api/v3/item/")
+    async def items(page: int = 1):
+        app.state.requests += 1
+        if latency:
+            await asyncio.sleep(latency * rng.uniform(0.8, 1.2))
+        if error_rate and rng.random() < error_rate:
+            app.state.errors += 1
+            if rng.random() < 0.5:
+                return JSONResponse({"message": "Too Many Requests"}, status_code=429, headers={"Retry-After": "0"})
+            return JSONResponse({"message": "Service Unavailable"}, status_code=503)
+
+        start = (page - 1) * page_size
+        end = start + page_size
+        if catalog_size is not None:
+            end = min(end, catalog_size)
+        return {"items": [make_item(item_id + 1) for item_id in range(start, end)]}
+
+    return app
+
+
+class FakeSimaLandServer:
+    """Запускает фейковый API в отдельном потоке на свободном порту"""
+
+    def __init__(self, app: FastAPI, host: str = "127.0.0.1", port: int = 0):
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/api/v3"
+
+    def __enter__(self) -> "FakeSimaLandServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--catalog-size", type=int)
+    args = parser.parse_args()
+
+    app = create_app(args.page_size, args.latency, args.error_rate, args.catalog_size)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
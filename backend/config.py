@@ -13,6 +13,62 @@ class Config:
     USE_POSTGRES = os.getenv("USE_POSTGRES", "false").lower() == "true"
     prompt_system_generate_info: str = "prompts/info_for_seller.yaml"
 
+    # Sima-Land API
+    SIMA_LAND_BASE_URL = os.getenv("SIMA_LAND_BASE_URL", "https://www.sima-land.ru/api/v3")
+    SIMA_LAND_CONCURRENCY = int(os.getenv("SIMA_LAND_CONCURRENCY", "8"))
+    # Адаптивный лимит запросов меняется от SIMA_LAND_MIN_CONCURRENCY до SIMA_LAND_CONCURRENCY
+    SIMA_LAND_MIN_CONCURRENCY = int(os.getenv("SIMA_LAND_MIN_CONCURRENCY", "1"))
+    # Повторы страницы при 429/5xx и сетевых ошибках
+    SIMA_LAND_MAX_RETRIES = int(os.getenv("SIMA_LAND_MAX_RETRIES", "5"))
+    SIMA_LAND_RETRY_BASE_DELAY = float(os.getenv("SIMA_LAND_RETRY_BASE_DELAY", "0.5"))
+    SIMA_LAND_RETRY_MAX_DELAY = float(os.getenv("SIMA_LAND_RETRY_MAX_DELAY", "30"))
+    SIMA_LAND_PAGE_SIZE = int(os.getenv("SIMA_LAND_PAGE_SIZE", "50"))
+    # Сколько секунд сохранённая страница считается свежей (0 — кеш не используется)
+    SIMA_LAND_CACHE_TTL = int(os.getenv("SIMA_LAND_CACHE_TTL", "3600"))
+    # Ёмкость очередей между стадиями конвейера загрузки (в страницах)
+    INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+    # Размер чанка записи (в товарах) при загрузке крупного каталога (mode=large)
+    LARGE_LOAD_CHUNK_SIZE = int(os.getenv("LARGE_LOAD_CHUNK_SIZE", "2000"))
+    # События прогресса задачи: не чаще раза в PROGRESS_INTERVAL секунд или
+    # каждые PROGRESS_EVERY_ITEMS товаров, не больше PROGRESS_ERROR_SAMPLES примеров ошибок
+    PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", "1"))
+    PROGRESS_EVERY_ITEMS = int(os.getenv("PROGRESS_EVERY_ITEMS", "1000"))
+    PROGRESS_ERROR_SAMPLES = int(os.getenv("PROGRESS_ERROR_SAMPLES", "5"))
+    # Как часто (в секундах) метрики конвейера публикуются в поток прогресса
+    INGEST_METRICS_INTERVAL = float(os.getenv("INGEST_METRICS_INTERVAL", "2"))
+    # Поиск по каталогу в режиме similar: минимальное сходство по триграммам и
+    # (в SQLite) число кандидатов из триграммного индекса для пересчёта сходства
+    SEARCH_SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_SIMILARITY_THRESHOLD", "0.3"))
+    SEARCH_SIMILAR_CANDIDATES = int(os.getenv("SEARCH_SIMILAR_CANDIDATES", "1000"))
+    # Полнотекстовый поиск из инвертированного индекса в памяти (строится при старте)
+    SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "false").lower() == "true"
+    SEARCH_INDEX_BUILD_CHUNK = int(os.getenv("SEARCH_INDEX_BUILD_CHUNK", "10000"))
+    # Исправление опечаток (режим поиска fuzzy) по словарю слов каталога в памяти;
+    # варианты новых слов вливаются в основные массивы пачками по SPELLING_DELTA_LIMIT слов
+    SPELLING_INDEX_ENABLED = os.getenv("SPELLING_INDEX_ENABLED", "false").lower() == "true"
+    SPELLING_DELTA_LIMIT = int(os.getenv("SPELLING_DELTA_LIMIT", "5000"))
+    # Кеш результатов поиска по каталогу (записей; 0 — выключен), сбрасывается записью каталога
+    SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1000"))
+    # Сколько пользователей держать в памяти с множествами сгенерированных товаров
+    GENERATED_ITEMS_MAX_USERS = int(os.getenv("GENERATED_ITEMS_MAX_USERS", "10000"))
+    # Подсказки по началу названия (/suggest) из отсортированного массива в памяти;
+    # изменения копятся в дельте до SUGGEST_DELTA_LIMIT товаров, затем массив пересобирается
+    SUGGEST_INDEX_ENABLED = os.getenv("SUGGEST_INDEX_ENABLED", "false").lower() == "true"
+    SUGGEST_DELTA_LIMIT = int(os.getenv("SUGGEST_DELTA_LIMIT", "50000"))
+    # Фасеты просмотра каталога (/browse) из массивов в памяти (строятся при старте);
+    # без них фасеты считаются GROUP BY в БД. Границы ценовых корзин — через запятую
+    FACET_INDEX_ENABLED = os.getenv("FACET_INDEX_ENABLED", "false").lower() == "true"
+    FACET_PRICE_EDGES = os.getenv("FACET_PRICE_EDGES", "100,300,500,1000,3000,5000,10000")
+    # Похожие товары (/similar) по TF-IDF символьных n-грамм в памяти (строится при старте);
+    # без индекса похожие ищутся нечётким поиском по названию
+    SIMILAR_INDEX_ENABLED = os.getenv("SIMILAR_INDEX_ENABLED", "false").lower() == "true"
+    # Группы почти-дубликатов (MinHash LSH по названиям) при записи каталога и
+    # минимальный коэффициент Жаккара триграмм названий для попадания в группу
+    DUPLICATE_GROUPING_ENABLED = os.getenv("DUPLICATE_GROUPING_ENABLED", "true").lower() == "true"
+    DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.6"))
+    # Оценка общего числа результатов поиска без PostgreSQL: считается не больше этого числа строк
+    PAGINATION_COUNT_CAP = int(os.getenv("PAGINATION_COUNT_CAP", "1000"))
+
     @property
     def database_url(self) -> str:
         if self.USE_POSTGRES:
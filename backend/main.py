@@ -5,14 +5,43 @@ from routers.sima_land import router as sima_land_router
 from routers.auth import router as auth_router
 from routers.excel import router as excel_router
 from services.logger import log_info, log_error
+from services.sima_land_client import sima_land_client
+from services.catalog_jobs import catalog_job_manager
+from services.search_index import catalog_search_index
+from services.suggest_index import catalog_suggest_index
+from services.spelling_index import catalog_spelling_index
+from services.catalog_facets import catalog_facet_index
+from services.similar_index import catalog_similar_index
+from config import config
 import time
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     log_info("🚀 ItemGate API запущен")
+    try:
+        await catalog_job_manager.start()
+    except Exception as e:
+        log_error(f"Не удалось запустить фоновые задачи загрузки каталога: {str(e)}")
+    if config.SEARCH_INDEX_ENABLED:
+        await catalog_search_index.start()
+    if config.SUGGEST_INDEX_ENABLED:
+        await catalog_suggest_index.start()
+    if config.SPELLING_INDEX_ENABLED:
+        await catalog_spelling_index.start()
+    if config.FACET_INDEX_ENABLED:
+        await catalog_facet_index.start()
+    if config.SIMILAR_INDEX_ENABLED:
+        await catalog_similar_index.start()
     yield
     # Shutdown
+    await catalog_similar_index.stop()
+    await catalog_facet_index.stop()
+    await catalog_spelling_index.stop()
+    await catalog_suggest_index.stop()
+    await catalog_search_index.stop()
+    await catalog_job_manager.stop()
+    await sima_land_client.aclose()
     log_info("🛑 ItemGate API остановлен")
 
 app = FastAPI(title="ItemGate API", version="0.1.0", lifespan=lifespan)
@@ -61,6 +90,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Заголовки постраничного поиска должны быть видны фронтенду
+    expose_headers=["X-Next-Cursor", "X-Total-Estimate", "X-Total-Exact", "ETag"],
 )
 
 app.include_router(sima_land_router, prefix="/sima-land", tags=["Sima-Land"])
@@ -0,0 +1,19 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+from .base import Base
+
+
+class CatalogDuplicateBucket(Base):
+    """
+    Корзины LSH по MinHash-подписям названий товаров (`services.near_duplicates`):
+    товары с общей корзиной — кандидаты в почти-дубликаты. Таблица служит
+    индексом, поэтому без служебных id и дат: ключ — (корзина, товар).
+    """
+    __tablename__ = "catalog_duplicate_buckets"
+
+    bucket = Column(BigInteger, primary_key=True)
+    catalog_item_id = Column(
+        Integer, ForeignKey('catalog_items.id', ondelete='CASCADE'), primary_key=True, index=True
+    )
+
+    def __repr__(self):
+        return f"<CatalogDuplicateBucket(bucket={self.bucket}, catalog_item_id={self.catalog_item_id})>"
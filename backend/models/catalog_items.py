@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Integer, Text
+from sqlalchemy import DDL, Column, String, Float, Index, Integer, Text, event
 from .base import BaseModel
 
 
@@ -28,6 +28,126 @@ class CatalogItem(BaseModel):
     # Коммерческие данные
     price = Column(Float, nullable=False)
     balance = Column(Integer, default=0)
+
+    # Хеш содержимого (blake2b-128) для дельта-синхронизации с Sima-Land
+    content_hash = Column(String(32))
+
+    # Группа почти-дубликатов (варианты цвета/размера): id первого товара группы
+    duplicate_group_id = Column(Integer, index=True)
+
+    # Фильтры просмотра каталога (/browse): равенство по категории или
+    # материалу и диапазон цены с сортировкой по цене; «в наличии» —
+    # частичный индекс только по товарам с ненулевым остатком
+    __table_args__ = (
+        Index("ix_catalog_items_category_price", "category_id", "price"),
+        Index("ix_catalog_items_stuff_price", "stuff", "price"),
+        Index(
+            "ix_catalog_items_in_stock_category_price", "category_id", "price",
+            sqlite_where=balance > 0, postgresql_where=balance > 0,
+        ),
+        Index("ix_catalog_items_price", "price"),
+    )
     
     def __repr__(self):
         return f"<CatalogItem(id_item={self.id_item}, name={self.name})>"
+
+
+# Полнотекстовый поиск по name/slug поддерживается средствами БД и не
+# отображается в модель: в PostgreSQL — генерируемая колонка tsvector
+# (конфигурация russian) с GIN-индексом, в SQLite — внешняя FTS5-таблица,
+# синхронизируемая триггерами. Те же объекты создаёт миграция.
+POSTGRES_SEARCH_DDL = [
+    """
+    ALTER TABLE catalog_items ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(slug, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_catalog_items_search_vector ON catalog_items USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS catalog_items_fts USING fts5(
+        name, slug, content='catalog_items', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 0'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_items_fts_ai AFTER INSERT ON catalog_items BEGIN
+        INSERT INTO catalog_items_fts(rowid, name, slug) VALUES (new.id, new.name, new.slug);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_items_fts_ad AFTER DELETE ON catalog_items BEGIN
+        INSERT INTO catalog_items_fts(catalog_items_fts, rowid, name, slug)
+        VALUES ('delete', old.id, old.name, old.slug);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_items_fts_au AFTER UPDATE OF name, slug ON catalog_items BEGIN
+        INSERT INTO catalog_items_fts(catalog_items_fts, rowid, name, slug)
+        VALUES ('delete', old.id, old.name, old.slug);
+        INSERT INTO catalog_items_fts(rowid, name, slug) VALUES (new.id, new.name, new.slug);
+    END
+    """,
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(CatalogItem.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(CatalogItem.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    CatalogItem.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS catalog_items_fts").execute_if(dialect="sqlite"),
+)
+
+# Поиск по подстроке (name, slug, id_item) на триграммах: в PostgreSQL —
+# GIN-индексы pg_trgm, в SQLite — FTS5-таблица с токенизатором trigram.
+TRIGRAM_COLUMNS = ("name", "slug", "id_item")
+
+POSTGRES_TRIGRAM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    *(
+        f"CREATE INDEX IF NOT EXISTS ix_catalog_items_{column}_trgm "
+        f"ON catalog_items USING GIN ({column} gin_trgm_ops)"
+        for column in TRIGRAM_COLUMNS
+    ),
+]
+
+SQLITE_TRIGRAM_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS catalog_items_trgm USING fts5(
+        name, slug, id_item, content='catalog_items', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_items_trgm_ai AFTER INSERT ON catalog_items BEGIN
+        INSERT INTO catalog_items_trgm(rowid, name, slug, id_item) VALUES (new.id, new.name, new.slug, new.id_item);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_items_trgm_ad AFTER DELETE ON catalog_items BEGIN
+        INSERT INTO catalog_items_trgm(catalog_items_trgm, rowid, name, slug, id_item)
+        VALUES ('delete', old.id, old.name, old.slug, old.id_item);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS catalog_items_trgm_au AFTER UPDATE OF name, slug, id_item ON catalog_items BEGIN
+        INSERT INTO catalog_items_trgm(catalog_items_trgm, rowid, name, slug, id_item)
+        VALUES ('delete', old.id, old.name, old.slug, old.id_item);
+        INSERT INTO catalog_items_trgm(rowid, name, slug, id_item) VALUES (new.id, new.name, new.slug, new.id_item);
+    END
+    """,
+]
+
+for statement in POSTGRES_TRIGRAM_DDL:
+    event.listen(CatalogItem.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_TRIGRAM_DDL:
+    event.listen(CatalogItem.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    CatalogItem.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS catalog_items_trgm").execute_if(dialect="sqlite"),
+)
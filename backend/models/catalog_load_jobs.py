@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from .base import BaseModel
+
+
+class CatalogLoadJob(BaseModel):
+    """
+    Фоновая задача загрузки каталога из Sima-Land.
+    `last_page` — чекпоинт: последняя полностью записанная страница,
+    с которой задача продолжается после перезапуска сервера.
+    """
+    __tablename__ = "catalog_load_jobs"
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'), nullable=True, index=True)
+    mode = Column(String(20), default='load', nullable=False)  # 'load', 'large', 'sync', 'replay'
+    requested_count = Column(Integer, nullable=False)
+    # Лимит записей (вставок + обновлений) для режима sync; None — без лимита
+    write_budget = Column(Integer)
+
+    # Прогресс
+    last_page = Column(Integer, default=0, nullable=False)
+    processed_count = Column(Integer, default=0, nullable=False)
+    inserted_count = Column(Integer, default=0, nullable=False)
+    skipped_count = Column(Integer, default=0, nullable=False)
+    updated_count = Column(Integer, default=0, nullable=False)
+    unchanged_count = Column(Integer, default=0, nullable=False)
+    deferred_count = Column(Integer, default=0, nullable=False)
+    error_count = Column(Integer, default=0, nullable=False)
+
+    status = Column(String(20), default='pending', nullable=False, index=True)  # 'pending', 'running', 'completed', 'failed'
+    error = Column(Text)
+    finished_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<CatalogLoadJob(id={self.id}, status={self.status}, last_page={self.last_page})>"
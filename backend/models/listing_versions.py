@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger, Column, String
+from .base import Base
+
+
+class ListingVersion(Base):
+    """
+    Версии данных списков для ETag (`services.listing_versions`): `catalog` —
+    каталог товаров, `generations:<user_id>` — генерации пользователя. Версия
+    увеличивается в транзакции каждой записи, поэтому видна вместе с данными.
+    """
+    __tablename__ = "listing_versions"
+
+    scope = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ListingVersion(scope={self.scope}, version={self.version})>"
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime
+from .base import BaseModel
+
+
+class SimaLandPayload(BaseModel):
+    """
+    Сырой ответ Sima-Land API (сжатый zlib), адресуемый по содержимому:
+    одинаковые ответы хранятся один раз.
+    """
+    __tablename__ = "sima_land_payloads"
+
+    sha256 = Column(String(64), unique=True, nullable=False, index=True)
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)  # размер до сжатия, байт
+
+    def __repr__(self):
+        return f"<SimaLandPayload(sha256={self.sha256[:12]}, size={self.size})>"
+
+
+class SimaLandPage(BaseModel):
+    """Последний полученный ответ для страницы каталога"""
+    __tablename__ = "sima_land_pages"
+
+    page_number = Column(Integer, unique=True, nullable=False, index=True)
+    payload_hash = Column(String(64), nullable=False, index=True)
+    fetched_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<SimaLandPage(page_number={self.page_number}, fetched_at={self.fetched_at})>"
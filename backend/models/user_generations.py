@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Text, ForeignKey
+from sqlalchemy import DDL, Column, String, Integer, Text, ForeignKey, event
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -32,3 +32,101 @@ class UserGeneration(BaseModel):
     
     def __repr__(self):
         return f"<UserGeneration(id={self.id}, user_id={self.user_id}, item={self.catalog_item_id})>"
+
+
+# Полнотекстовый поиск по генерациям пользователя: название товара
+# (из catalog_items), ai_keywords и ai_description. Индекс разделён по
+# пользователям: в PostgreSQL — составной GIN (user_id, search_vector) через
+# btree_gin, в SQLite — FTS5-таблица с колонкой owner ('u<user_id>'), условие
+# по которой пересекается со словами запроса внутри индекса.
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    "ALTER TABLE user_generations ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """
+    CREATE OR REPLACE FUNCTION user_generations_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(
+                (SELECT name FROM catalog_items WHERE id = NEW.catalog_item_id), '')), 'A') ||
+            setweight(to_tsvector('russian', coalesce(NEW.ai_keywords, '')), 'B') ||
+            setweight(to_tsvector('russian', coalesce(NEW.ai_description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER user_generations_search_vector_biu
+    BEFORE INSERT OR UPDATE OF catalog_item_id, ai_keywords, ai_description ON user_generations
+    FOR EACH ROW EXECUTE FUNCTION user_generations_search_vector()
+    """,
+    # Переименование товара пересчитывает вектор его генераций
+    """
+    CREATE OR REPLACE FUNCTION user_generations_catalog_name() RETURNS trigger AS $$
+    BEGIN
+        UPDATE user_generations SET catalog_item_id = catalog_item_id WHERE catalog_item_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER user_generations_catalog_name_au
+    AFTER UPDATE OF name ON catalog_items
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION user_generations_catalog_name()
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_user_generations_search ON user_generations USING GIN (user_id, search_vector)",
+]
+
+# prefix — индексы префиксов длиной 3–8 символов: запрос ищет основы слов
+# как префиксы ("кружк"*), без них FTS5 перебирает все термы с этим началом
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS user_generations_fts USING fts5(
+        owner, name, ai_keywords, ai_description,
+        tokenize='unicode61 remove_diacritics 0',
+        prefix='3 4 5 6 7 8'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_generations_fts_ai AFTER INSERT ON user_generations BEGIN
+        INSERT INTO user_generations_fts(rowid, owner, name, ai_keywords, ai_description)
+        VALUES (
+            new.id, 'u' || new.user_id,
+            (SELECT name FROM catalog_items WHERE id = new.catalog_item_id),
+            new.ai_keywords, new.ai_description
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_generations_fts_ad AFTER DELETE ON user_generations BEGIN
+        DELETE FROM user_generations_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_generations_fts_au
+    AFTER UPDATE OF user_id, catalog_item_id, ai_keywords, ai_description ON user_generations BEGIN
+        DELETE FROM user_generations_fts WHERE rowid = old.id;
+        INSERT INTO user_generations_fts(rowid, owner, name, ai_keywords, ai_description)
+        VALUES (
+            new.id, 'u' || new.user_id,
+            (SELECT name FROM catalog_items WHERE id = new.catalog_item_id),
+            new.ai_keywords, new.ai_description
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_generations_fts_name_au AFTER UPDATE OF name ON catalog_items BEGIN
+        UPDATE user_generations_fts SET name = new.name
+        WHERE rowid IN (SELECT id FROM user_generations WHERE catalog_item_id = new.id);
+    END
+    """,
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(UserGeneration.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(UserGeneration.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    UserGeneration.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS user_generations_fts").execute_if(dialect="sqlite"),
+)
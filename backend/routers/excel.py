@@ -14,6 +14,8 @@ from models.user_generations import UserGeneration
 from models.log import Log
 from models.users import User
 from services.auth import get_current_admin_user, get_current_active_user
+from services.catalog_writer import upsert_catalog_items
+from services.listing_versions import bump_versions, generations_scope
 
 router = APIRouter(prefix="/excel", tags=["Excel"])
 
@@ -70,9 +72,10 @@ async def upload_items_from_excel(
         # Создаём мапинг индексов колонок
         col_map = {header: idx for idx, header in enumerate(headers)}
         
-        added_count = 0
         skipped_count = 0
         errors = []
+        rows = []
+        row_numbers = {}
         
         # Обрабатываем строки (пропускаем заголовок)
         logger.info("[UPLOAD] Начинаем обработку строк...")
@@ -94,32 +97,19 @@ async def upload_items_from_excel(
                     logger.warning("[UPLOAD] Строка %d: пропущена - нет обязательных полей", row_idx)
                     continue
                 
-                # Проверяем, нет ли уже такого товара в каталоге
-                existing = await db.execute(
-                    select(CatalogItem).where(CatalogItem.id_item == str(id_item))
-                )
-                if existing.scalar_one_or_none():
-                    errors.append(f"Строка {row_idx}: товар {id_item} уже есть в каталоге")
-                    skipped_count += 1
-                    logger.info("[UPLOAD] Строка %d: пропущена - товар уже существует: %s", row_idx, id_item)
-                    continue
-                
-                # Создаём товар в каталоге
-                new_item = CatalogItem(
-                    id_item=str(id_item),
-                    name=str(name),
-                    price=float(price),
-                    photoUrl=str(photo_url),
-                    slug=str(slug),
-                    raw_description=str(row[col_map['raw_description']]) if 'raw_description' in col_map and row[col_map['raw_description']] else None,
-                    stuff=str(row[col_map['stuff']]) if 'stuff' in col_map and row[col_map['stuff']] else None,
-                    category_id=str(row[col_map['category_id']]) if 'category_id' in col_map and row[col_map['category_id']] else None,
-                    balance=int(row[col_map['balance']]) if 'balance' in col_map and row[col_map['balance']] else 0,
-                )
-                
-                db.add(new_item)
-                added_count += 1
-                logger.info("[UPLOAD] Строка %d: добавлен товар id_item=%s", row_idx, id_item)
+                # Готовим строку для массовой записи в каталог
+                rows.append({
+                    "id_item": str(id_item),
+                    "name": str(name),
+                    "price": float(price),
+                    "photoUrl": str(photo_url),
+                    "slug": str(slug),
+                    "raw_description": str(row[col_map['raw_description']]) if 'raw_description' in col_map and row[col_map['raw_description']] else None,
+                    "stuff": str(row[col_map['stuff']]) if 'stuff' in col_map and row[col_map['stuff']] else None,
+                    "category_id": str(row[col_map['category_id']]) if 'category_id' in col_map and row[col_map['category_id']] else None,
+                    "balance": int(row[col_map['balance']]) if 'balance' in col_map and row[col_map['balance']] else 0,
+                })
+                row_numbers.setdefault(str(id_item), row_idx)
                 
             except Exception as e:
                 error_msg = f"Строка {row_idx}: {str(e)}"
@@ -127,9 +117,15 @@ async def upload_items_from_excel(
                 skipped_count += 1
                 logger.exception("[UPLOAD] Строка %d: ошибка при обработке: %s", row_idx, str(e))
         
-        # Сохраняем всё в БД
-        logger.info("[UPLOAD] Сохраняем в БД: %d товаров", added_count)
-        await db.commit()
+        # Сохраняем всё в БД одним INSERT ... ON CONFLICT DO NOTHING на чанк
+        logger.info("[UPLOAD] Сохраняем в БД: %d строк", len(rows))
+        result = await upsert_catalog_items(db, rows)
+        added_count = len(result.inserted)
+        duplicates = len(rows) - len(result.inserted) - len(result.skipped)
+        for id_item in result.skipped:
+            errors.append(f"Строка {row_numbers[id_item]}: товар {id_item} уже есть в каталоге")
+            logger.info("[UPLOAD] Строка %d: пропущена - товар уже существует: %s", row_numbers[id_item], id_item)
+        skipped_count += len(result.skipped) + duplicates
         logger.info("[UPLOAD] Успешно сохранено")
         
         # Логируем массовую загрузку
@@ -353,6 +349,7 @@ async def export_items_to_excel(
             gen.export_count += 1
             gen.excel_exported = 'exported'
         
+        await bump_versions(db, [generations_scope(current_user.id)])
         await db.commit()
         
         # Логируем экспорт
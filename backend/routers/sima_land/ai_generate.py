@@ -12,6 +12,7 @@ from models.users import User
 from services.ai_client import openRouterClient
 from services.prompt_manager import prompt_manager
 from services.auth import get_current_active_user
+from services.listing_versions import bump_versions, generations_scope
 from config import config as conf
 
 router = APIRouter()
@@ -105,6 +106,7 @@ async def generate_ai_description(
         existing_generation.ai_description = str(response.get("Description", ""))
         existing_generation.ai_keywords = str(response.get("Words", ""))
         existing_generation.ai_prompt_version = str(prompt_version['version'])
+        await bump_versions(db, [generations_scope(current_user.id)])
         await db.commit()
         await db.refresh(existing_generation)
         
@@ -125,6 +127,7 @@ async def generate_ai_description(
             ai_prompt_version=str(prompt_version['version'])
         )
         db.add(new_generation)
+        await bump_versions(db, [generations_scope(current_user.id)])
         await db.commit()
         await db.refresh(new_generation)
         
@@ -10,6 +10,7 @@ from models.log import Log
 from models.users import User
 from schemas.log import LogResponse
 from services.auth import get_current_admin_user, get_current_active_user
+from services.listing_versions import bump_versions, generations_scope
 
 router = APIRouter()
 
@@ -47,6 +48,7 @@ async def update_generation(
         UserGeneration.id == generation_id
     ).values(**update_data)
     await db.execute(stmt)
+    await bump_versions(db, [generations_scope(current_user.id)])
     await db.commit()
 
     # Получаем обновлённую генерацию
@@ -86,6 +88,7 @@ async def delete_generation(
         raise HTTPException(status_code=404, detail='Генерация не найдена или не принадлежит вам')
     
     await db.delete(generation)
+    await bump_versions(db, [generations_scope(current_user.id)])
     await db.commit()
     
     # Логируем удаление
@@ -1,107 +1,108 @@
-from fastapi import Depends, APIRouter
+from fastapi import Depends, APIRouter, Header, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 import logging
+from typing import Optional
 
 from services.database import get_db
 from schemas.catalog import CatalogItemView, UserGenerationView
-from models.catalog_items import CatalogItem
 from models.user_generations import UserGeneration
 from models.users import User
 from services.auth import get_current_active_user
+from services.catalog_browse import ITEM_COLUMNS, pending_items_page
+from services.fast_json import FastJSONResponse, row_dicts
+from services.generated_items import generated_items
+from services.generation_search import GENERATION_COLUMNS, generations_with_items
+from services.listing_versions import etag_matches, listing_etag, not_modified, set_etag_headers
+from services.pagination import set_page_headers
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.get("/get_items")
+# Максимальный размер страницы списка товаров
+MAX_PAGE_SIZE = 500
+
+@router.get("/get_items", response_model=list[dict], response_class=FastJSONResponse)
 async def get_catalog_items(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
-) -> list[dict]:
+) -> Response:
     """
     Получить товары из ОБЩЕГО КАТАЛОГА, которые ещё НЕ сгенерированы пользователем.
-    Показывает только те товары, для которых пользователь НЕ создал описания.
+    Показывает только те товары, для которых пользователь НЕ создал описания,
+    от новых к старым.
+
+    Постраничный вывод по `limit` товаров: курсор следующей страницы — в
+    заголовке `X-Next-Cursor` (передаётся обратно как `?cursor=`), оценка
+    общего числа для первой страницы — в `X-Total-Estimate` / `X-Total-Exact`.
+    Строки страницы кодируются в JSON напрямую (`FastJSONResponse`).
+
+    ETag страницы зависит от версий каталога и генераций пользователя: на
+    `If-None-Match` с ним ответ — 304 без запросов списка.
     """
     logger.info("[GET_ITEMS] Запрос от user_id=%s", current_user.id)
     
-    # Проверяем общее количество товаров в каталоге
-    total_count_stmt = select(CatalogItem)
-    total_result = await db.execute(total_count_stmt)
-    total_items = total_result.scalars().all()
-    logger.info("[GET_ITEMS] Всего товаров в каталоге: %d", len(total_items))
-    
-    # Подзапрос: список catalog_item_id для которых у пользователя УЖЕ есть генерации
-    stmt_generated = select(UserGeneration.catalog_item_id).where(
-        UserGeneration.user_id == current_user.id
-    )
-
-    print(UserGeneration.user_id, current_user.id)
-    result_generated = await db.execute(stmt_generated)
-    generated_ids = result_generated.scalars().all()
-    logger.info("[GET_ITEMS] Пользователь уже сгенерировал: %d товаров", len(generated_ids))
-    
-    # Получаем товары, которых НЕТ в генерациях пользователя
-    stmt = select(CatalogItem).where(
-        CatalogItem.id.notin_(stmt_generated)
-    ).order_by(CatalogItem.created_at.desc())
+    etag = await listing_etag(db, current_user.id, "get_items", cursor, limit)
+    if etag_matches(if_none_match, etag):
+        logger.info("[GET_ITEMS] Не изменилось с прошлого запроса (ETag %s)", etag)
+        return not_modified(etag)
     
-    result = await db.execute(stmt)
-    catalog_items = result.scalars().all()
+    # Множество уже сгенерированных пользователем товаров — из памяти
+    generated = await generated_items.bitmap(db, current_user.id)
+    logger.info("[GET_ITEMS] Пользователь уже сгенерировал: %d товаров", len(generated))
     
-    logger.info("[GET_ITEMS] Показываем пользователю (ещё не сгенерированных): %d товаров", len(catalog_items))
-    if catalog_items:
-        for item in catalog_items[:3]:  # Первые 3 товара
-            logger.debug("[GET_ITEMS] Товар: id=%s, name='%s'", item.id, item.name)
+    try:
+        page = await pending_items_page(db, generated, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Формируем ответ
-    items_list = []
-    for item in catalog_items:
-        item_dict = {
-            "id": item.id,
-            "id_item": item.id_item,
-            "uid": item.uid,
-            "sid": item.sid,
-            "name": item.name,
-            "slug": item.slug,
-            "stuff": item.stuff,
-            "category_id": item.category_id,
-            "photoUrl": item.photoUrl,
-            "image_title": item.image_title,
-            "raw_description": item.raw_description,
-            "price": item.price,
-            "balance": item.balance,
-            "created_at": item.created_at,
-            "updated_at": item.updated_at
-        }
-        items_list.append(item_dict)
+    logger.info("[GET_ITEMS] Показываем пользователю (ещё не сгенерированных): %d товаров, всего ~%s",
+                len(page.items), page.total)
+    for item in page.items[:3]:  # Первые 3 товара
+        logger.debug("[GET_ITEMS] Товар: id=%s, name='%s'", item["id"], item["name"])
     
-    return items_list
+    response = FastJSONResponse(page.items)
+    set_page_headers(response, page)
+    set_etag_headers(response, etag)
+    return response
 
-@router.get("/get_items_sellers")
+@router.get("/get_items_sellers", response_model=list[UserGenerationView], response_class=FastJSONResponse)
 async def get_user_generations(
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
-) -> list[UserGenerationView]:
+) -> Response:
     """
     Получить AI-генерации ТЕКУЩЕГО пользователя с данными о товарах.
     Показывает только те товары, для которых пользователь создал описания.
+
+    Генерации и товары читаются одним запросом (LEFT JOIN) только колонками
+    `UserGenerationView` и кодируются в JSON без валидации pydantic.
+    ETag — как у `/get_items`, на совпавший `If-None-Match` ответ — 304.
     """
     logger.info("[GET_ITEMS_SELLERS] Запрос от user_id=%s", current_user.id)
     
+    etag = await listing_etag(db, current_user.id, "get_items_sellers")
+    if etag_matches(if_none_match, etag):
+        logger.info("[GET_ITEMS_SELLERS] Не изменилось с прошлого запроса (ETag %s)", etag)
+        return not_modified(etag)
+    
     stmt = (
-        select(UserGeneration)
+        generations_with_items()
         .where(UserGeneration.user_id == current_user.id)
-        .options(selectinload(UserGeneration.catalog_item))
         .order_by(UserGeneration.created_at.desc())
     )
     result = await db.execute(stmt)
-    generations = result.scalars().all()
+    generations = row_dicts(result.all(), GENERATION_COLUMNS, nested=("catalog_item", ITEM_COLUMNS))
     
     logger.info("[GET_ITEMS_SELLERS] Найдено генераций: %d", len(generations))
     if generations:
         for gen in generations[:3]:  # Первые 3
-            item_name = gen.catalog_item.name if gen.catalog_item else "УДАЛЁН"
-            logger.debug("[GET_ITEMS_SELLERS] Генерация: id=%s, item_name='%s'", gen.id, item_name)
+            item_name = gen["catalog_item"]["name"] if gen["catalog_item"] else "УДАЛЁН"
+            logger.debug("[GET_ITEMS_SELLERS] Генерация: id=%s, item_name='%s'", gen["id"], item_name)
     
-    return generations
\ No newline at end of file
+    response = FastJSONResponse(generations)
+    set_etag_headers(response, etag)
+    return response
\ No newline at end of file
@@ -1,103 +1,166 @@
-from fastapi import Depends, APIRouter, HTTPException
+from typing import Literal, Optional
+import asyncio
+import json
+import logging
+
+from fastapi import Depends, APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-import httpx
 
-from services.database import get_db
-from schemas.catalog import CatalogItemCreate
-from models.catalog_items import CatalogItem
-from models.log import Log
 from models.users import User
+from schemas.catalog import CatalogLoadJobView
 from services.auth import get_current_admin_user
-from .utils import map_api_data_to_item
+from services.catalog_jobs import catalog_job_manager
+from services.database import get_db
+from services.near_duplicates import duplicate_stats, rebuild_duplicate_groups
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Обычная загрузка пишет строку log на каждый добавленный товар и каждую
+# страницу — отдельной транзакцией INSERT ... ON CONFLICT; больше — только
+# режимом large (COPY чанками без построчных логов)
+MAX_LOAD_COUNT = 10000
+# Синхронизация и режим large держат в памяти только текущую страницу/чанк
+MAX_SYNC_COUNT = 1_000_000
+
+# Фоновый пересчёт групп почти-дубликатов (один на процесс)
+_duplicates_task: Optional[asyncio.Task] = None
+
+
+def _validate_count(count: int, mode: str = 'load') -> str | None:
+    limit = MAX_LOAD_COUNT if mode == 'load' else MAX_SYNC_COUNT
+    if count <= 0 or type(count) != int:
+        return "Некорректное количество товаров"
+    if count >= limit:
+        return f"Лимит {limit} товаров"
+    return None
+
+
+def _job_event_stream(job_id: int) -> StreamingResponse:
+    async def event_generator():
+        async for message in catalog_job_manager.subscribe(job_id):
+            yield f"data: {message}\n\n"
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
 
 @router.get("/loading_words_db/{count}")
 async def func(
     count: int,
-    db: AsyncSession = Depends(get_db),
     current_admin: User = Depends(get_current_admin_user)
 ):
-    """Загружает товары со Sima-Land в ОБЩИЙ КАТАЛОГ с потоковой передачей прогресса (только для админов)"""
-    
-    async def event_generator():
-        if count <= 0 or type(count) != int:  
-            yield "data: Некорректное количество товаров\n\n"
-            return
-        
-        if count >= 10000:
-            yield "data: Лимит 10000 товаров\n\n"
-            return
-
-        copy_count = count
-        timeout = httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=5.0)
-        page_number = 1
-        pagination = (count // 50) + 1
-        
-        yield f"data: Начинаю загрузку {count} товаров в общий каталог\n\n"
-
-        while 0 < pagination:
-            async with httpx.AsyncClient(
-                base_url="https://www.sima-land.ru/api/v3",
-                headers={'Content-Type': 'application/json'},
-                timeout=timeout,
-                follow_redirects=False
-            ) as client:
-                try:
-                    response = await client.get(f"/item/?page={page_number}")
-                    response.raise_for_status()
-                    items = response.json().get("items", [])
-                except httpx.HTTPError as e:
-                    yield f"data: Ошибка API: {str(e)}\n\n"
-                    return
-                
-            msg = f"Страница {page_number}: получены данные ({len(items)} товаров)"
-            yield f"data: {msg}\n\n"
-
-            for item in items:
-                if copy_count <= 0:  
-                    break
-
-                try:
-                    item_data = map_api_data_to_item(item)
-                    catalog_item = CatalogItem(**item_data)
-
-                    # Проверяем, есть ли уже в каталоге
-                    result = await db.execute(
-                        select(CatalogItem).where(CatalogItem.id_item == catalog_item.id_item).limit(1)
-                    )
-                    existing_item = result.scalar_one_or_none()
-                    
-                    if not existing_item:
-                        db.add(catalog_item)
-                        await db.commit()
-                        await db.refresh(catalog_item)
-                        
-                        # Логируем успешное добавление
-                        log = Log(
-                            user_id=current_admin.id,
-                            action='catalog_load',
-                            item_id=catalog_item.id_item,
-                            message=f"Товар добавлен в каталог: {catalog_item.name}",
-                            status='completed'
-                        )
-                        db.add(log)
-                        await db.commit()
-
-                        yield f"data: ✓ Товар [{catalog_item.id_item}] добавлен в каталог | Осталось {copy_count - 1}\n\n"
-                        copy_count -= 1
-                    else:
-                        yield f"data: ⊘ Товар [{catalog_item.id_item}] уже есть в каталоге\n\n"
-                        copy_count -= 1
-                except Exception as e:
-                    yield f"data: ⚠ Ошибка при обработке товара: {str(e)}\n\n"
-                    copy_count -= 1
-
-            page_number += 1
-            pagination -= 1
-
-        yield "data: ✓ Загрузка в каталог завершена\n\n"
-
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
\ No newline at end of file
+    """
+    Загружает товары со Sima-Land в ОБЩИЙ КАТАЛОГ с потоковой передачей прогресса (только для админов).
+    Загрузка выполняется фоновой задачей: обрыв соединения её не прерывает,
+    к прогрессу можно переподключиться через /load_jobs/{job_id}/events.
+    Начиная с MAX_LOAD_COUNT товаров используется режим large (запись чанками,
+    прогресс по чанкам).
+    """
+    mode = 'load' if count < MAX_LOAD_COUNT else 'large'
+    error = _validate_count(count, mode)
+    if error:
+        async def error_generator():
+            event = json.dumps({"type": "error", "message": error}, ensure_ascii=False)
+            yield f"data: {event}\n\n"
+        return StreamingResponse(error_generator(), media_type="text/event-stream")
+
+    job = await catalog_job_manager.create_job(count, user_id=current_admin.id, mode=mode)
+    return _job_event_stream(job.id)
+
+
+@router.post("/load_jobs", response_model=CatalogLoadJobView)
+async def create_load_job(
+    count: int,
+    mode: Literal['load', 'large', 'sync', 'replay'] = 'load',
+    write_budget: Optional[int] = Query(None, ge=0),
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Ставит задачу каталога в очередь фоновых задач (только для админов).
+    - mode=load: добавить новые товары
+    - mode=large: добавить новые товары крупного каталога (до MAX_SYNC_COUNT) чанками
+      с постоянным расходом памяти; в PostgreSQL запись идёт через COPY
+    - mode=sync: обновить изменившиеся цены/остатки и добавить новые; `write_budget`
+      ограничивает число записанных строк за задачу
+    - mode=replay: как sync, но по сохранённым ответам API, без обращений к сети
+    """
+    error = _validate_count(count, mode)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    return await catalog_job_manager.create_job(
+        count, user_id=current_admin.id, mode=mode, write_budget=write_budget
+    )
+
+
+@router.get("/load_jobs", response_model=list[CatalogLoadJobView])
+async def list_load_jobs(
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """Последние 50 задач загрузки каталога (только для админов)"""
+    return await catalog_job_manager.list_jobs()
+
+
+@router.get("/load_jobs/{job_id}", response_model=CatalogLoadJobView)
+async def get_load_job(
+    job_id: int,
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """Состояние и чекпоинт задачи загрузки (только для админов)"""
+    job = await catalog_job_manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Задача {job_id} не найдена")
+    return job
+
+
+@router.get("/load_jobs/{job_id}/events")
+async def stream_load_job(
+    job_id: int,
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    SSE-поток прогресса задачи; к нему можно подключаться любым числом клиентов (только для админов).
+    Каждое событие — JSON с полем type: status, progress, metrics, done или error.
+    """
+    job = await catalog_job_manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Задача {job_id} не найдена")
+    return _job_event_stream(job_id)
+
+
+@router.get("/load_jobs/{job_id}/metrics")
+async def get_load_job_metrics(
+    job_id: int,
+    current_admin: User = Depends(get_current_admin_user)
+):
+    """
+    Метрики стадий конвейера задачи (fetch → map → write): скорость,
+    время работы, ожидания и заполненность очередей, а также запросы к API:
+    частота, текущий адаптивный лимит, повторы и ответы 429/5xx (только для админов)
+    """
+    metrics = catalog_job_manager.get_metrics(job_id)
+    if metrics is None:
+        raise HTTPException(status_code=404, detail=f"Метрики задачи {job_id} недоступны")
+    return {"job_id": job_id, **metrics}
+
+
+@router.post("/duplicates/rebuild")
+async def rebuild_duplicates(current_admin: User = Depends(get_current_admin_user)) -> dict:
+    """Пересчитывает группы почти-дубликатов всего каталога в фоне (например, после миграции)"""
+    global _duplicates_task
+    if _duplicates_task is not None and not _duplicates_task.done():
+        return {"started": False, "detail": "Пересчёт уже выполняется"}
+    _duplicates_task = asyncio.create_task(rebuild_duplicate_groups())
+    logger.info("[DUPLICATES] Пересчёт групп запущен admin_id=%s", current_admin.id)
+    return {"started": True}
+
+
+@router.get("/duplicates/stats")
+async def duplicates_stats(
+    db: AsyncSession = Depends(get_db),
+    current_admin: User = Depends(get_current_admin_user)
+) -> dict:
+    """Число групп почти-дубликатов и товаров в них; идёт ли пересчёт"""
+    stats = await duplicate_stats(db)
+    stats["rebuilding"] = _duplicates_task is not None and not _duplicates_task.done()
+    return stats
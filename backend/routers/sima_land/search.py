@@ -1,174 +1,369 @@
-from fastapi import Depends, APIRouter
+from fastapi import Depends, APIRouter, HTTPException, Query, Response
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, func
-from sqlalchemy.orm import selectinload
 import logging
-import re
+from dataclasses import replace
+from typing import Literal, Optional
 
 from services.database import get_db
 from schemas.catalog import CatalogItemView
 from models.catalog_items import CatalogItem
 from models.user_generations import UserGeneration
 from models.users import User
-from services.auth import get_current_active_user
+from services.auth import get_current_active_user, get_current_admin_user
+from services.catalog_browse import browse_catalog_page, catalog_facets
+from services.catalog_facets import BrowseFilters, catalog_facet_index
+from services.catalog_search import search_catalog, search_catalog_page, search_ranking
+from services.generated_items import generated_items
+from services.generation_search import search_generations_page
+from services.fast_json import FastJSONResponse
+from services.pagination import set_page_headers
+from services.search_cache import normalize_query, search_result_cache
+from services.search_index import catalog_search_index
+from services.similar_index import catalog_similar_index
+from services.spelling_index import catalog_spelling_index
+from services.suggest_index import catalog_suggest_index
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.post("/search_item_to_word/{word}", response_model=list[dict])
+# Максимальный размер страницы поиска
+MAX_PAGE_SIZE = 500
+# Максимальное число подсказок
+MAX_SUGGESTIONS = 50
+# Максимальное число похожих товаров и вариантов товара
+MAX_SIMILAR = 50
+MAX_SIBLINGS = 200
+
+@router.post("/search_item_to_word/{word}", response_model=list[dict], response_class=FastJSONResponse)
 async def search_catalog_items(
     word: str,
+    mode: Literal['fulltext', 'substring', 'similar', 'fuzzy'] = 'fulltext',
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
-) -> list:
+) -> FastJSONResponse:
     """
     Поиск товаров в ОБЩЕМ КАТАЛОГЕ по ключевому слову с флагом generated.
-    Ищет в названии товара (name) и slug.
-    """
-    
-    # Экранируем ввод пользователя, используем границы слова (без спец-символов)
-    escaped = f"%{word}%"
-    logger.info("[SEARCH_CATALOG] Поиск по слову: '%s', regex паттерн: '%s'", word, escaped)
-    
-    stmt = select(CatalogItem).where(
-            CatalogItem.name.ilike(escaped)
-    ).limit(100)
+    Режимы (`?mode=`):
+    - fulltext: по словам названия (name) и slug с учётом словоформ, по релевантности;
+    - substring: по фрагменту name, slug или артикула (id_item);
+    - similar: нечёткий поиск по сходству триграмм, по убыванию сходства;
+    - fuzzy: fulltext с исправлением опечаток в словах запроса («кружька» → «кружка»).
 
+    Постраничный вывод по `limit` товаров: курсор следующей страницы — в
+    заголовке `X-Next-Cursor` (передаётся обратно как `?cursor=`), оценка
+    общего числа для первой страницы — в `X-Total-Estimate` / `X-Total-Exact`.
 
+    Страницы результатов кешируются (общие для всех пользователей) до
+    следующей записи каталога, отдельно для каждой ранжировки (БД или индекс
+    в памяти, пока он строится); флаг generated вычисляется для каждого запроса.
+    Ответ кодируется в JSON напрямую (`FastJSONResponse`).
+    """
+    logger.info("[SEARCH_CATALOG] Поиск по слову: '%s', режим: %s", word, mode)
 
-    result = await db.execute(stmt)
-    items = result.scalars().all()
+    word = normalize_query(word, mode)
+    # Результат зависит от того, построены ли индексы: ранжировка — часть ключа
+    key = (mode, word, cursor, limit, search_ranking(mode, db.bind.dialect.name))
+    page = search_result_cache.get(key)
+    if page is None:
+        version = search_result_cache.version
+        try:
+            page = await search_catalog_page(db, word, limit=limit, mode=mode, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # В кеш — только данные каталога, общие для всех пользователей
+        search_result_cache.put(key, page, version)
+    items = page.items
 
-    print(items)
-    
     logger.info("[SEARCH_CATALOG] Найдено товаров: %d", len(items))
     if items:
         for item in items[:5]:  # Логируем первые 5
-            logger.debug("[SEARCH_CATALOG] Товар: id=%s, name='%s', slug='%s'", item.id, item.name, item.slug)
+            logger.debug("[SEARCH_CATALOG] Товар: id=%s, name='%s', slug='%s'", item["id"], item["name"], item["slug"])
     
     if not items:
         logger.warning("[SEARCH_CATALOG] Слово '%s' не найдено в каталоге", word)
-        return []
-    
-    # Получаем список catalog_item_id для которых у пользователя есть генерации
-    stmt_generated = select(UserGeneration.catalog_item_id).where(
-        UserGeneration.user_id == current_user.id
-    )
-    result_generated = await db.execute(stmt_generated)
-    generated_ids = set(result_generated.scalars().all())
+        flags = []
+    else:
+        # Какие товары страницы у пользователя уже сгенерированы
+        generated = await generated_items.bitmap(db, current_user.id)
+        flags = generated.contains_many([item["id"] for item in items]).tolist()
     
     # Формируем ответ с флагом generated
-    items_with_flag = []
-    for item in items:
-        item_dict = {
-            "id": item.id,
-            "id_item": item.id_item,
-            "uid": item.uid,
-            "sid": item.sid,
-            "name": item.name,
-            "slug": item.slug,
-            "stuff": item.stuff,
-            "category_id": item.category_id,
-            "photoUrl": item.photoUrl,
-            "image_title": item.image_title,
-            "raw_description": item.raw_description,
-            "price": item.price,
-            "balance": item.balance,
-            "created_at": item.created_at,
-            "updated_at": item.updated_at,
-            "generated": item.id in generated_ids
-        }
-        items_with_flag.append(item_dict)
-    
-    return items_with_flag
+    response = FastJSONResponse([{**item, "generated": flag} for item, flag in zip(items, flags)])
+    set_page_headers(response, page)
+    return response
 
 
-@router.post("/search_generated_items/{word}", response_model=list[dict])
-async def search_generated_items(
-    word: str,
+def catalog_item_dict(item: CatalogItem) -> dict:
+    """Поля товара в ответе поиска (без флага generated)"""
+    return {
+        "id": item.id,
+        "id_item": item.id_item,
+        "uid": item.uid,
+        "sid": item.sid,
+        "name": item.name,
+        "slug": item.slug,
+        "stuff": item.stuff,
+        "category_id": item.category_id,
+        "photoUrl": item.photoUrl,
+        "image_title": item.image_title,
+        "raw_description": item.raw_description,
+        "price": item.price,
+        "balance": item.balance,
+        "created_at": item.created_at,
+        "updated_at": item.updated_at,
+    }
+
+
+@router.get("/browse")
+async def browse_catalog_items(
+    response: Response,
+    category_id: Optional[str] = None,
+    stuff: Optional[str] = None,
+    price_min: Optional[float] = Query(None, ge=0),
+    price_max: Optional[float] = Query(None, ge=0),
+    in_stock: bool = False,
+    sort: Literal['id', 'price_asc', 'price_desc'] = 'id',
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> dict:
+    """
+    Просмотр ОБЩЕГО КАТАЛОГА с фильтрами: категория, материал (stuff), цена
+    от `price_min` (включительно) до `price_max` (не включительно), только в
+    наличии (`in_stock`). Порядок — по id или по цене.
+
+    Ответ: `items` — товары страницы с флагом generated, `facets` (только на
+    первой странице) — число товаров под фильтрами (`total`) и счётчики по
+    категориям, материалам и ценовым корзинам; счётчики фасета не учитывают
+    фильтр по нему самому. Постраничный вывод — как у `/search_item_to_word`.
+    """
+    filters = BrowseFilters(category_id, price_min, price_max, in_stock, stuff)
+    key = ("browse", tuple(filters.key()), sort, cursor, limit)
+    cached = search_result_cache.get(key)
+    if cached is None:
+        version = search_result_cache.version
+        try:
+            found = await browse_catalog_page(db, filters, sort=sort, limit=limit, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        facets = await catalog_facets(db, filters) if cursor is None else None
+        cached = (replace(found, items=[catalog_item_dict(item) for item in found.items]), facets)
+        search_result_cache.put(key, cached, version)
+    page, facets = cached
+    set_page_headers(response, page)
+    logger.info("[BROWSE_CATALOG] %s: %d товаров", filters, len(page.items))
+
+    generated = await generated_items.bitmap(db, current_user.id)
+    flags = generated.contains_many([item["id"] for item in page.items]).tolist()
+    return {
+        "items": [{**item, "generated": flag} for item, flag in zip(page.items, flags)],
+        "facets": facets,
+    }
+
+
+@router.get("/browse/facets/memory")
+async def facet_index_memory(current_admin: User = Depends(get_current_admin_user)) -> dict:
+    """Состояние и оценка памяти индекса фасетов просмотра каталога"""
+    return catalog_facet_index.memory_report()
+
+
+@router.get("/similar/{catalog_item_id}", response_model=list[dict])
+async def similar_catalog_items(
+    catalog_item_id: int,
+    limit: int = Query(10, ge=1, le=MAX_SIMILAR),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ) -> list:
     """
-    Поиск товаров, которые уже сгенерированы текущим пользователем.
-    Возвращает список `UserGeneration` с вложенным `catalog_item`.
+    Товары каталога, похожие на данный: по TF-IDF символьных n-грамм
+    названия, материала и заголовка изображения (косинусная близость в
+    `similarity`), самые похожие первыми. Для товаров, которые пользователь
+    уже генерировал, — флаг generated и его генерации с текстом
+    (`generations`), чтобы переиспользовать описание. Пока индекс не построен (или
+    выключен SIMILAR_INDEX_ENABLED), похожие ищутся нечётким поиском по
+    названию, `similarity` — null.
     """
+    item = await db.get(CatalogItem, catalog_item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Товар не найден")
 
-    # Экранируем ввод пользователя, используем границы слова
-    escaped = re.escape(word.lower())
-    logger.info("[SEARCH_GENERATED] Поиск по слову: '%s', user_id=%s, regex паттерн: '%s'", word, current_user.id, escaped)
-
-    stmt = (
-        select(UserGeneration)
-        .join(CatalogItem, UserGeneration.catalog_item)
-        .where(
-            UserGeneration.user_id == current_user.id,
-            or_(
-                CatalogItem.name.regexp_match(escaped, flags='i'),
-            )
+    if catalog_similar_index.ready:
+        pairs = [
+            (catalog_item_dict(other), score)
+            for other, score in await catalog_similar_index.fetch(db, catalog_item_id, limit)
+        ]
+    else:
+        found = await search_catalog(db, item.name, limit=limit + 1, mode="similar")
+        pairs = [(other, None) for other in found if other["id"] != catalog_item_id][:limit]
+    logger.info("[SIMILAR] Товар %s: %d похожих", catalog_item_id, len(pairs))
+    if not pairs:
+        return []
 
+    flags, generations = await user_generations_of(db, current_user.id, [other["id"] for other, _ in pairs])
+    return [
+        {
+            **other,
+            "similarity": score,
+            "generated": flag,
+            "generations": generations.get(other["id"], []),
+        }
+        for (other, score), flag in zip(pairs, flags)
+    ]
+
+
+async def user_generations_of(db: AsyncSession, user_id: int, item_ids: list[int]) -> tuple[list[bool], dict[int, list[dict]]]:
+    """
+    Флаги generated для товаров `item_ids` и генерации пользователя по ним
+    (id товара → список {id, generation_name, ai_description, ai_keywords}) —
+    чтобы предложить переиспользовать готовый текст.
+    """
+    generated = await generated_items.bitmap(db, user_id)
+    flags = generated.contains_many(item_ids).tolist()
+    generations: dict[int, list[dict]] = {}
+    flagged = [item_id for item_id, flag in zip(item_ids, flags) if flag]
+    if flagged:
+        result = await db.execute(
+            select(
+                UserGeneration.id, UserGeneration.catalog_item_id, UserGeneration.generation_name,
+                UserGeneration.ai_description, UserGeneration.ai_keywords,
+            )
+            .where(UserGeneration.user_id == user_id, UserGeneration.catalog_item_id.in_(flagged))
+            .order_by(UserGeneration.id)
         )
-        .options(selectinload(UserGeneration.catalog_item))
-        .limit(200)
+        for gen_id, item_id, name, description, keywords in result.all():
+            generations.setdefault(item_id, []).append({
+                "id": gen_id, "generation_name": name, "ai_description": description, "ai_keywords": keywords,
+            })
+    return flags, generations
+
+
+@router.get("/siblings/{catalog_item_id}", response_model=list[dict])
+async def sibling_catalog_items(
+    catalog_item_id: int,
+    limit: int = Query(50, ge=1, le=MAX_SIBLINGS),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> list:
+    """
+    Почти-дубликаты товара — варианты того же товара (цвет, размер) из его
+    группы, найденной при загрузке каталога. Для вариантов, которые
+    пользователь уже генерировал, приходят его генерации с текстом
+    (`generations`): описание можно переиспользовать вместо новой платной
+    генерации. Товар без группы — пустой список.
+    """
+    item = await db.get(CatalogItem, catalog_item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Товар не найден")
+    if item.duplicate_group_id is None:
+        return []
+
+    result = await db.execute(
+        select(CatalogItem)
+        .where(CatalogItem.duplicate_group_id == item.duplicate_group_id, CatalogItem.id != item.id)
+        .order_by(CatalogItem.id)
+        .limit(limit)
     )
+    siblings = result.scalars().all()
+    logger.info("[SIBLINGS] Товар %s: группа %s, %d вариантов", catalog_item_id, item.duplicate_group_id, len(siblings))
+    flags, generations = await user_generations_of(db, current_user.id, [sibling.id for sibling in siblings])
+    return [
+        {**catalog_item_dict(sibling), "generated": flag, "generations": generations.get(sibling.id, [])}
+        for sibling, flag in zip(siblings, flags)
+    ]
+
+
+@router.get("/similar_index/memory")
+async def similar_index_memory(current_admin: User = Depends(get_current_admin_user)) -> dict:
+    """Состояние и оценка памяти индекса похожих товаров"""
+    return catalog_similar_index.memory_report()
+
+
+@router.get("/spelling_index/memory")
+async def spelling_index_memory(current_admin: User = Depends(get_current_admin_user)) -> dict:
+    """Состояние и оценка памяти словаря исправления опечаток"""
+    return catalog_spelling_index.memory_report()
+
+
+@router.get("/generated_items/memory")
+async def generated_items_memory(current_admin: User = Depends(get_current_admin_user)) -> dict:
+    """Память множеств сгенерированных товаров по пользователям"""
+    return generated_items.memory_report()
+
+
+@router.get("/search_cache/stats")
+async def search_cache_stats(current_admin: User = Depends(get_current_admin_user)) -> dict:
+    """Метрики кеша результатов поиска: попадания, промахи, доля попаданий, версия каталога"""
+    return search_result_cache.stats()
+
+
+@router.get("/search_index/memory")
+async def search_index_memory(current_admin: User = Depends(get_current_admin_user)) -> dict:
+    """Состояние и оценка памяти инвертированного индекса каталога в памяти"""
+    return catalog_search_index.memory_report()
+
+
+@router.get("/suggest", response_model=list[dict])
+async def suggest_catalog_items(
+    q: str = Query(..., min_length=1, max_length=300),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> list:
+    """
+    Подсказки для ввода: названия товаров, начинающиеся с `q` (без учёта
+    регистра), самые популярные первыми — по числу генераций, затем по
+    остатку. Пока индекс подсказок не построен (или выключен
+    SUGGEST_INDEX_ENABLED), подсказки берутся из полнотекстового поиска.
+    """
+    if catalog_suggest_index.ready:
+        pairs = catalog_suggest_index.suggest(q, limit)
+    else:
+        pairs = [(item["id"], item["name"]) for item in await search_catalog(db, q, limit=limit)]
+    logger.debug("[SUGGEST] '%s': %d подсказок", q, len(pairs))
+    return [{"id": item_id, "name": name} for item_id, name in pairs]
+
+
+@router.get("/suggest/memory")
+async def suggest_index_memory(current_admin: User = Depends(get_current_admin_user)) -> dict:
+    """Состояние и оценка памяти индекса подсказок"""
+    return catalog_suggest_index.memory_report()
+
+
+@router.post("/search_generated_items/{word}", response_model=list[dict], response_class=FastJSONResponse)
+async def search_generated_items(
+    word: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> FastJSONResponse:
+    """
+    Поиск товаров, которые уже сгенерированы текущим пользователем: по
+    названию товара, ai_keywords и ai_description с учётом словоформ, по
+    релевантности. Генерации — в формате `/get_items_sellers` (с вложенным
+    `catalog_item`); постраничный вывод — как у `/search_item_to_word`.
+    """
+    logger.info("[SEARCH_GENERATED] Поиск по слову: '%s', user_id=%s", word, current_user.id)
 
-    result = await db.execute(stmt)
-    gens = result.scalars().all()
+    try:
+        page = await search_generations_page(db, current_user.id, word, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    gens = page.items
 
     logger.info("[SEARCH_GENERATED] Найдено генераций: %d", len(gens))
     if gens:
         for gen in gens[:5]:  # Логируем первые 5
-            item_name = gen.catalog_item.name if gen.catalog_item else "УДАЛЁН"
-            logger.debug("[SEARCH_GENERATED] Генерация: id=%s, item_name='%s'", gen.id, item_name)
+            item_name = gen["catalog_item"]["name"] if gen["catalog_item"] else "УДАЛЁН"
+            logger.debug("[SEARCH_GENERATED] Генерация: id=%s, item_name='%s'", gen["id"], item_name)
 
     if not gens:
         logger.warning("[SEARCH_GENERATED] Ничего не найдено для user_id=%s", current_user.id)
-        return []
-
-    out = []
-    for gen in gens:
-        ci = gen.catalog_item
-        
-        # Защита от удалённого товара
-        if ci is None:
-            catalog_item_data = {
-                "id": None,
-                "id_item": None,
-                "name": "ТОВАР УДАЛЁН",
-                "slug": "",
-                "price": 0,
-                "photoUrl": "",
-                "category_id": None,
-                "stuff": None,
-                "raw_description": None,
-            }
-        else:
-            catalog_item_data = {
-                "id": ci.id,
-                "id_item": ci.id_item,
-                "name": ci.name,
-                "slug": ci.slug,
-                "price": ci.price,
-                "photoUrl": ci.photoUrl,
-                "category_id": ci.category_id,
-                "stuff": ci.stuff,
-                "raw_description": ci.raw_description,
-            }
-        
-        gen_dict = {
-            "id": gen.id,
-            "user_id": gen.user_id,
-            "catalog_item_id": gen.catalog_item_id,
-            "generation_name": gen.generation_name,
-            "ai_description": gen.ai_description,
-            "ai_keywords": gen.ai_keywords,
-            "ai_prompt_version": gen.ai_prompt_version,
-            "excel_exported": gen.excel_exported,
-            "export_count": gen.export_count,
-            "created_at": gen.created_at,
-            "updated_at": gen.updated_at,
-            "catalog_item": catalog_item_data
-        }
-        out.append(gen_dict)
 
-    return out
\ No newline at end of file
+    response = FastJSONResponse(gens)
+    set_page_headers(response, page)
+    return response
\ No newline at end of file
@@ -78,3 +78,27 @@ class UserGenerationWithItem(UserGenerationView):
     item_photoUrl: Optional[str] = None
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class CatalogLoadJobView(BaseModel):
+    """Схема фоновой задачи загрузки каталога"""
+    id: int
+    user_id: Optional[int] = None
+    mode: str
+    requested_count: int
+    write_budget: Optional[int] = None
+    last_page: int
+    processed_count: int
+    inserted_count: int
+    skipped_count: int
+    updated_count: int
+    unchanged_count: int
+    deferred_count: int
+    error_count: int
+    status: str
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
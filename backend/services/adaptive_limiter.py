@@ -0,0 +1,142 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Окно (сек), по которому считается текущая частота запросов
+RATE_WINDOW = 10.0
+
+
+@dataclass
+class LimiterStats:
+    """
+    Накопительные счётчики запросов к внешнему API: повторы, ответы о
+    перегрузке (429/5xx, сетевые ошибки) и окончательные ошибки страниц
+    """
+    requests: int = 0
+    retries: int = 0
+    throttled: int = 0
+    errors: int = 0
+
+    def since(self, start: "LimiterStats") -> "LimiterStats":
+        return LimiterStats(**{key: value - getattr(start, key) for key, value in asdict(self).items()})
+
+
+class AdaptiveLimiter:
+    """
+    Адаптивный лимит одновременных запросов (AIMD).
+
+    Пока ответы успешны и задержка не выше `latency_factor` × лучшей
+    наблюдавшейся, лимит растёт примерно на 1 за каждое «окно» из `limit`
+    запросов. Ответы, ничего не говорящие о нагрузке (прочие 4xx, отмена),
+    только освобождают место. Ответ 429/5xx или сетевая ошибка уменьшают лимит вдвое
+    (не чаще раза на окно: ответы уже отправленных запросов не
+    схлопывают его повторно), а `Retry-After` приостанавливает новые запросы.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        initial_limit: Optional[int] = None,
+        latency_factor: float = 2.0,
+    ):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(min(initial_limit or self.max_limit, self.max_limit))
+        self.limit = max(self.limit, self.min_limit)
+        self.latency_factor = latency_factor
+        self.stats = LimiterStats()
+        self._in_flight = 0
+        self._best_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._completed: deque[float] = deque()
+        self._changed: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def changed(self) -> asyncio.Event:
+        # Создаётся лениво: синглтон клиента может пережить event loop (тесты)
+        loop = asyncio.get_running_loop()
+        if self._changed is None or self._loop is not loop:
+            self._changed = asyncio.Event()
+            self._loop = loop
+            self._in_flight = 0
+        return self._changed
+
+    async def acquire(self) -> float:
+        """Ждёт свободного места и конца паузы Retry-After; возвращает момент старта запроса"""
+        changed = self.changed
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            # Между проверкой и захватом нет await, поэтому блокировка не нужна
+            if self._in_flight < int(self.limit):
+                break
+            changed.clear()
+            await changed.wait()
+        self._in_flight += 1
+        self.stats.requests += 1
+        return time.monotonic()
+
+    def release(
+        self,
+        started: float,
+        ok: Optional[bool] = True,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """
+        Завершение запроса: ok=True — успешный ответ, ok=False — перегрузка
+        (429/5xx, сетевая ошибка), ok=None — ответ без сигнала о нагрузке
+        (прочие 4xx, отмена): лимит не меняется. retry_after — пауза перед
+        следующими запросами, сек.
+        Синхронный, чтобы его можно было безопасно вызывать из finally при отмене.
+        """
+        now = time.monotonic()
+        latency = now - started
+        self._in_flight -= 1
+        self._completed.append(now)
+        while self._completed and self._completed[0] < now - RATE_WINDOW:
+            self._completed.popleft()
+
+        if ok is None:
+            pass
+        elif ok:
+            if self._best_latency is None or latency < self._best_latency:
+                self._best_latency = latency
+            if latency <= self._best_latency * self.latency_factor + 0.01:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        else:
+            self.stats.throttled += 1
+            # Запросы, начатые до предыдущего снижения, лимит больше не трогают
+            if started >= self._last_decrease:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self._last_decrease = now
+                logger.warning("[RATE_LIMIT] Перегрузка API, лимит снижен до %d", int(self.limit))
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+        self.changed.set()
+
+    def rate(self) -> float:
+        """Завершённых запросов в секунду за последние RATE_WINDOW секунд"""
+        now = time.monotonic()
+        recent = [t for t in self._completed if t >= now - RATE_WINDOW]
+        if not recent:
+            return 0.0
+        return len(recent) / max(min(RATE_WINDOW, now - recent[0]), 1.0)
+
+    def snapshot(self, since: Optional[LimiterStats] = None) -> dict:
+        stats = self.stats.since(since) if since is not None else self.stats
+        return {
+            **asdict(stats),
+            "limit": int(self.limit),
+            "in_flight": self._in_flight,
+            "requests_per_second": round(self.rate(), 1),
+        }
@@ -0,0 +1,141 @@
+"""
+Сжатое множество неотрицательных 32-битных целых (roaring bitmap).
+
+Значения делятся на блоки по старшим 16 битам. Блок, в котором не больше
+ARRAY_LIMIT значений, хранится отсортированным массивом младших 16 бит
+(2 байта на значение), плотный блок — битовой картой на 65536 бит (8 КБ).
+Так множество из десятков тысяч id товаров занимает десятки килобайт, а
+проверка пачки id — векторные операции numpy по блокам.
+"""
+from typing import Iterable
+
+import numpy as np
+
+# Больше стольких значений блок хранится битовой картой: 4096 * 2 байта = 8 КБ
+ARRAY_LIMIT = 4096
+BITMAP_WORDS = 65536 // 64
+
+
+def _to_bitmap(values: np.ndarray) -> np.ndarray:
+    words = np.zeros(BITMAP_WORDS, dtype=np.uint64)
+    np.bitwise_or.at(words, values >> 6, np.left_shift(np.uint64(1), (values & 63).astype(np.uint64)))
+    return words
+
+
+def _from_bitmap(words: np.ndarray) -> np.ndarray:
+    bits = np.unpackbits(words.view(np.uint8), bitorder="little")
+    return np.flatnonzero(bits).astype(np.uint16)
+
+
+def _is_bitmap(container: np.ndarray) -> bool:
+    return container.dtype == np.uint64
+
+
+class RoaringBitmap:
+    """Множество id: add/discard/in, пакетная проверка `contains_many`"""
+
+    def __init__(self, values: Iterable[int] = ()):
+        # Старшие 16 бит → блок (np.uint16 — массив, np.uint64 — битовая карта)
+        self._containers: dict[int, np.ndarray] = {}
+        self._size = 0
+        values = np.unique(np.fromiter(values, dtype=np.int64))
+        if len(values):
+            self._bulk_load(values.astype(np.uint32))
+
+    def _bulk_load(self, values: np.ndarray) -> None:
+        highs = values >> 16
+        bounds = np.flatnonzero(np.diff(highs)) + 1
+        for chunk in np.split(values, bounds):
+            low = (chunk & 0xFFFF).astype(np.uint16)
+            self._containers[int(chunk[0] >> 16)] = _to_bitmap(low) if len(low) > ARRAY_LIMIT else low
+        self._size = len(values)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, value: int) -> bool:
+        value = int(value)
+        container = self._containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if _is_bitmap(container):
+            return bool((int(container[low >> 6]) >> (low & 63)) & 1)
+        position = np.searchsorted(container, low)
+        return position < len(container) and container[position] == low
+
+    def add(self, value: int) -> None:
+        value = int(value)
+        if value in self:
+            return
+        high, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(high)
+        if container is None:
+            self._containers[high] = np.array([low], dtype=np.uint16)
+        elif _is_bitmap(container):
+            container[low >> 6] |= np.uint64(1) << np.uint64(low & 63)
+        else:
+            container = np.insert(container, np.searchsorted(container, low), low)
+            self._containers[high] = _to_bitmap(container) if len(container) > ARRAY_LIMIT else container
+        self._size += 1
+
+    def discard(self, value: int) -> None:
+        value = int(value)
+        if value not in self:
+            return
+        high, low = value >> 16, value & 0xFFFF
+        container = self._containers[high]
+        if _is_bitmap(container):
+            container[low >> 6] &= ~(np.uint64(1) << np.uint64(low & 63))
+            # Поредевшая битовая карта снова становится массивом (в ней больше ARRAY_LIMIT - 1 значений)
+            if self._cardinality(container) <= ARRAY_LIMIT:
+                self._containers[high] = _from_bitmap(container)
+        else:
+            container = container[container != low]
+            if len(container):
+                self._containers[high] = container
+            else:
+                del self._containers[high]
+        self._size -= 1
+
+    @staticmethod
+    def _cardinality(container: np.ndarray) -> int:
+        return int(np.unpackbits(container.view(np.uint8)).sum()) if _is_bitmap(container) else len(container)
+
+    def contains_many(self, values) -> np.ndarray:
+        """Маска принадлежности (bool) для массива значений в исходном порядке"""
+        values = np.asarray(values, dtype=np.int64)
+        result = np.zeros(len(values), dtype=bool)
+        if not len(values) or not self._containers:
+            return result
+        highs = values >> 16
+        for high, container in self._containers.items():
+            positions = np.flatnonzero(highs == high)
+            if not len(positions):
+                continue
+            low = values[positions] & 0xFFFF
+            if _is_bitmap(container):
+                words = container[low >> 6]
+                result[positions] = ((words >> (low & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+            else:
+                found = np.minimum(np.searchsorted(container, low), len(container) - 1)
+                result[positions] = container[found] == low
+        return result
+
+    def to_array(self) -> np.ndarray:
+        """Все значения по возрастанию (np.uint32)"""
+        chunks = []
+        for high in sorted(self._containers):
+            container = self._containers[high]
+            low = _from_bitmap(container) if _is_bitmap(container) else container
+            chunks.append((np.uint32(high) << np.uint32(16)) | low.astype(np.uint32))
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.uint32)
+
+    @property
+    def nbytes(self) -> int:
+        """Память блоков (без накладных расходов Python-объектов)"""
+        return sum(container.nbytes for container in self._containers.values())
+
+    @property
+    def containers(self) -> int:
+        return len(self._containers)
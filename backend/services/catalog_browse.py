@@ -0,0 +1,198 @@
+"""
+Просмотр каталога с фильтрами (категория, материал, диапазон цены,
+наличие) и фасетами — числом товаров по категориям, материалам и ценовым
+корзинам.
+
+Страницы читаются из БД по составным индексам (category_id, price),
+(stuff, price) и частичному (category_id, price) WHERE balance > 0.
+Фасеты считаются по массивам в памяти (`services.catalog_facets`), пока
+они не построены — запросами GROUP BY.
+
+Список ещё не сгенерированных пользователем товаров (`/get_items`) тоже
+читается страницами: только колонки ответа, от новых к старым по id.
+"""
+from typing import Optional
+import logging
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.catalog_items import CatalogItem
+from services.bitmap import RoaringBitmap
+from services.catalog_facets import FACET_LIMIT, BrowseFilters, catalog_facet_index, price_buckets
+from services.fast_json import row_dicts
+from services.pagination import Page, Ranking, decode_cursor, encode_cursor, estimate_total
+
+logger = logging.getLogger(__name__)
+
+# Порядок страниц: по id (порядку добавления) или по цене
+BROWSE_SORTS = ("id", "price_asc", "price_desc")
+
+# Колонки списка товаров — строки без ORM-объектов
+ITEM_COLUMNS = (
+    CatalogItem.id,
+    CatalogItem.id_item,
+    CatalogItem.uid,
+    CatalogItem.sid,
+    CatalogItem.name,
+    CatalogItem.slug,
+    CatalogItem.stuff,
+    CatalogItem.category_id,
+    CatalogItem.photoUrl,
+    CatalogItem.image_title,
+    CatalogItem.raw_description,
+    CatalogItem.price,
+    CatalogItem.balance,
+    CatalogItem.created_at,
+    CatalogItem.updated_at,
+)
+# Наибольшая порция, которой просматриваются подряд идущие сгенерированные товары
+SCAN_CHUNK = 5000
+
+
+def filter_clauses(filters: BrowseFilters, skip: Optional[str] = None) -> list:
+    """Условия WHERE по фильтрам; `skip` — фасет (category / stuff / price), условие которого не нужно"""
+    clauses = []
+    if filters.in_stock:
+        clauses.append(CatalogItem.balance > 0)
+    if filters.category_id is not None and skip != "category":
+        clauses.append(CatalogItem.category_id == filters.category_id)
+    if filters.stuff is not None and skip != "stuff":
+        clauses.append(CatalogItem.stuff == filters.stuff)
+    if skip != "price":
+        if filters.price_min is not None:
+            clauses.append(CatalogItem.price >= filters.price_min)
+        if filters.price_max is not None:
+            clauses.append(CatalogItem.price < filters.price_max)
+    return clauses
+
+
+def browse_ranking(filters: BrowseFilters, sort: str = "id") -> Ranking:
+    stmt = select(CatalogItem).where(*filter_clauses(filters))
+    if sort == "id":
+        return Ranking(stmt, id_column=CatalogItem.id)
+    return Ranking(stmt, id_column=CatalogItem.id, score=CatalogItem.price, descending=sort == "price_desc")
+
+
+async def browse_catalog_page(
+    db: AsyncSession,
+    filters: BrowseFilters,
+    sort: str = "id",
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    count_total: bool = True,
+) -> Page:
+    """
+    Страница товаров под фильтрами в порядке `sort` (при равной цене — по
+    id). Следующая страница читается по курсору `Page.next_cursor`; для
+    первой страницы считается число товаров — точное по индексу фасетов,
+    если он построен, иначе оценка. Некорректный курсор или порядок — ValueError.
+    """
+    if sort not in BROWSE_SORTS:
+        raise ValueError(f"Неизвестный порядок: {sort}")
+    after = decode_cursor(cursor, sort=sort, filters=filters.key())["key"] if cursor else None
+    ranking = browse_ranking(filters, sort)
+    page = Page()
+    keys: list[list] = []
+    result = await db.execute(ranking.page_stmt(after, limit))
+    for row in result.all():
+        page.items.append(row[0])
+        keys.append(ranking.key(row))
+
+    if after is None and count_total:
+        if catalog_facet_index.ready:
+            page.total = catalog_facet_index.count(filters)
+        else:
+            page.total, page.total_exact = await estimate_total(db, ranking.stmt)
+    if len(page.items) > limit:
+        page.items = page.items[:limit]
+        page.next_cursor = encode_cursor({"sort": sort, "filters": filters.key(), "key": keys[limit - 1]})
+
+    logger.info("[CATALOG_BROWSE] %s (%s): страница %d, всего ~%s", filters, sort, len(page.items), page.total)
+    return page
+
+
+async def pending_items_page(
+    db: AsyncSession,
+    generated: RoaringBitmap,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Page:
+    """
+    Страница товаров каталога, которых нет в `generated` (уже сгенерированных
+    пользователем), от новых к старым: словари колонок ITEM_COLUMNS.
+
+    Строки читаются по первичному ключу порциями (растущими, если подряд
+    попадаются сгенерированные товары) и фильтруются по битовой карте, так
+    что страница стоит одинаково при любом размере каталога. Для первой
+    страницы число товаров — оценка по каталогу минус число сгенерированных.
+    Некорректный курсор — ValueError.
+    """
+    after = decode_cursor(cursor, view="pending")["key"][0] if cursor else None
+    page = Page()
+    rows = []
+    chunk = limit + 1
+    while len(rows) <= limit:
+        stmt = select(*ITEM_COLUMNS).order_by(CatalogItem.id.desc()).limit(chunk)
+        if after is not None:
+            stmt = stmt.where(CatalogItem.id < after)
+        scanned = (await db.execute(stmt)).all()
+        if not scanned:
+            break
+        done = generated.contains_many([row.id for row in scanned]).tolist()
+        rows.extend(row for row, flag in zip(scanned, done) if not flag)
+        if len(scanned) < chunk:
+            break
+        after = scanned[-1].id
+        chunk = min(chunk * 2, SCAN_CHUNK)
+
+    page.items = row_dicts(rows[:limit], ITEM_COLUMNS)
+    if len(rows) > limit:
+        page.next_cursor = encode_cursor({"view": "pending", "key": [rows[limit - 1].id]})
+    if cursor is None:
+        total, page.total_exact = await estimate_total(db, select(CatalogItem.id))
+        page.total = max(total - len(generated), 0)
+    return page
+
+
+async def _sql_values(db: AsyncSession, column, filters: BrowseFilters, facet: str, limit: int) -> list[dict]:
+    count = func.count()
+    result = await db.execute(
+        select(column, count)
+        .where(*filter_clauses(filters, skip=facet))
+        .group_by(column)
+        .order_by(count.desc(), column.is_(None), column)
+        .limit(limit)
+    )
+    return [{"value": value, "count": number} for value, number in result.all()]
+
+
+async def catalog_facets(db: AsyncSession, filters: BrowseFilters, limit: int = FACET_LIMIT) -> dict:
+    """
+    Число товаров под фильтрами и фасеты. Счётчики фасета учитывают все
+    фильтры, кроме фильтра по этому фасету: категории — до `limit` самых
+    частых (value None — без категории), так же материалы, ценовые корзины
+    [min, max) — все. Из памяти, если построен индекс фасетов
+    (FACET_INDEX_ENABLED), иначе запросами GROUP BY.
+    """
+    if catalog_facet_index.ready:
+        return catalog_facet_index.facets(filters, limit)
+
+    edges = catalog_facet_index.edges
+    bucket = case(
+        *[(CatalogItem.price < edge, number) for number, edge in enumerate(edges)], else_=len(edges)
+    )
+    result = await db.execute(
+        select(bucket, func.count()).where(*filter_clauses(filters, skip="price")).group_by(bucket)
+    )
+    counts = dict(result.all())
+    total = await db.execute(select(func.count()).select_from(CatalogItem).where(*filter_clauses(filters)))
+    return {
+        "total": total.scalar_one(),
+        "category_id": await _sql_values(db, CatalogItem.category_id, filters, "category", limit),
+        "stuff": await _sql_values(db, CatalogItem.stuff, filters, "stuff", limit),
+        "price": [
+            {"min": low, "max": high, "count": counts.get(number, 0)}
+            for number, (low, high) in enumerate(price_buckets(edges))
+        ],
+    }
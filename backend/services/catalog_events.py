@@ -0,0 +1,121 @@
+"""
+Уведомления об изменении каталога.
+
+Функции записи каталога (`services.catalog_writer`) отмечают в сессии
+добавленные и изменённые товары; после коммита этой сессии подписчики
+получают их одним списком, после отката — ничего. Так поисковые индексы
+в памяти обновляются только закоммиченными данными.
+
+Так же, по коммиту, рассылается изменение числа генераций по парам
+(пользователь, товар) — созданные и удалённые через ORM `UserGeneration`:
+по ним обновляются популярность товаров в подсказках и множества
+сгенерированных товаров пользователей.
+"""
+from collections import Counter
+from typing import Callable, NamedTuple, Optional
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from models.user_generations import UserGeneration
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "catalog_changes"
+GENERATIONS_KEY = "generation_counts"
+
+
+class CatalogChange(NamedTuple):
+    """Добавленный или изменённый товар каталога"""
+    id: int
+    name: str
+    slug: str
+    balance: int = 0
+    category_id: Optional[str] = None
+    price: float = 0.0
+    stuff: Optional[str] = None
+    image_title: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row_id: int, row: dict) -> "CatalogChange":
+        """Изменение по id строки и словарю колонок, записанному в catalog_items"""
+        return cls(
+            row_id, row["name"], row["slug"], row.get("balance") or 0,
+            row.get("category_id"), row.get("price") or 0.0, row.get("stuff"), row.get("image_title"),
+        )
+
+
+CatalogListener = Callable[[list[CatalogChange]], None]
+# Получает Counter {(user_id, catalog_item_id): изменение числа генераций}
+GenerationListener = Callable[[Counter], None]
+
+_listeners: list[CatalogListener] = []
+_generation_listeners: list[GenerationListener] = []
+
+
+def add_listener(listener: CatalogListener) -> None:
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_listener(listener: CatalogListener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def record_changes(db: AsyncSession, changes: list[CatalogChange]) -> None:
+    """Запоминает изменения до коммита сессии"""
+    if changes and _listeners:
+        db.sync_session.info.setdefault(PENDING_KEY, []).extend(changes)
+
+
+def add_generation_listener(listener: GenerationListener) -> None:
+    if listener not in _generation_listeners:
+        _generation_listeners.append(listener)
+
+
+def remove_generation_listener(listener: GenerationListener) -> None:
+    if listener in _generation_listeners:
+        _generation_listeners.remove(listener)
+
+
+def _record_generation(target: UserGeneration, delta: int) -> None:
+    session = object_session(target)
+    if session is not None and _generation_listeners:
+        session.info.setdefault(GENERATIONS_KEY, Counter())[target.user_id, target.catalog_item_id] += delta
+
+
+@event.listens_for(UserGeneration, "after_insert")
+def _generation_inserted(mapper, connection, target: UserGeneration) -> None:
+    _record_generation(target, 1)
+
+
+@event.listens_for(UserGeneration, "after_delete")
+def _generation_deleted(mapper, connection, target: UserGeneration) -> None:
+    _record_generation(target, -1)
+
+
+def _dispatch(listeners: list, payload, kind: str) -> None:
+    for listener in list(listeners):
+        try:
+            listener(payload)
+        except Exception:
+            logger.exception("[CATALOG_EVENTS] Ошибка подписчика %s %r", kind, listener)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify(session: Session) -> None:
+    changes = session.info.pop(PENDING_KEY, None)
+    if changes:
+        _dispatch(_listeners, changes, "каталога")
+    counts = session.info.pop(GENERATIONS_KEY, None)
+    if counts:
+        _dispatch(_generation_listeners, counts, "генераций")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(GENERATIONS_KEY, None)
@@ -0,0 +1,291 @@
+from dataclasses import dataclass
+from typing import Iterable, Optional
+import asyncio
+import logging
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config import config
+from models.catalog_items import CatalogItem
+from services.catalog_events import CatalogChange, add_listener, remove_listener
+from services.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Сколько значений категории и материала возвращается в фасетах (самые частые)
+FACET_LIMIT = 50
+
+
+def price_edges() -> list[float]:
+    """Границы ценовых корзин из FACET_PRICE_EDGES, по возрастанию"""
+    return sorted(float(edge) for edge in config.FACET_PRICE_EDGES.split(",") if edge.strip())
+
+
+def price_buckets(edges: list[float]) -> list[tuple[Optional[float], Optional[float]]]:
+    """Корзины [min, max) по границам: первая без нижней границы, последняя без верхней"""
+    bounds: list[Optional[float]] = [None, *edges, None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+@dataclass(frozen=True)
+class BrowseFilters:
+    """
+    Фильтры просмотра каталога: категория, материал (stuff), цена в
+    диапазоне [price_min, price_max) и только товары в наличии (balance > 0).
+    None / False — фильтр не задан.
+    """
+    category_id: Optional[str] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    in_stock: bool = False
+    stuff: Optional[str] = None
+
+    def key(self) -> list:
+        """Фильтры в виде JSON-списка — для курсора и ключа кеша"""
+        return [self.category_id, self.price_min, self.price_max, self.in_stock, self.stuff]
+
+
+def _top_values(counts: np.ndarray, values: list, limit: int) -> list[dict]:
+    """Самые частые значения фасета по счётчикам (counts[0] — товары без значения)"""
+    present = np.flatnonzero(counts)
+    if len(present) > limit:
+        # Значения со счётчиком не меньше limit-го по величине (с равными ему)
+        threshold = -np.partition(-counts[present], limit - 1)[limit - 1]
+        present = present[counts[present] >= threshold]
+    pairs = [(values[code - 1] if code else None, int(counts[code])) for code in present.tolist()]
+    pairs.sort(key=lambda pair: (-pair[1], pair[0] is None, pair[0] or ""))
+    return [{"value": value, "count": count} for value, count in pairs[:limit]]
+
+
+class _Codes:
+    """Словарь строковых значений колонки: значение → код (1..), 0 — значения нет"""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self.codes: dict[str, int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self.codes.get(value)
+        if code is None:
+            self.values.append(value)
+            code = self.codes[value] = len(self.values)
+        return code
+
+    def find(self, value: str) -> int:
+        """Код значения или -1, если такого значения в каталоге нет"""
+        return self.codes.get(value, -1)
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.values) + sys.getsizeof(self.codes) + sum(
+            sys.getsizeof(value) for value in self.values
+        ) + len(self.codes) * sys.getsizeof(2 ** 20)
+
+
+class CatalogFacetIndex:
+    """
+    Счётчики фасетов просмотра каталога (категории, материалы, ценовые
+    корзины) в памяти.
+
+    Колонки фильтров хранятся плотными массивами по `CatalogItem.id`: коды
+    категории и материала, цена, номер ценовой корзины и признак наличия.
+    Фасеты считаются масками и `np.bincount` без запроса к БД; как в
+    витринах магазинов, счётчики фасета учитывают все фильтры, кроме
+    фильтра по самому этому фасету, — видно, сколько товаров даст выбор
+    другого значения.
+
+    Индекс строится из БД при старте (`start`) и обновляется событиями
+    `services.catalog_events` после коммита записей каталога.
+    """
+
+    def __init__(self, edges: Optional[list[float]] = None):
+        self.edges = price_edges() if edges is None else sorted(edges)
+        self._edges = np.asarray(self.edges, dtype=np.float64)
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+        # id товаров, изменённых событиями во время построения: прочитанные
+        # раньше строки не должны затереть их новые значения
+        self._touched: Optional[set[int]] = None
+        self._clear()
+
+    def _clear(self, capacity: int = 1024) -> None:
+        self._categories = _Codes()
+        self._stuffs = _Codes()
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._in_stock = np.zeros(capacity, dtype=bool)
+        self._category = np.zeros(capacity, dtype=np.int32)
+        self._stuff = np.zeros(capacity, dtype=np.int32)
+        self._price = np.zeros(capacity, dtype=np.float64)
+        self._bucket = np.zeros(capacity, dtype=np.int16)
+        self._size = 0
+
+    @property
+    def items(self) -> int:
+        return int(np.count_nonzero(self._alive[:self._size]))
+
+    def _reserve(self, max_id: int) -> None:
+        """Расширяет массивы (вдвое), чтобы в них поместился id `max_id`"""
+        if max_id >= len(self._alive):
+            capacity = max(max_id + 1, 2 * len(self._alive))
+            for name in ("_alive", "_in_stock", "_category", "_stuff", "_price", "_bucket"):
+                column = getattr(self, name)
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:len(column)] = column
+                setattr(self, name, grown)
+        self._size = max(self._size, max_id + 1)
+
+    def _apply(self, rows: list[tuple]) -> None:
+        """Записывает строки (id, category_id, stuff, price, balance)"""
+        if not rows:
+            return
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        prices = np.fromiter((row[3] or 0.0 for row in rows), dtype=np.float64, count=len(rows))
+        self._reserve(int(ids.max()))
+        self._alive[ids] = True
+        self._in_stock[ids] = np.fromiter(((row[4] or 0) > 0 for row in rows), dtype=bool, count=len(rows))
+        self._category[ids] = [self._categories.code(row[1]) for row in rows]
+        self._stuff[ids] = [self._stuffs.code(row[2]) for row in rows]
+        self._price[ids] = prices
+        self._bucket[ids] = np.searchsorted(self._edges, prices, side="right")
+
+    def upsert(self, changes: Iterable[CatalogChange]) -> None:
+        rows = [(change.id, change.category_id, change.stuff, change.price, change.balance) for change in changes]
+        if self._touched is not None:
+            self._touched.update(row[0] for row in rows)
+        self._apply(rows)
+
+    def on_catalog_change(self, changes: list[CatalogChange]) -> None:
+        """Подписчик `services.catalog_events`"""
+        self.upsert(changes)
+
+    def _masks(self, filters: BrowseFilters) -> tuple[np.ndarray, dict[str, Optional[np.ndarray]]]:
+        """Маска товаров под фильтрами без фасетных (наличие) и маски фасетных фильтров"""
+        size = self._size
+        base = self._alive[:size]
+        if filters.in_stock:
+            base = base & self._in_stock[:size]
+        masks: dict[str, Optional[np.ndarray]] = {"category": None, "stuff": None, "price": None}
+        if filters.category_id is not None:
+            masks["category"] = self._category[:size] == self._categories.find(filters.category_id)
+        if filters.stuff is not None:
+            masks["stuff"] = self._stuff[:size] == self._stuffs.find(filters.stuff)
+        if filters.price_min is not None or filters.price_max is not None:
+            price = self._price[:size]
+            mask = np.ones(size, dtype=bool)
+            if filters.price_min is not None:
+                mask &= price >= filters.price_min
+            if filters.price_max is not None:
+                mask &= price < filters.price_max
+            masks["price"] = mask
+        return base, masks
+
+    def facets(self, filters: BrowseFilters, limit: int = FACET_LIMIT) -> dict:
+        """
+        Число товаров под фильтрами и фасеты: самые частые категории и
+        материалы (до `limit`, value None — без значения) и все ценовые
+        корзины [min, max). Формат совпадает с `services.catalog_browse.catalog_facets`.
+        """
+        base, masks = self._masks(filters)
+
+        def without(facet: Optional[str]) -> np.ndarray:
+            mask = base
+            for name, facet_mask in masks.items():
+                if name != facet and facet_mask is not None:
+                    mask = mask & facet_mask
+            return mask
+
+        size = self._size
+        categories = np.bincount(
+            self._category[:size][without("category")], minlength=len(self._categories.values) + 1
+        )
+        stuffs = np.bincount(self._stuff[:size][without("stuff")], minlength=len(self._stuffs.values) + 1)
+        buckets = np.bincount(self._bucket[:size][without("price")], minlength=len(self.edges) + 1)
+        return {
+            "total": int(np.count_nonzero(without(None))),
+            "category_id": _top_values(categories, self._categories.values, limit),
+            "stuff": _top_values(stuffs, self._stuffs.values, limit),
+            "price": [
+                {"min": low, "max": high, "count": int(count)}
+                for (low, high), count in zip(price_buckets(self.edges), buckets.tolist())
+            ],
+        }
+
+    def count(self, filters: BrowseFilters) -> int:
+        """Число товаров под всеми фильтрами"""
+        base, masks = self._masks(filters)
+        for mask in masks.values():
+            if mask is not None:
+                base = base & mask
+        return int(np.count_nonzero(base))
+
+    async def build(self, session_factory: async_sessionmaker, chunk_size: Optional[int] = None) -> None:
+        """Строит массивы по всему каталогу, читая его порциями по id"""
+        chunk_size = chunk_size or config.SEARCH_INDEX_BUILD_CHUNK
+        started = time.monotonic()
+        self.ready = False
+        self._clear()
+        self._touched = set()
+        last_id = 0
+        try:
+            async with session_factory() as db:
+                while True:
+                    result = await db.execute(
+                        select(
+                            CatalogItem.id, CatalogItem.category_id, CatalogItem.stuff,
+                            CatalogItem.price, CatalogItem.balance,
+                        )
+                        .where(CatalogItem.id > last_id)
+                        .order_by(CatalogItem.id)
+                        .limit(chunk_size)
+                    )
+                    rows = result.all()
+                    if not rows:
+                        break
+                    self._apply([row for row in rows if row[0] not in self._touched])
+                    last_id = rows[-1][0]
+                    await asyncio.sleep(0)
+        finally:
+            self._touched = None
+        self.ready = True
+        logger.info("[FACET_INDEX] Индекс построен: %d товаров, %d категорий за %.1f с",
+                    self.items, len(self._categories.values), time.monotonic() - started)
+
+    async def start(self, session_factory: async_sessionmaker = AsyncSessionLocal) -> None:
+        """Подписывается на изменения каталога и строит индекс в фоне"""
+        add_listener(self.on_catalog_change)
+        self._task = asyncio.create_task(self.build(session_factory))
+
+    async def stop(self) -> None:
+        remove_listener(self.on_catalog_change)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.ready = False
+
+    def memory_report(self) -> dict:
+        """Оценка памяти индекса по структурам (байты)"""
+        columns = sum(
+            getattr(self, name).nbytes
+            for name in ("_alive", "_in_stock", "_category", "_stuff", "_price", "_bucket")
+        )
+        values = self._categories.nbytes + self._stuffs.nbytes
+        total = columns + values
+        return {
+            "ready": self.ready,
+            "items": self.items,
+            "categories": len(self._categories.values),
+            "stuffs": len(self._stuffs.values),
+            "bytes": {"columns": columns, "values": values},
+            "total_bytes": total,
+            "total_mb": round(total / 2 ** 20, 2),
+        }
+
+
+catalog_facet_index = CatalogFacetIndex()
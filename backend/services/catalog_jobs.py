@@ -0,0 +1,426 @@
+import asyncio
+import json
+from collections import OrderedDict, deque
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import AsyncIterator, Optional
+import logging
+
+import httpx
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config import config
+from models.catalog_load_jobs import CatalogLoadJob
+from services.adaptive_limiter import AdaptiveLimiter, LimiterStats
+from services.catalog_writer import bulk_insert_catalog_items, sync_catalog_items, upsert_catalog_items
+from services.database import AsyncSessionLocal
+from services.ingest_pipeline import IngestPipeline, PageBatch
+from services.job_progress import ProgressTracker, job_counts
+from services.payload_cache import PayloadCache, payload_cache
+from services.sima_land_client import SimaLandClient, map_api_data_to_item, sima_land_client
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+# Сколько последних событий хранится для переподключившихся клиентов
+HISTORY_SIZE = 500
+# Для скольких последних задач хранится история событий
+HISTORY_JOBS = 20
+# Размер очереди одного подписчика; медленный клиент теряет старые события
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+@dataclass
+class JobMetrics:
+    """Метрики задачи: стадии конвейера и запросы к API с момента её запуска"""
+    pipeline: IngestPipeline
+    limiter: AdaptiveLimiter
+    api_start: LimiterStats
+    # Снимок на момент завершения: скорости после конца задачи не «затухают»
+    final: Optional[dict] = None
+
+    def snapshot(self) -> dict:
+        if self.final is not None:
+            return self.final
+        return {
+            "stages": self.pipeline.metrics(),
+            "api": self.limiter.snapshot(since=self.api_start),
+        }
+
+
+class CatalogJobManager:
+    """
+    Менеджер фоновых задач загрузки каталога.
+
+    Задачи хранятся в таблице catalog_load_jobs и выполняются по очереди одним
+    воркером независимо от HTTP-соединений. После каждой страницы в той же
+    транзакции, что и товары, сохраняется чекпоинт (`last_page`), поэтому
+    после падения или перезапуска задача продолжается со следующей страницы.
+    Прогресс рассылается всем подписчикам задачи (SSE-клиентам) JSON-событиями:
+    status (текстовые сообщения), progress (сводка счётчиков, скорости и ETA,
+    не чаще PROGRESS_INTERVAL / PROGRESS_EVERY_ITEMS), metrics (стадии
+    конвейера и запросы к API) и done (итог задачи).
+    Загрузка, маппинг и запись выполняются параллельными стадиями
+    конвейера (`IngestPipeline`) с ограниченными очередями между ними.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        client: SimaLandClient = sima_land_client,
+        cache: PayloadCache = payload_cache,
+        cache_ttl: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.client = client
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self._queue: asyncio.Queue[int] = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self._history: OrderedDict[int, deque[str]] = OrderedDict()
+        self._subscribers: dict[int, set[asyncio.Queue]] = {}
+        # Задачи, конец потока которых уже опубликован (из тех, что есть в истории)
+        self._ended: set[int] = set()
+        self._metrics: OrderedDict[int, JobMetrics] = OrderedDict()
+
+    async def start(self) -> None:
+        """Запускает воркер и ставит в очередь незавершённые задачи из БД"""
+        self._queue = asyncio.Queue()
+        async with self.session_factory() as db:
+            # Задачи со статусом running остались от упавшего процесса
+            await db.execute(
+                update(CatalogLoadJob)
+                .where(CatalogLoadJob.status == 'running')
+                .values(status='pending')
+            )
+            await db.commit()
+            result = await db.execute(
+                select(CatalogLoadJob.id)
+                .where(CatalogLoadJob.status == 'pending')
+                .order_by(CatalogLoadJob.id)
+            )
+            job_ids = result.scalars().all()
+
+        for job_id in job_ids:
+            self._queue.put_nowait(job_id)
+        if job_ids:
+            logger.info("[CATALOG_JOBS] Возобновляем задачи: %s", job_ids)
+
+        self._worker = asyncio.create_task(self._work())
+
+    async def stop(self) -> None:
+        """Останавливает воркер; текущая задача продолжится после перезапуска"""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    async def create_job(
+        self,
+        requested_count: int,
+        user_id: Optional[int] = None,
+        mode: str = 'load',
+        write_budget: Optional[int] = None,
+    ) -> CatalogLoadJob:
+        """
+        Создаёт задачу и ставит её в очередь.
+        mode='load' — добавить новые товары, mode='sync' — дельта-синхронизация
+        цен/остатков и прочих полей по хешу содержимого, mode='replay' — та же
+        синхронизация по сохранённым ответам API без обращений к сети,
+        mode='large' — загрузка крупного каталога чанками с постоянным расходом памяти.
+        """
+        async with self.session_factory() as db:
+            job = CatalogLoadJob(
+                user_id=user_id,
+                requested_count=requested_count,
+                mode=mode,
+                write_budget=write_budget,
+            )
+            db.add(job)
+            await db.commit()
+            await db.refresh(job)
+
+        logger.info("[CATALOG_JOBS] Создана задача %s (%s) на %d товаров", job.id, mode, requested_count)
+        self._status(job.id, f"Задача {job.id} поставлена в очередь")
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def get_job(self, job_id: int) -> Optional[CatalogLoadJob]:
+        async with self.session_factory() as db:
+            return await db.get(CatalogLoadJob, job_id)
+
+    async def list_jobs(self, limit: int = 50) -> list[CatalogLoadJob]:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(CatalogLoadJob).order_by(CatalogLoadJob.id.desc()).limit(limit)
+            )
+            return list(result.scalars().all())
+
+    async def subscribe(self, job_id: int) -> AsyncIterator[str]:
+        """
+        Поток событий задачи: сначала сохранённая история, затем новые события
+        до завершения задачи. Можно подключаться и переподключаться в любой момент.
+        """
+        # Регистрация и снимок истории без await между ними: ни одно событие
+        # не потеряется и не придёт дважды. Очередь регистрируется до чтения
+        # задачи из БД — конец потока, опубликованный во время чтения, попадёт в неё
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        history = list(self._history.get(job_id, ()))
+        ended = job_id in self._ended
+        try:
+            job = await self.get_job(job_id)
+            if job is None:
+                yield json.dumps({"type": "error", "message": f"Задача {job_id} не найдена"}, ensure_ascii=False)
+                return
+
+            for message in history:
+                yield message
+            if ended:
+                return
+            if job.status not in ACTIVE_STATUSES and not history:
+                # Задача завершилась до запуска процесса — событий в памяти нет
+                yield self._done_event(job)
+                return
+            # Поток ещё не закрыт: остальные события (в том числе итоговые, если
+            # статус уже записан в БД) придут в очередь
+            while True:
+                message = await queue.get()
+                if message is None:
+                    return
+                yield message
+        finally:
+            self._subscribers.get(job_id, set()).discard(queue)
+
+    def _emit(self, job_id: int, event: dict) -> None:
+        """Сериализует событие один раз для всех подписчиков и рассылает его"""
+        self._publish(job_id, json.dumps(event, ensure_ascii=False))
+
+    def _status(self, job_id: int, message: str) -> None:
+        self._emit(job_id, {"type": "status", "job_id": job_id, "message": message})
+
+    def _publish(self, job_id: int, message: Optional[str]) -> None:
+        """Рассылает сериализованное событие подписчикам; None означает конец потока"""
+        if message is not None:
+            history = self._history.get(job_id)
+            if history is None:
+                history = self._history[job_id] = deque(maxlen=HISTORY_SIZE)
+                while len(self._history) > HISTORY_JOBS:
+                    evicted, _ = self._history.popitem(last=False)
+                    self._ended.discard(evicted)
+            history.append(message)
+        else:
+            self._ended.add(job_id)
+
+        for queue in self._subscribers.get(job_id, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                queue.get_nowait()
+                queue.put_nowait(message)
+
+    @staticmethod
+    def _summary(job: CatalogLoadJob) -> str:
+        if job.status == 'failed':
+            return f"Задача {job.id} завершилась с ошибкой: {job.error}"
+        if job.mode in ('sync', 'replay'):
+            return (
+                f"✓ Синхронизация каталога завершена: новых {job.inserted_count}, "
+                f"изменено {job.updated_count}, без изменений {job.unchanged_count}, "
+                f"отложено {job.deferred_count}, ошибок {job.error_count}"
+            )
+        return (
+            f"✓ Загрузка в каталог завершена: добавлено {job.inserted_count}, "
+            f"уже было {job.skipped_count}, ошибок {job.error_count}"
+        )
+
+    def _done_event(self, job: CatalogLoadJob) -> str:
+        return json.dumps({
+            "type": "done",
+            **job_counts(job),
+            "status": job.status,
+            "error": job.error,
+            "message": self._summary(job),
+        }, ensure_ascii=False)
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("[CATALOG_JOBS] Необработанная ошибка в задаче %s", job_id)
+                self._emit(job_id, {
+                    "type": "done", "job_id": job_id, "status": "failed", "error": str(e),
+                    "message": f"Задача {job_id} прервана: {str(e)}",
+                })
+                self._publish(job_id, None)
+
+    async def _run_job(self, job_id: int) -> None:
+        async with self.session_factory() as db:
+            claimed = await db.execute(
+                update(CatalogLoadJob)
+                .where(CatalogLoadJob.id == job_id, CatalogLoadJob.status == 'pending')
+                .values(status='running')
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                return
+
+            job = await db.get(CatalogLoadJob, job_id)
+            total_pages = (job.requested_count // config.SIMA_LAND_PAGE_SIZE) + 1
+
+            if job.last_page:
+                self._status(job_id, f"Продолжаю задачу {job_id} со страницы {job.last_page + 1}")
+            elif job.mode == 'sync':
+                self._status(job_id, f"Начинаю синхронизацию {job.requested_count} товаров каталога")
+            elif job.mode == 'large':
+                self._status(job_id, f"Начинаю загрузку {job.requested_count} товаров в общий каталог чанками")
+            elif job.mode == 'replay':
+                self._status(job_id, f"Начинаю перемаппинг {job.requested_count} товаров из сохранённых ответов API")
+            else:
+                self._status(job_id, f"Начинаю загрузку {job.requested_count} товаров в общий каталог")
+
+            page_range = range(job.last_page + 1, total_pages + 1)
+            if job.mode == 'replay':
+                pages = self.cache.replay(page_range)
+            else:
+                pages = self.client.iter_pages(page_range, fetch=self.cache.cached_fetch(self.client, self.cache_ttl))
+            progress = ProgressTracker(job)
+            pipeline = self._pipeline(db, job, pages, progress)
+            metrics = self._metrics[job_id]
+            reporter = asyncio.create_task(self._report_metrics(job_id, metrics))
+            try:
+                await pipeline.run()
+                job.status = 'completed'
+            except httpx.HTTPError as e:
+                job.status = 'failed'
+                job.error = f"Ошибка API: {str(e)}"
+                logger.error("[CATALOG_JOBS] Задача %s: %s", job_id, job.error)
+            except Exception as e:
+                # Незавершённая страница откатывается, чекпоинт остаётся на предыдущей
+                await db.rollback()
+                await db.refresh(job)
+                job.status = 'failed'
+                job.error = str(e)
+                logger.exception("[CATALOG_JOBS] Задача %s: ошибка записи", job_id)
+            finally:
+                reporter.cancel()
+                await pages.aclose()
+                metrics.final = metrics.snapshot()
+
+            job.finished_at = datetime.now()
+            await db.commit()
+
+        self._emit(job_id, progress.event(job))
+        self._emit(job_id, {"type": "metrics", "job_id": job_id, **metrics.final})
+        self._publish(job_id, self._done_event(job))
+        self._publish(job_id, None)
+
+    def _pipeline(self, db, job: CatalogLoadJob, pages, progress: ProgressTracker) -> IngestPipeline:
+        """
+        Конвейер задачи: страницы из API/кеша → маппинг → запись в БД.
+        Маппинг не трогает ORM-объект задачи (он может в это время
+        коммититься стадией записи) — счётчики обновляет только запись.
+        """
+        remaining = job.requested_count - job.processed_count
+
+        def transform(page_number: int, items: Optional[list[dict]]) -> Optional[PageBatch]:
+            nonlocal remaining
+            if items is None:
+                self._status(job.id, f"Страница {page_number} отсутствует в кеше, перемаппинг остановлен")
+                return None
+
+            raw_items = items[:remaining]
+            remaining -= len(raw_items)
+            batch = PageBatch(page_number, raw_items, last=remaining <= 0 or not items)
+            for item in raw_items:
+                try:
+                    batch.items.append(map_api_data_to_item(item))
+                except Exception as e:
+                    batch.errors.append(str(e))
+            return batch
+
+        async def sink(batches: list[PageBatch]) -> int:
+            for batch in batches:
+                job.error_count += len(batch.errors)
+                progress.add_errors(batch.errors)
+            if job.mode == 'large':
+                await self._write_large_chunk(db, job, batches)
+            elif job.mode in ('sync', 'replay'):
+                await self._sync_page(db, job, batches[0])
+            else:
+                await self._process_page(db, job, batches[0])
+            if progress.due(job):
+                self._emit(job.id, progress.event(job))
+            return sum(len(batch.raw_items) for batch in batches)
+
+        batch_items = config.LARGE_LOAD_CHUNK_SIZE if job.mode == 'large' else 0
+        pipeline = IngestPipeline(pages, transform, sink, batch_items=batch_items)
+        limiter = self.client.limiter
+        self._metrics[job.id] = JobMetrics(pipeline, limiter, replace(limiter.stats))
+        while len(self._metrics) > HISTORY_JOBS:
+            self._metrics.popitem(last=False)
+        return pipeline
+
+    def get_metrics(self, job_id: int) -> Optional[dict]:
+        """Метрики стадий конвейера и запросов к API задачи (текущей или одной из последних)"""
+        metrics = self._metrics.get(job_id)
+        return metrics.snapshot() if metrics is not None else None
+
+    async def _report_metrics(self, job_id: int, metrics: "JobMetrics") -> None:
+        while True:
+            await asyncio.sleep(config.INGEST_METRICS_INTERVAL)
+            self._emit(job_id, {"type": "metrics", "job_id": job_id, **metrics.snapshot()})
+
+    async def _process_page(self, db, job: CatalogLoadJob, page: PageBatch) -> None:
+        """Записывает страницу и чекпоинт одной транзакцией"""
+        batch = page.items
+        result = await upsert_catalog_items(
+            db, batch, user_id=job.user_id, log_action='catalog_load', commit=False
+        )
+
+        job.last_page = page.page_number
+        job.processed_count += len(page.raw_items)
+        job.inserted_count += len(result.inserted)
+        job.skipped_count += len(batch) - len(result.inserted)
+        await db.commit()
+
+    async def _write_large_chunk(self, db, job: CatalogLoadJob, batches: list[PageBatch]) -> None:
+        """
+        Запись нескольких страниц одним чанком (COPY в PostgreSQL) с чекпоинтом
+        на последней из них. В память попадает только текущий чанк, построчные
+        логи не пишутся, поэтому память не растёт с объёмом.
+        """
+        batch = [item for page in batches for item in page.items]
+        result = await bulk_insert_catalog_items(db, batch)
+
+        job.last_page = batches[-1].page_number
+        job.processed_count += sum(len(page.raw_items) for page in batches)
+        job.inserted_count += len(result.inserted)
+        job.skipped_count += len(batch) - len(result.inserted)
+        await db.commit()
+
+    async def _sync_page(self, db, job: CatalogLoadJob, page: PageBatch) -> None:
+        """Дельта-синхронизация страницы; чекпоинт в той же транзакции"""
+        batch = page.items
+
+        budget = None
+        if job.write_budget is not None:
+            budget = max(0, job.write_budget - job.inserted_count - job.updated_count)
+        result = await sync_catalog_items(db, batch, write_budget=budget, commit=False)
+
+        job.last_page = page.page_number
+        job.processed_count += len(page.raw_items)
+        job.inserted_count += len(result.inserted)
+        job.updated_count += len(result.changed)
+        job.unchanged_count += len(result.unchanged)
+        job.deferred_count += len(result.deferred)
+        await db.commit()
+
+
+catalog_job_manager = CatalogJobManager()
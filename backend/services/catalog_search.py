@@ -0,0 +1,315 @@
+from typing import Optional
+import logging
+
+from sqlalchemy import column, func, literal, literal_column, or_, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import config
+from models.catalog_items import CatalogItem
+from services.catalog_browse import ITEM_COLUMNS
+from services.fast_json import row_dicts
+from services.pagination import Page, Ranking, decode_cursor, encode_cursor, estimate_total
+from services.russian_stemmer import search_prefix, tokenize
+from services.search_index import catalog_search_index, load_items
+from services.spelling_index import catalog_spelling_index
+
+logger = logging.getLogger(__name__)
+
+# Режимы поиска: fulltext — по словам с учётом словоформ, substring — по
+# фрагменту name/slug/id_item, similar — нечёткий, по сходству триграмм,
+# fuzzy — fulltext после исправления опечаток в словах запроса
+SEARCH_MODES = ("fulltext", "substring", "similar", "fuzzy")
+
+# Веса колонок при ранжировании: совпадение в названии важнее, чем в slug
+NAME_WEIGHT = 10.0
+SLUG_WEIGHT = 2.0
+
+# Триграммный индекс не помогает фрагментам короче трёх символов
+MIN_TRIGRAM_QUERY = 3
+
+catalog_items_fts = table("catalog_items_fts", column("rowid"))
+catalog_items_trgm = table("catalog_items_trgm", column("rowid"))
+search_vector = literal_column("catalog_items.search_vector")
+
+
+def fts5_query(query: str) -> Optional[str]:
+    """
+    Запрос FTS5: каждое слово — префикс его основы, слова через AND.
+    «красные кружки» → `"красн"* "кружк"*`. None, если слов нет.
+    """
+    return " ".join(f'"{search_prefix(token)}"*' for token in tokenize(query)) or None
+
+
+def tsquery(query: str) -> Optional[str]:
+    """
+    Запрос для to_tsquery('russian', ...): стемминг делает сам PostgreSQL,
+    `:*` разрешает недописанное последнее слово и другие формы.
+    """
+    terms = [f"{token}:*" for token in tokenize(query)]
+    return " & ".join(terms) or None
+
+
+def trigrams(text: str) -> set[str]:
+    """Триграммы слов текста, как в pg_trgm: слово дополняется двумя пробелами слева и одним справа"""
+    result = set()
+    for token in tokenize(text):
+        padded = f"  {token} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def word_similarity(query: str, text: str) -> float:
+    """
+    Доля триграмм запроса, встречающихся в тексте (0..1) — приближение
+    word_similarity из pg_trgm для пересчёта кандидатов из SQLite.
+    """
+    query_trigrams = trigrams(query)
+    if not query_trigrams:
+        return 0.0
+    return len(query_trigrams & trigrams(text)) / len(query_trigrams)
+
+
+def fts5_trigram_any(query: str) -> Optional[str]:
+    """Запрос к FTS5-триграммам: хотя бы одна триграмма любого слова запроса"""
+    grams = {token[i:i + 3] for token in tokenize(query) for i in range(len(token) - 2)}
+    return " OR ".join(f'"{gram}"' for gram in sorted(grams)) or None
+
+
+def like_pattern(query: str) -> str:
+    """Шаблон `%фрагмент%` с экранированными спецсимволами LIKE"""
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _substring_match(query: str):
+    """Условие поиска подстроки полным просмотром — для фрагментов короче триграммы"""
+    pattern = like_pattern(query)
+    return or_(
+        CatalogItem.name.ilike(pattern, escape="\\"),
+        CatalogItem.slug.ilike(pattern, escape="\\"),
+        CatalogItem.id_item.ilike(pattern, escape="\\"),
+    )
+
+
+def _fulltext_ranking(dialect: str, query: str) -> Optional[Ranking]:
+    if dialect == "postgresql":
+        terms = tsquery(query)
+        if terms is None:
+            return None
+        ts_query = func.to_tsquery(literal_column("'russian'::regconfig"), terms)
+        return Ranking(
+            select(*ITEM_COLUMNS).where(search_vector.op("@@")(ts_query)),
+            id_column=CatalogItem.id,
+            score=func.ts_rank_cd(search_vector, ts_query),
+            descending=True,
+        )
+    if dialect == "sqlite":
+        terms = fts5_query(query)
+        if terms is None:
+            return None
+        return Ranking(
+            select(*ITEM_COLUMNS)
+            .join(catalog_items_fts, catalog_items_fts.c.rowid == CatalogItem.id)
+            .where(text("catalog_items_fts MATCH :terms").bindparams(terms=terms)),
+            id_column=CatalogItem.id,
+            score=literal_column(f"bm25(catalog_items_fts, {NAME_WEIGHT}, {SLUG_WEIGHT})"),
+        )
+    return Ranking(
+        select(*ITEM_COLUMNS).where(CatalogItem.name.ilike(like_pattern(query), escape="\\")),
+        id_column=CatalogItem.id,
+    )
+
+
+def _substring_ranking(dialect: str, query: str) -> Ranking:
+    if dialect == "sqlite" and len(query) >= MIN_TRIGRAM_QUERY:
+        # Фраза в FTS5 с токенизатором trigram совпадает с любой подстрокой колонки.
+        # Без ранжирования: FTS5 отдаёт совпадения в порядке rowid, и LIMIT
+        # обрывает поиск, не дожидаясь всех совпадений частого фрагмента
+        phrase = '"' + query.replace('"', '""') + '"'
+        return Ranking(
+            select(*ITEM_COLUMNS)
+            .join(catalog_items_trgm, catalog_items_trgm.c.rowid == CatalogItem.id)
+            .where(text("catalog_items_trgm MATCH :phrase").bindparams(phrase=phrase)),
+            id_column=catalog_items_trgm.c.rowid,
+        )
+    # В PostgreSQL ILIKE по name/slug/id_item обслуживают GIN-индексы pg_trgm
+    return Ranking(select(*ITEM_COLUMNS).where(_substring_match(query)), id_column=CatalogItem.id)
+
+
+async def _similar_ranking(db: AsyncSession, query: str) -> Ranking:
+    """Нечёткий поиск в PostgreSQL: операторы <% pg_trgm по GIN-индексам"""
+    await db.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+        {"threshold": str(config.SEARCH_SIMILARITY_THRESHOLD)},
+    )
+    term = literal(query)
+    return Ranking(
+        select(*ITEM_COLUMNS).where(or_(
+            term.op("<%")(CatalogItem.name),
+            term.op("<%")(CatalogItem.slug),
+            term.op("<%")(CatalogItem.id_item),
+        )),
+        id_column=CatalogItem.id,
+        score=func.greatest(
+            func.word_similarity(term, CatalogItem.name),
+            func.word_similarity(term, CatalogItem.slug),
+            func.word_similarity(term, CatalogItem.id_item),
+        ),
+        descending=True,
+    )
+
+
+async def _similar_scored(db: AsyncSession, dialect: str, query: str) -> tuple[list[tuple[float, int]], bool]:
+    """
+    Нечёткий поиск без pg_trgm: кандидаты с общими триграммами (в SQLite —
+    из FTS5 trigram), сходство пересчитывается здесь. Кандидаты читаются
+    только колонками для сходства, строки ответа — потом и только для
+    страницы. Возвращает все пары (сходство, id товара) не ниже порога по
+    убыванию сходства и признак того, что кандидаты не упёрлись в
+    SEARCH_SIMILAR_CANDIDATES.
+    """
+    cap = config.SEARCH_SIMILAR_CANDIDATES
+    columns = (CatalogItem.id, CatalogItem.name, CatalogItem.slug, CatalogItem.id_item)
+    if dialect == "sqlite":
+        terms = fts5_trigram_any(query)
+        if terms is None:
+            return [], True
+        stmt = (
+            select(*columns)
+            .join(catalog_items_trgm, catalog_items_trgm.c.rowid == CatalogItem.id)
+            .where(text("catalog_items_trgm MATCH :terms").bindparams(terms=terms))
+            .order_by(text("bm25(catalog_items_trgm)"))
+            .limit(cap)
+        )
+    else:
+        stmt = select(*columns).where(_substring_match(query)).order_by(CatalogItem.id).limit(cap)
+    candidates = (await db.execute(stmt)).all()
+
+    scored = []
+    for item_id, name, slug, id_item in candidates:
+        score = max(word_similarity(query, name), word_similarity(query, slug), word_similarity(query, id_item))
+        if score >= config.SEARCH_SIMILARITY_THRESHOLD:
+            scored.append((score, item_id))
+    scored.sort(key=lambda pair: (-pair[0], pair[1]))
+    return scored, len(candidates) < cap
+
+
+def search_ranking(mode: str, dialect: str) -> str:
+    """
+    Ранжировка, которой сейчас ищется режим, — «режим:источник»: fuzzy
+    ищется как fulltext только с готовым словарём опечаток (иначе как
+    similar), fulltext — индексом в памяти, когда он построен (иначе в БД)
+    """
+    ranked_mode = mode
+    if mode == "fuzzy":
+        ranked_mode = "fulltext" if catalog_spelling_index.ready else "similar"
+    source = "memory" if ranked_mode == "fulltext" and catalog_search_index.ready else dialect
+    return f"{ranked_mode}:{source}"
+
+
+async def search_catalog_page(
+    db: AsyncSession,
+    query: str,
+    limit: int = 100,
+    mode: str = "fulltext",
+    cursor: Optional[str] = None,
+    count_total: bool = True,
+) -> Page:
+    """
+    Страница поиска по каталогу:
+    - fulltext: по словам name/slug с учётом словоформ (tsvector + GIN в
+      PostgreSQL, FTS5 в SQLite), по релевантности;
+    - substring: по фрагменту name/slug/id_item (pg_trgm GIN в PostgreSQL,
+      FTS5 trigram в SQLite), в порядке id;
+    - similar: нечёткий поиск по сходству триграмм (опечатки), по убыванию сходства;
+    - fuzzy: слова запроса, которых нет в каталоге, заменяются ближайшими
+      (до 1–2 правок, словарь `services.spelling_index`), дальше — как fulltext;
+      пока словарь не построен — как similar.
+    В остальных БД — ILIKE без индекса. Если построен индекс в памяти
+    (SEARCH_INDEX_ENABLED), режим fulltext ранжирует по нему без запроса к БД
+    и читает из неё только найденные строки.
+
+    Товары страницы — словари колонок ITEM_COLUMNS (как у `/get_items`),
+    строки читаются только этими колонками, без ORM-объектов.
+
+    Порядок стабилен (при равной релевантности — по id), следующая страница
+    читается по курсору `Page.next_cursor` условием «после последнего ключа».
+    Курсор помнит ранжировку, которой выдан (режим и источник: БД или индекс
+    в памяти), — ключ другой ранжировки означает другое. Если ранжировка
+    сменилась между страницами (построился индекс), курсор отклоняется.
+    Для первой страницы (без курсора) считается оценка общего числа
+    результатов. Некорректный курсор или режим — ValueError.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Неизвестный режим поиска: {mode}")
+    query = query.strip()
+    payload = decode_cursor(cursor, mode=mode, query=query) if cursor else None
+    if not query:
+        return Page()
+    dialect = db.bind.dialect.name
+    page = Page()
+    keys: list[list] = []
+
+    # Ранжировка и сам запрос (fuzzy — после исправления опечаток)
+    ranked_by = search_ranking(mode, dialect)
+    ranked_mode, source = ranked_by.split(":")
+    search_query = query
+    if mode == "fuzzy" and ranked_mode == "fulltext":
+        search_query = catalog_spelling_index.correct(query)
+        if not search_query:
+            return Page()
+    if payload is not None and payload.get("ranking") != ranked_by:
+        raise ValueError("Курсор выдан для другой ранжировки результатов, начните поиск заново")
+    after = payload["key"] if payload is not None else None
+
+    if source == "memory":
+        pairs, total = catalog_search_index.search_scored(search_query, limit + 1, after)
+        scores = dict(pairs)
+        page.items = await load_items(db, [item_id for item_id, _ in pairs])
+        keys = [[scores[item["id"]], item["id"]] for item in page.items]
+        if after is None and count_total:
+            page.total = total
+    elif ranked_mode == "similar" and dialect != "postgresql":
+        scored, complete = await _similar_scored(db, dialect, search_query)
+        if after is not None:
+            last_score, last_id = after
+            scored = [
+                (score, item_id) for score, item_id in scored
+                if score < last_score or (score == last_score and item_id > last_id)
+            ]
+        elif count_total:
+            page.total, page.total_exact = len(scored), complete
+        scores = {item_id: score for score, item_id in scored[:limit + 1]}
+        page.items = await load_items(db, list(scores))
+        keys = [[scores[item["id"]], item["id"]] for item in page.items]
+    else:
+        if ranked_mode == "fulltext":
+            ranking = _fulltext_ranking(dialect, search_query)
+        elif ranked_mode == "substring":
+            ranking = _substring_ranking(dialect, search_query)
+        else:
+            ranking = await _similar_ranking(db, search_query)
+        if ranking is None:
+            return Page()
+        rows = (await db.execute(ranking.page_stmt(after, limit))).all()
+        # Колонка score (последняя, если есть) в словари не попадает
+        page.items = row_dicts(rows, ITEM_COLUMNS)
+        keys = [ranking.key(row) for row in rows]
+        if after is None and count_total:
+            page.total, page.total_exact = await estimate_total(db, ranking.stmt)
+
+    if len(page.items) > limit:
+        page.items = page.items[:limit]
+        page.next_cursor = encode_cursor({"mode": mode, "query": query, "ranking": ranked_by, "key": keys[limit - 1]})
+
+    logger.info("[CATALOG_SEARCH] '%s' (%s, %s): страница %d, всего ~%s",
+                search_query, mode, source, len(page.items), page.total)
+    return page
+
+
+async def search_catalog(
+    db: AsyncSession, query: str, limit: int = 100, mode: str = "fulltext"
+) -> list[dict]:
+    """Первые `limit` результатов поиска (см. `search_catalog_page`)"""
+    page = await search_catalog_page(db, query, limit, mode, count_total=False)
+    return page.items
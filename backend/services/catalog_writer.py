@@ -0,0 +1,324 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from hashlib import blake2b
+from typing import Optional
+import json
+import logging
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.catalog_items import CatalogItem
+from models.log import Log
+from services.catalog_events import CatalogChange, record_changes
+from services.database import dialect_insert
+from services.listing_versions import CATALOG_SCOPE, bump_versions
+from services.near_duplicates import assign_duplicate_groups
+
+logger = logging.getLogger(__name__)
+
+# Размер одного INSERT: 500 строк * ~14 колонок укладываются в лимиты
+# параметров и SQLite, и PostgreSQL
+CHUNK_SIZE = 500
+
+# Временная таблица для COPY в PostgreSQL (своя у каждого соединения)
+STAGE_TABLE = "catalog_items_stage"
+
+
+# Поля, изменение которых считается изменением товара
+CONTENT_FIELDS = (
+    "uid", "sid", "name", "slug", "stuff", "category_id",
+    "photoUrl", "image_title", "raw_description", "price", "balance",
+)
+
+
+def compute_content_hash(item: dict) -> str:
+    """Хеш содержимого товара (blake2b-128, hex) по полям CONTENT_FIELDS"""
+    payload = json.dumps([item.get(key) for key in CONTENT_FIELDS], ensure_ascii=False, default=str)
+    return blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass
+class UpsertResult:
+    """Результат записи пачки товаров в каталог (списки id_item)"""
+    inserted: list[str] = field(default_factory=list)
+    updated: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+
+
+@dataclass
+class SyncResult:
+    """Результат дельта-синхронизации пачки товаров (списки id_item)"""
+    inserted: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    # Новые/изменённые товары, не записанные из-за исчерпания лимита записей
+    deferred: list[str] = field(default_factory=list)
+
+    @property
+    def writes(self) -> int:
+        return len(self.inserted) + len(self.changed)
+
+
+def _dedupe(items: list[dict]) -> dict[str, dict]:
+    """Дубликаты внутри пачки: побеждает последняя запись"""
+    rows_by_id: dict[str, dict] = {}
+    for item in items:
+        rows_by_id[item["id_item"]] = item
+    duplicates = len(items) - len(rows_by_id)
+    if duplicates:
+        logger.debug("[CATALOG_WRITER] В пачке %d дубликатов id_item", duplicates)
+    return rows_by_id
+
+
+def _prepare_rows(rows_by_id: dict[str, dict], now: datetime) -> list[dict]:
+    """Строки для многострочного INSERT: одинаковый набор колонок, хеш и даты"""
+    columns = {key for row in rows_by_id.values() for key in row}
+    return [
+        {
+            **dict.fromkeys(columns),
+            **row,
+            "content_hash": compute_content_hash(row),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for row in rows_by_id.values()
+    ]
+
+
+async def _after_write(db: AsyncSession, changes: list[CatalogChange]) -> None:
+    """
+    В транзакции записи: группы почти-дубликатов, уведомление индексов после
+    коммита и новая версия каталога для ETag списков.
+    """
+    if not changes:
+        return
+    await assign_duplicate_groups(db, changes)
+    record_changes(db, changes)
+    await bump_versions(db, [CATALOG_SCOPE])
+
+
+async def upsert_catalog_items(
+    db: AsyncSession,
+    items: list[dict],
+    update_existing: bool = False,
+    user_id: Optional[int] = None,
+    log_action: Optional[str] = None,
+    commit: bool = True,
+) -> UpsertResult:
+    """
+    Записывает пачку товаров (результат `map_api_data_to_item`) в каталог
+    одним `INSERT ... ON CONFLICT (id_item)` на чанк и одним коммитом.
+
+    - update_existing=False: существующие товары пропускаются (DO NOTHING)
+    - update_existing=True: существующие товары перезаписываются (DO UPDATE)
+
+    Если задан `log_action`, для каждого добавленного товара пишется строка
+    в таблицу log в той же транзакции. С commit=False транзакцию завершает
+    вызывающий код (например, вместе с чекпоинтом задачи загрузки).
+    Записанные товары там же распределяются по группам почти-дубликатов
+    (`services.near_duplicates`), версия каталога увеличивается.
+    """
+    result = UpsertResult()
+
+    rows_by_id = _dedupe(items)
+    if not rows_by_id:
+        return result
+
+    insert = dialect_insert(db)
+    now = datetime.now()
+    rows = _prepare_rows(rows_by_id, now)
+    names = {}
+    changes = []
+
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        stmt = insert(CatalogItem).values(chunk)
+
+        if update_existing:
+            excluded = stmt.excluded
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[CatalogItem.id_item],
+                set_={
+                    key: getattr(excluded, key)
+                    for key in chunk[0]
+                    if key not in ("id_item", "created_at")
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[CatalogItem.id_item])
+
+        # created_at при DO UPDATE не перезаписывается, поэтому строки с
+        # created_at == now вставлены этим запросом, остальные — обновлены
+        returned = await db.execute(stmt.returning(CatalogItem.id, CatalogItem.id_item, CatalogItem.created_at))
+        for row_id, id_item, created_at in returned.all():
+            if created_at == now:
+                result.inserted.append(id_item)
+            else:
+                result.updated.append(id_item)
+            changes.append(CatalogChange.from_row(row_id, rows_by_id[id_item]))
+
+        for row in chunk:
+            names[row["id_item"]] = row["name"]
+
+    written = set(result.inserted) | set(result.updated)
+    result.skipped = [id_item for id_item in rows_by_id if id_item not in written]
+
+    if log_action and result.inserted:
+        await db.execute(
+            Log.__table__.insert(),
+            [
+                {
+                    "user_id": user_id,
+                    "timestamp": now,
+                    "created_at": now,
+                    "updated_at": now,
+                    "action": log_action,
+                    "item_id": id_item,
+                    "message": f"Товар добавлен в каталог: {names[id_item]}",
+                    "status": "completed",
+                }
+                for id_item in result.inserted
+            ],
+        )
+
+    await _after_write(db, changes)
+    if commit:
+        await db.commit()
+
+    logger.info(
+        "[CATALOG_WRITER] Записано: добавлено=%d, обновлено=%d, пропущено=%d",
+        len(result.inserted), len(result.updated), len(result.skipped),
+    )
+    return result
+
+
+async def sync_catalog_items(
+    db: AsyncSession,
+    items: list[dict],
+    write_budget: Optional[int] = None,
+    commit: bool = True,
+) -> SyncResult:
+    """
+    Дельта-синхронизация пачки товаров с каталогом по хешу содержимого.
+
+    Одним запросом по уникальному индексу id_item читаются сохранённые хеши;
+    неизменённые товары не пишутся вообще, новые и изменённые записываются
+    одним `INSERT ... ON CONFLICT DO UPDATE` на чанк. `write_budget` ограничивает
+    число записанных строк, остальные возвращаются как отложенные. Новые и
+    изменённые товары распределяются по группам почти-дубликатов.
+    """
+    result = SyncResult()
+    rows_by_id = _dedupe(items)
+    if not rows_by_id:
+        return result
+
+    stored: dict[str, Optional[str]] = {}
+    ids = list(rows_by_id)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        existing = await db.execute(
+            select(CatalogItem.id_item, CatalogItem.content_hash)
+            .where(CatalogItem.id_item.in_(ids[start:start + CHUNK_SIZE]))
+        )
+        stored.update(existing.all())
+
+    now = datetime.now()
+    to_write = []
+    for row in _prepare_rows(rows_by_id, now):
+        id_item = row["id_item"]
+        if id_item in stored and stored[id_item] == row["content_hash"]:
+            result.unchanged.append(id_item)
+            continue
+        if write_budget is not None and len(to_write) >= write_budget:
+            result.deferred.append(id_item)
+            continue
+        to_write.append(row)
+        if id_item in stored:
+            result.changed.append(id_item)
+        else:
+            result.inserted.append(id_item)
+
+    insert = dialect_insert(db)
+    changes = []
+    for start in range(0, len(to_write), CHUNK_SIZE):
+        chunk = to_write[start:start + CHUNK_SIZE]
+        stmt = insert(CatalogItem).values(chunk)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CatalogItem.id_item],
+            set_={
+                key: getattr(excluded, key)
+                for key in chunk[0]
+                if key not in ("id_item", "created_at")
+            },
+            # Защита от гонки с параллельной записью: одинаковые строки не трогаем
+            where=CatalogItem.content_hash.is_distinct_from(excluded.content_hash),
+        )
+        returned = await db.execute(stmt.returning(CatalogItem.id, CatalogItem.id_item))
+        changes.extend(
+            CatalogChange.from_row(row_id, rows_by_id[id_item])
+            for row_id, id_item in returned.all()
+        )
+
+    await _after_write(db, changes)
+    if commit:
+        await db.commit()
+
+    logger.info(
+        "[CATALOG_WRITER] Синхронизация: новых=%d, изменено=%d, без изменений=%d, отложено=%d",
+        len(result.inserted), len(result.changed), len(result.unchanged), len(result.deferred),
+    )
+    return result
+
+
+async def bulk_insert_catalog_items(db: AsyncSession, items: list[dict]) -> UpsertResult:
+    """
+    Вставка крупной пачки новых товаров без логов и без коммита — для загрузки
+    каталога целиком. В PostgreSQL (asyncpg) строки заливаются через COPY во
+    временную таблицу и переносятся одним `INSERT ... SELECT ... ON CONFLICT
+    DO NOTHING`; в остальных БД — многострочными INSERT по CHUNK_SIZE строк.
+    """
+    if db.bind.dialect.name != "postgresql" or db.bind.dialect.driver != "asyncpg":
+        return await upsert_catalog_items(db, items, commit=False)
+
+    result = UpsertResult()
+    rows_by_id = _dedupe(items)
+    if not rows_by_id:
+        return result
+
+    rows = _prepare_rows(rows_by_id, datetime.now())
+    columns = list(rows[0])
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    stage_columns = ", ".join(
+        f'"{column.name}"' for column in CatalogItem.__table__.columns if column.name != "id"
+    )
+
+    await db.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} ON COMMIT DELETE ROWS AS "
+        f"SELECT {stage_columns} FROM catalog_items WITH NO DATA"
+    ))
+    # Транзакция уже открыта запросом выше, COPY выполняется в ней же
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        STAGE_TABLE,
+        records=[tuple(row[column] for column in columns) for row in rows],
+        columns=columns,
+    )
+    returned = await db.execute(text(
+        f"INSERT INTO catalog_items ({column_list}) SELECT {column_list} FROM {STAGE_TABLE} "
+        "ON CONFLICT (id_item) DO NOTHING RETURNING id, id_item"
+    ))
+    changes = []
+    for row_id, id_item in returned.all():
+        result.inserted.append(id_item)
+        changes.append(CatalogChange.from_row(row_id, rows_by_id[id_item]))
+    await _after_write(db, changes)
+    await db.execute(text(f"TRUNCATE {STAGE_TABLE}"))
+
+    inserted = set(result.inserted)
+    result.skipped = [id_item for id_item in rows_by_id if id_item not in inserted]
+    logger.info(
+        "[CATALOG_WRITER] COPY: добавлено=%d, пропущено=%d", len(result.inserted), len(result.skipped)
+    )
+    return result
@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
 )
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import DeclarativeBase
 from config import config as conf
 
@@ -25,4 +26,19 @@ async def get_db() -> AsyncSession:
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+_DIALECT_INSERT = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def dialect_insert(db: AsyncSession):
+    """`insert` текущего диалекта БД (с поддержкой ON CONFLICT)"""
+    dialect = db.bind.dialect.name
+    try:
+        return _DIALECT_INSERT[dialect]
+    except KeyError:
+        raise RuntimeError(f"INSERT ... ON CONFLICT не поддерживается для БД '{dialect}'")
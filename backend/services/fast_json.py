@@ -0,0 +1,48 @@
+"""
+Быстрый ответ списочных эндпоинтов: строки БД сразу в JSON-байты через
+orjson.
+
+Эндпоинт возвращает `FastJSONResponse` напрямую, поэтому FastAPI не
+проходит по результату `jsonable_encoder` и не валидирует его по
+response_model (для генераций это была валидация каждого вложенного
+`UserGenerationView` / `CatalogItemView` через from_attributes). orjson
+кодирует dict, str, float, None и datetime в C за один проход; формат тот
+же, что у стандартного ответа (даты — ISO 8601 без часового пояса).
+"""
+from typing import Any, Iterable, Optional, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ, кодируемый orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def row_dicts(
+    rows: Iterable[Sequence],
+    columns: Sequence,
+    nested: Optional[tuple[str, Sequence]] = None,
+) -> list[dict]:
+    """
+    Строки запроса `select(*columns, *nested_columns)` → словари по ключам
+    колонок. `nested` — (ключ, колонки) вложенного объекта из хвоста строки
+    (например, товар из LEFT JOIN); если его первая колонка NULL, объект — None.
+    """
+    keys = [column.key for column in columns]
+    if nested is None:
+        return [dict(zip(keys, row)) for row in rows]
+
+    name, nested_columns = nested
+    nested_keys = [column.key for column in nested_columns]
+    split = len(keys)
+    out = []
+    for row in rows:
+        values = tuple(row)
+        item = dict(zip(keys, values[:split]))
+        item[name] = dict(zip(nested_keys, values[split:])) if values[split] is not None else None
+        out.append(item)
+    return out
@@ -0,0 +1,123 @@
+from collections import Counter, OrderedDict
+from typing import Optional
+import logging
+import sys
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import config
+from models.user_generations import UserGeneration
+from services.bitmap import RoaringBitmap
+from services.catalog_events import add_generation_listener
+
+logger = logging.getLogger(__name__)
+
+
+class _UserItems:
+    """Сгенерированные товары пользователя: множество id и число лишних генераций товара"""
+
+    __slots__ = ("bitmap", "extra")
+
+    def __init__(self, counts: dict[int, int]):
+        self.bitmap = RoaringBitmap(counts)
+        # Товар с несколькими генерациями: число генераций сверх первой
+        self.extra = {item_id: count - 1 for item_id, count in counts.items() if count > 1}
+
+    def apply(self, item_id: int, delta: int) -> None:
+        count = (item_id in self.bitmap) + self.extra.get(item_id, 0) + delta
+        if count <= 0:
+            self.bitmap.discard(item_id)
+            self.extra.pop(item_id, None)
+            return
+        self.bitmap.add(item_id)
+        if count > 1:
+            self.extra[item_id] = count - 1
+        else:
+            self.extra.pop(item_id, None)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bitmap.nbytes + sys.getsizeof(self.extra)
+
+
+class GeneratedItems:
+    """
+    Множества товаров, сгенерированных пользователями (сжатые битовые карты
+    по `CatalogItem.id`), — для флага generated и отбора «ещё не
+    сгенерированных» без загрузки списков id из БД на каждый запрос.
+
+    Множество пользователя читается из БД при первом обращении и дальше
+    обновляется событиями `services.catalog_events` после коммита создания
+    или удаления генерации. В памяти держится не больше
+    GENERATED_ITEMS_MAX_USERS пользователей (давно не обращавшиеся
+    вытесняются и при следующем обращении читаются заново).
+    """
+
+    def __init__(self, max_users: Optional[int] = None):
+        self.max_users = max_users or config.GENERATED_ITEMS_MAX_USERS
+        self._users: OrderedDict[int, _UserItems] = OrderedDict()
+        # Счётчик изменений по пользователю: загрузка, во время которой пришло
+        # изменение, не сохраняется (неизвестно, видела ли она его)
+        self._epochs: Counter = Counter()
+
+    async def bitmap(self, db: AsyncSession, user_id: int) -> RoaringBitmap:
+        """Множество id товаров, для которых у пользователя есть генерации"""
+        items = self._users.get(user_id)
+        if items is not None:
+            self._users.move_to_end(user_id)
+            return items.bitmap
+
+        epoch = self._epochs[user_id]
+        result = await db.execute(
+            select(UserGeneration.catalog_item_id, func.count())
+            .where(UserGeneration.user_id == user_id)
+            .group_by(UserGeneration.catalog_item_id)
+        )
+        items = _UserItems(dict(result.all()))
+        if self._epochs[user_id] == epoch:
+            self._users[user_id] = items
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        logger.debug("[GENERATED_ITEMS] user_id=%s: загружено %d товаров", user_id, len(items.bitmap))
+        return items.bitmap
+
+    def on_generations_change(self, counts: Counter) -> None:
+        """Подписчик `services.catalog_events`: {(user_id, catalog_item_id): прирост}"""
+        for (user_id, item_id), delta in counts.items():
+            self._epochs[user_id] += 1
+            items = self._users.get(user_id)
+            if items is not None and delta:
+                items.apply(item_id, delta)
+
+    def forget(self, user_id: Optional[int] = None) -> None:
+        """Сбрасывает множество пользователя (или всех) — оно будет прочитано из БД заново"""
+        if user_id is None:
+            self._users.clear()
+        else:
+            self._users.pop(user_id, None)
+
+    def memory_report(self) -> dict:
+        """Память множеств по пользователям (байты) и итог"""
+        per_user = [
+            {
+                "user_id": user_id,
+                "items": len(items.bitmap),
+                "containers": items.bitmap.containers,
+                "bytes": items.nbytes,
+            }
+            for user_id, items in self._users.items()
+        ]
+        total = sum(entry["bytes"] for entry in per_user)
+        return {
+            "users": len(per_user),
+            "max_users": self.max_users,
+            "per_user": sorted(per_user, key=lambda entry: entry["bytes"], reverse=True),
+            "total_bytes": total,
+            "total_mb": round(total / 2 ** 20, 2),
+        }
+
+
+generated_items = GeneratedItems()
+# Подписка сразу при импорте: множества не должны пропустить ни одной генерации
+add_generation_listener(generated_items.on_generations_change)
@@ -0,0 +1,118 @@
+from typing import Optional
+import logging
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.catalog_items import CatalogItem
+from models.user_generations import UserGeneration
+from services.catalog_browse import ITEM_COLUMNS
+from services.catalog_search import fts5_query, like_pattern, tsquery
+from services.fast_json import row_dicts
+from services.pagination import Page, Ranking, decode_cursor, encode_cursor, estimate_total
+
+logger = logging.getLogger(__name__)
+
+# Веса колонок user_generations_fts (owner, name, ai_keywords, ai_description)
+FTS_WEIGHTS = "0.0, 10.0, 4.0, 1.0"
+
+user_generations_fts = table("user_generations_fts", column("rowid"))
+search_vector = literal_column("user_generations.search_vector")
+
+# Колонки генерации в ответах списков (товар — колонками ITEM_COLUMNS)
+GENERATION_COLUMNS = (
+    UserGeneration.id,
+    UserGeneration.user_id,
+    UserGeneration.catalog_item_id,
+    UserGeneration.generation_name,
+    UserGeneration.ai_description,
+    UserGeneration.ai_keywords,
+    UserGeneration.ai_prompt_version,
+    UserGeneration.excel_exported,
+    UserGeneration.export_count,
+    UserGeneration.created_at,
+    UserGeneration.updated_at,
+)
+
+
+def generations_with_items():
+    """Генерации с товаром (LEFT JOIN) только колонками ответа"""
+    return (
+        select(*GENERATION_COLUMNS, *ITEM_COLUMNS)
+        .select_from(UserGeneration)
+        .outerjoin(CatalogItem, CatalogItem.id == UserGeneration.catalog_item_id)
+    )
+
+
+def _ranking(dialect: str, user_id: int, query: str) -> Optional[Ranking]:
+    base = generations_with_items()
+
+    if dialect == "postgresql":
+        terms = tsquery(query)
+        if terms is None:
+            return None
+        ts_query = func.to_tsquery(literal_column("'russian'::regconfig"), terms)
+        return Ranking(
+            base.where(UserGeneration.user_id == user_id, search_vector.op("@@")(ts_query)),
+            id_column=UserGeneration.id,
+            score=func.ts_rank_cd(search_vector, ts_query),
+            descending=True,
+        )
+    if dialect == "sqlite":
+        terms = fts5_query(query)
+        if terms is None:
+            return None
+        # Условие по owner выполняется внутри FTS5 вместе со словами запроса
+        match = f'owner:"u{user_id}" AND {{name ai_keywords ai_description}}: ({terms})'
+        return Ranking(
+            base.join(user_generations_fts, user_generations_fts.c.rowid == UserGeneration.id)
+            .where(text("user_generations_fts MATCH :match").bindparams(match=match)),
+            id_column=UserGeneration.id,
+            score=literal_column(f"bm25(user_generations_fts, {FTS_WEIGHTS})"),
+        )
+    return Ranking(
+        base.where(UserGeneration.user_id == user_id, CatalogItem.name.ilike(like_pattern(query), escape="\\")),
+        id_column=UserGeneration.id,
+    )
+
+
+async def search_generations_page(
+    db: AsyncSession,
+    user_id: int,
+    query: str,
+    limit: int = 200,
+    cursor: Optional[str] = None,
+) -> Page:
+    """
+    Страница поиска по генерациям пользователя: по словам названия товара,
+    ai_keywords и ai_description с учётом словоформ, по релевантности.
+    Индексы разделены по пользователям (GIN (user_id, search_vector) в
+    PostgreSQL, FTS5 с колонкой owner в SQLite), поэтому время поиска зависит
+    от числа генераций пользователя, а не всей таблицы. Генерации — словари
+    колонок GENERATION_COLUMNS с вложенным `catalog_item` (ITEM_COLUMNS),
+    прочитанные одним запросом без ORM-объектов; курсор и оценка общего числа — как в
+    `services.catalog_search.search_catalog_page`. Некорректный курсор — ValueError.
+    """
+    query = query.strip()
+    after = decode_cursor(cursor, query=query)["key"] if cursor else None
+    ranking = _ranking(db.bind.dialect.name, user_id, query) if query else None
+    if ranking is None:
+        return Page()
+
+    page = Page()
+    rows = (await db.execute(ranking.page_stmt(after, limit))).all()
+    if after is None:
+        # Неполная первая страница — уже все результаты, повторный MATCH не нужен
+        if len(rows) <= limit:
+            page.total = len(rows)
+        else:
+            page.total, page.total_exact = await estimate_total(db, ranking.stmt)
+
+    if len(rows) > limit:
+        page.next_cursor = encode_cursor({"query": query, "key": ranking.key(rows[limit - 1])})
+    # Колонка score (последняя) во вложенный товар не попадает: ключей ITEM_COLUMNS меньше
+    page.items = row_dicts(rows[:limit], GENERATION_COLUMNS, nested=("catalog_item", ITEM_COLUMNS))
+
+    logger.info("[GENERATION_SEARCH] user_id=%s '%s': страница %d, всего ~%s",
+                user_id, query, len(page.items), page.total)
+    return page
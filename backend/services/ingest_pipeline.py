@@ -0,0 +1,194 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Optional
+import logging
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Маркер конца потока в очередях между стадиями
+_DONE = object()
+
+
+@dataclass
+class PageBatch:
+    """Страница каталога на пути от загрузки до записи в БД"""
+    page_number: int
+    raw_items: list[dict]
+    items: list[dict] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    # Последняя страница задачи: после неё стадии завершаются
+    last: bool = False
+
+
+class StageMetrics:
+    """
+    Метрики одной стадии конвейера:
+    - busy: время собственной работы стадии
+    - idle: ожидание входных данных (узкое место — стадия выше)
+    - blocked: ожидание места в выходной очереди (узкое место — стадия ниже)
+    """
+
+    def __init__(self, name: str, queue: Optional[asyncio.Queue] = None):
+        self.name = name
+        self.queue = queue
+        self.items = 0
+        self.pages = 0
+        self.busy_seconds = 0.0
+        self.idle_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.started_at = time.perf_counter()
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "pages": self.pages,
+            "items_per_second": round(self.items / elapsed, 1),
+            "busy_seconds": round(self.busy_seconds, 3),
+            "idle_seconds": round(self.idle_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "queue_capacity": self.queue.maxsize if self.queue is not None else 0,
+        }
+
+
+class IngestPipeline:
+    """
+    Конвейер загрузки каталога: fetch → map → write.
+
+    Стадии работают параллельно и связаны ограниченными очередями
+    (`queue_size` страниц), поэтому медленная БД не даёт сети убегать вперёд,
+    а медленная сеть не блокирует запись уже полученных страниц.
+    Запись идёт строго в порядке страниц, что сохраняет корректность чекпоинтов.
+
+    `sink` получает подряд идущие страницы: по одной или, если задан
+    `batch_items`, пачками не меньше batch_items товаров (последняя пачка
+    может быть меньше) — для записи крупными чанками.
+    """
+
+    def __init__(
+        self,
+        source: AsyncIterator[tuple[int, Optional[list[dict]]]],
+        transform: Callable[[int, Optional[list[dict]]], Optional[PageBatch]],
+        sink: Callable[[list[PageBatch]], Awaitable[int]],
+        queue_size: Optional[int] = None,
+        batch_items: int = 0,
+    ):
+        queue_size = queue_size or config.INGEST_QUEUE_SIZE
+        self.source = source
+        self.transform = transform
+        self.sink = sink
+        self.batch_items = batch_items
+        self.fetched: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.mapped: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stages = {
+            "fetch": StageMetrics("fetch", self.fetched),
+            "map": StageMetrics("map", self.mapped),
+            "write": StageMetrics("write"),
+        }
+
+    def metrics(self) -> list[dict]:
+        return [stage.snapshot() for stage in self.stages.values()]
+
+    async def run(self) -> None:
+        """Выполняет конвейер до конца источника или последней страницы"""
+        tasks = [
+            asyncio.create_task(self._fetch_stage()),
+            asyncio.create_task(self._map_stage()),
+        ]
+        try:
+            await self._write_stage()
+        finally:
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def _put(self, metrics: StageMetrics, queue: asyncio.Queue, value) -> None:
+        started = time.perf_counter()
+        await queue.put(value)
+        metrics.blocked_seconds += time.perf_counter() - started
+
+    async def _fetch_stage(self) -> None:
+        metrics = self.stages["fetch"]
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    page_number, items = await self.source.__anext__()
+                except StopAsyncIteration:
+                    break
+                metrics.busy_seconds += time.perf_counter() - started
+                metrics.pages += 1
+                metrics.items += len(items or ())
+                await self._put(metrics, self.fetched, (page_number, items))
+        except Exception as e:
+            # Ошибка источника передаётся дальше по конвейеру, чтобы уже
+            # полученные страницы успели записаться
+            await self.fetched.put(e)
+            return
+        await self.fetched.put(_DONE)
+
+    async def _map_stage(self) -> None:
+        metrics = self.stages["map"]
+        while True:
+            started = time.perf_counter()
+            value = await self.fetched.get()
+            metrics.idle_seconds += time.perf_counter() - started
+            if value is _DONE or isinstance(value, Exception):
+                await self.mapped.put(value)
+                return
+
+            started = time.perf_counter()
+            batch = self.transform(*value)
+            metrics.busy_seconds += time.perf_counter() - started
+            if batch is None:
+                await self.mapped.put(_DONE)
+                return
+
+            metrics.pages += 1
+            metrics.items += len(batch.raw_items)
+            await self._put(metrics, self.mapped, batch)
+            if batch.last:
+                await self.mapped.put(_DONE)
+                return
+
+    async def _write_stage(self) -> None:
+        metrics = self.stages["write"]
+        pending: list[PageBatch] = []
+        pending_items = 0
+
+        async def flush() -> None:
+            nonlocal pending, pending_items
+            if not pending:
+                return
+            started = time.perf_counter()
+            written = await self.sink(pending)
+            metrics.busy_seconds += time.perf_counter() - started
+            metrics.pages += len(pending)
+            metrics.items += written
+            pending, pending_items = [], 0
+
+        while True:
+            started = time.perf_counter()
+            value = await self.mapped.get()
+            metrics.idle_seconds += time.perf_counter() - started
+            if value is _DONE:
+                await flush()
+                return
+            if isinstance(value, Exception):
+                # Уже полученные страницы записываются до ошибки
+                await flush()
+                raise value
+
+            pending.append(value)
+            pending_items += len(value.raw_items)
+            if pending_items >= self.batch_items or value.last:
+                await flush()
@@ -0,0 +1,78 @@
+import time
+from typing import Optional
+
+from config import config
+from models.catalog_load_jobs import CatalogLoadJob
+
+
+def job_counts(job: CatalogLoadJob) -> dict:
+    """Счётчики задачи для событий прогресса"""
+    return {
+        "job_id": job.id,
+        "mode": job.mode,
+        "requested": job.requested_count,
+        "processed": job.processed_count,
+        "inserted": job.inserted_count,
+        "skipped": job.skipped_count,
+        "updated": job.updated_count,
+        "unchanged": job.unchanged_count,
+        "deferred": job.deferred_count,
+        "errors": job.error_count,
+        "last_page": job.last_page,
+    }
+
+
+class ProgressTracker:
+    """
+    Сводит прогресс задачи в редкие события: не чаще раза в `interval`
+    секунд, но не реже чем через `every_items` товаров. Ошибки товаров
+    между событиями не пересылаются поштучно — в событие попадает их
+    число и первые `sample_size` сообщений.
+    """
+
+    def __init__(
+        self,
+        job: CatalogLoadJob,
+        interval: Optional[float] = None,
+        every_items: Optional[int] = None,
+        sample_size: Optional[int] = None,
+    ):
+        self.interval = interval if interval is not None else config.PROGRESS_INTERVAL
+        self.every_items = every_items if every_items is not None else config.PROGRESS_EVERY_ITEMS
+        self.sample_size = sample_size if sample_size is not None else config.PROGRESS_ERROR_SAMPLES
+        self.started_at = time.monotonic()
+        self.start_processed = job.processed_count
+        self.last_emit_at = self.started_at
+        self.last_emit_processed = job.processed_count
+        self.error_samples: list[str] = []
+
+    def add_errors(self, errors: list[str]) -> None:
+        free = self.sample_size - len(self.error_samples)
+        if free > 0:
+            self.error_samples.extend(errors[:free])
+
+    def due(self, job: CatalogLoadJob) -> bool:
+        """Пора ли отправлять событие прогресса"""
+        return (
+            job.processed_count - self.last_emit_processed >= self.every_items
+            or time.monotonic() - self.last_emit_at >= self.interval
+        )
+
+    def event(self, job: CatalogLoadJob) -> dict:
+        """Событие прогресса; сбрасывает накопленные примеры ошибок"""
+        now = time.monotonic()
+        done = job.processed_count - self.start_processed
+        rate = done / max(now - self.started_at, 1e-9)
+        left = max(0, job.requested_count - job.processed_count)
+
+        event = {
+            "type": "progress",
+            **job_counts(job),
+            "rate": round(rate, 1),
+            "eta_seconds": round(left / rate) if rate > 0 else None,
+            "error_samples": self.error_samples,
+        }
+        self.error_samples = []
+        self.last_emit_at = now
+        self.last_emit_processed = job.processed_count
+        return event
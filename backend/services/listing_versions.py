@@ -0,0 +1,91 @@
+"""
+Версии каталога и генераций пользователей для ETag списков.
+
+Каждая запись каталога (загрузка, синхронизация, загрузка Excel) и
+генераций пользователя (AI-генерация, правка, удаление, экспорт)
+увеличивает версию в таблице `listing_versions` в своей же транзакции:
+новая версия становится видна одновременно с данными и пропадает при
+откате. Списки `/get_items` и `/get_items_sellers` отдают ETag по этим
+версиям, и на `If-None-Match` с тем же ETag отвечают 304, прочитав только
+строки версий, без запросов списка.
+
+Версии читаются до запроса списка: если запись закоммитится между ними,
+ETag окажется старше данных и следующий запрос просто получит их заново.
+"""
+from hashlib import blake2b
+from typing import Iterable, Optional
+import logging
+
+from fastapi import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.listing_versions import ListingVersion
+from services.database import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SCOPE = "catalog"
+# Ответ можно хранить только в кеше браузера и только с проверкой ETag
+CACHE_CONTROL = "private, no-cache"
+
+
+def generations_scope(user_id: int) -> str:
+    return f"generations:{user_id}"
+
+
+async def bump_versions(db: AsyncSession, scopes: Iterable[str]) -> None:
+    """Увеличивает версии в текущей транзакции (без коммита)"""
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+    insert = dialect_insert(db)
+    # Один порядок строк во всех транзакциях — без взаимных блокировок
+    for scope in scopes:
+        stmt = insert(ListingVersion).values(scope=scope, version=1)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[ListingVersion.scope],
+            set_={"version": ListingVersion.version + 1},
+        ))
+
+
+async def current_versions(db: AsyncSession, scopes: list[str]) -> list[int]:
+    """Версии в порядке `scopes`; ещё не записанные — 0"""
+    result = await db.execute(
+        select(ListingVersion.scope, ListingVersion.version).where(ListingVersion.scope.in_(scopes))
+    )
+    versions = dict(result.all())
+    return [versions.get(scope, 0) for scope in scopes]
+
+
+async def listing_etag(db: AsyncSession, user_id: int, listing: str, *params) -> str:
+    """
+    Сильный ETag списка пользователя: по версиям каталога и его генераций
+    (от обеих зависят оба списка) и параметрам запроса.
+    """
+    versions = await current_versions(db, [CATALOG_SCOPE, generations_scope(user_id)])
+    key = repr((listing, user_id, *versions, *params)).encode("utf-8")
+    return '"' + blake2b(key, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Совпадает ли ETag с заголовком If-None-Match (список через запятую, `*`, W/-префикс)"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def set_etag_headers(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    """Ответ 304 без тела"""
+    response = Response(status_code=304)
+    set_etag_headers(response, etag)
+    return response
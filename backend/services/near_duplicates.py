@@ -0,0 +1,205 @@
+"""
+Группы почти-дубликатов каталога (варианты одного товара по цвету или
+размеру) по MinHash-подписям названий и LSH.
+
+Подпись названия — NUM_PERM минимумов универсальных хешей по его
+символьным триграммам; подпись режется на BANDS полос по ROWS значений,
+хеш полосы — корзина. Товары с общей корзиной — кандидаты, кандидат
+подтверждается точным коэффициентом Жаккара триграмм (не ниже
+DUPLICATE_THRESHOLD). Корзины хранятся в `catalog_duplicate_buckets`,
+поэтому новый товар группируется несколькими запросами по индексу, без
+попарного сравнения с каталогом; в корзине хранится не больше BUCKET_CAP
+товаров, так что и кандидатов у товара не больше BANDS * BUCKET_CAP.
+
+Группа — `CatalogItem.duplicate_group_id`, id первого товара группы.
+Товар присоединяется к группе самого похожего кандидата; группы при этом
+не сливаются (это потребовало бы переписать целую группу).
+"""
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Iterable, Optional
+import asyncio
+import logging
+import time
+
+import numpy as np
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import config
+from models.catalog_duplicates import CatalogDuplicateBucket
+from models.catalog_items import CatalogItem
+from services.catalog_events import CatalogChange
+from services.database import AsyncSessionLocal
+from services.similar_index import char_ngrams
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 48
+BANDS = 12
+ROWS = NUM_PERM // BANDS
+# Сколько товаров хранится в одной корзине (остальные всё равно найдут их как кандидатов)
+BUCKET_CAP = 8
+# Размер порции запросов по корзинам
+QUERY_CHUNK = 500
+
+# Универсальные хеши (a * x + b) mod p по простому Мерсенна 2^31 - 1: произведение
+# помещается в uint64. Коэффициенты фиксированы — подписи не зависят от процесса
+PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20261017)
+_A = _rng.integers(1, PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, PRIME, NUM_PERM, dtype=np.uint64)
+
+
+def shingles(name: str) -> frozenset[str]:
+    """Символьные триграммы названия (нижний регистр, ё → е)"""
+    return frozenset(char_ngrams(name or ""))
+
+
+@lru_cache(maxsize=200_000)
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little") % PRIME
+
+
+def signature(items: Iterable[str]) -> np.ndarray:
+    """MinHash-подпись множества триграмм (uint64[NUM_PERM]); у пустого — все PRIME"""
+    hashes = np.fromiter((_shingle_hash(shingle) for shingle in items), dtype=np.uint64)
+    if not len(hashes):
+        return np.full(NUM_PERM, PRIME, dtype=np.uint64)
+    return ((np.outer(hashes, _A) + _B) % PRIME).min(axis=0)
+
+
+def band_keys(sig: np.ndarray) -> list[int]:
+    """Корзины подписи: 64-битный хеш каждой полосы вместе с её номером"""
+    keys = []
+    for band in range(BANDS):
+        data = band.to_bytes(2, "little") + sig[band * ROWS:(band + 1) * ROWS].astype("<u4").tobytes()
+        keys.append(int.from_bytes(blake2b(data, digest_size=8).digest(), "little", signed=True))
+    return keys
+
+
+def jaccard(first: frozenset, second: frozenset) -> float:
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+async def assign_duplicate_groups(db: AsyncSession, changes: list[CatalogChange]) -> int:
+    """
+    Пересчитывает корзины и группы записанных товаров в транзакции записи
+    каталога (без коммита). Изменённый товар получает новые корзины и группу
+    заново. Возвращает число товаров, попавших в группы.
+    """
+    if not changes or not config.DUPLICATE_GROUPING_ENABLED:
+        return 0
+    names = {change.id: change.name for change in changes}
+    item_shingles = {item_id: shingles(name) for item_id, name in names.items()}
+    item_keys = {item_id: band_keys(signature(item_shingles[item_id])) for item_id in names}
+
+    ids = list(names)
+    for start in range(0, len(ids), QUERY_CHUNK):
+        await db.execute(
+            delete(CatalogDuplicateBucket)
+            .where(CatalogDuplicateBucket.catalog_item_id.in_(ids[start:start + QUERY_CHUNK]))
+        )
+
+    # Уже сохранённые товары в корзинах пачки: корзина → товары, товар → (название, группа)
+    members: dict[int, list[int]] = {}
+    known: dict[int, tuple[str, Optional[int]]] = {}
+    keys = list({key for keys in item_keys.values() for key in keys})
+    for start in range(0, len(keys), QUERY_CHUNK):
+        result = await db.execute(
+            select(CatalogDuplicateBucket.bucket, CatalogItem.id, CatalogItem.name, CatalogItem.duplicate_group_id)
+            .join(CatalogItem, CatalogItem.id == CatalogDuplicateBucket.catalog_item_id)
+            .where(CatalogDuplicateBucket.bucket.in_(keys[start:start + QUERY_CHUNK]))
+        )
+        for key, item_id, name, group in result.all():
+            members.setdefault(key, []).append(item_id)
+            known[item_id] = (name, group)
+
+    groups: dict[int, Optional[int]] = {}
+    buckets: list[dict] = []
+    grouped = 0
+    for item_id in ids:
+        own = item_shingles[item_id]
+        best, best_key = None, None
+        candidates = {member for key in item_keys[item_id] for member in members.get(key, ()) if member != item_id}
+        for candidate in candidates:
+            score = jaccard(own, item_shingles.get(candidate) or shingles(known[candidate][0]))
+            if score >= config.DUPLICATE_THRESHOLD and (best_key is None or (-score, candidate) < best_key):
+                best, best_key = candidate, (-score, candidate)
+
+        group = None
+        if best is not None:
+            group = groups.get(best, known[best][1])
+            if group is None:
+                # Первый дубликат товара: товар открывает группу своим id
+                group = groups[best] = best
+                known[best] = (known[best][0], best)
+            grouped += 1
+        groups[item_id] = group
+        known[item_id] = (names[item_id], group)
+
+        for key in item_keys[item_id]:
+            bucket = members.setdefault(key, [])
+            if len(bucket) < BUCKET_CAP:
+                bucket.append(item_id)
+                buckets.append({"bucket": key, "catalog_item_id": item_id})
+
+    table = CatalogItem.__table__
+    await db.execute(
+        update(table)
+        .where(table.c.id == bindparam("item_id"))
+        # updated_at не трогаем: группа — не изменение содержимого товара
+        .values(duplicate_group_id=bindparam("group_id"), updated_at=table.c.updated_at),
+        [{"item_id": item_id, "group_id": group} for item_id, group in groups.items()],
+    )
+    if buckets:
+        await db.execute(insert(CatalogDuplicateBucket), buckets)
+    logger.debug("[NEAR_DUPLICATES] %d товаров, в группах %d", len(ids), grouped)
+    return grouped
+
+
+async def rebuild_duplicate_groups(
+    session_factory: async_sessionmaker = AsyncSessionLocal, chunk_size: int = 1000
+) -> int:
+    """
+    Группирует весь каталог заново (например, после миграции): корзины и
+    группы сбрасываются, товары проходят по порядку id порциями с коммитом
+    после каждой. Возвращает число товаров в группах.
+    """
+    started = time.monotonic()
+    grouped = 0
+    last_id = 0
+    async with session_factory() as db:
+        await db.execute(delete(CatalogDuplicateBucket))
+        await db.execute(update(CatalogItem.__table__).values(
+            duplicate_group_id=None, updated_at=CatalogItem.__table__.c.updated_at
+        ))
+        await db.commit()
+        while True:
+            result = await db.execute(
+                select(CatalogItem.id, CatalogItem.name)
+                .where(CatalogItem.id > last_id)
+                .order_by(CatalogItem.id)
+                .limit(chunk_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            grouped += await assign_duplicate_groups(db, [CatalogChange(item_id, name, "") for item_id, name in rows])
+            await db.commit()
+            last_id = rows[-1][0]
+            await asyncio.sleep(0)
+    logger.info("[NEAR_DUPLICATES] Группы пересчитаны: %d товаров в группах за %.1f с",
+                grouped, time.monotonic() - started)
+    return grouped
+
+
+async def duplicate_stats(db: AsyncSession) -> dict:
+    """Число групп и товаров в них"""
+    result = await db.execute(
+        select(func.count(func.distinct(CatalogItem.duplicate_group_id)), func.count(CatalogItem.duplicate_group_id))
+    )
+    groups, items = result.one()
+    return {"groups": groups, "grouped_items": items}
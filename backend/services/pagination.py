@@ -0,0 +1,131 @@
+"""
+Keyset-пагинация: непрозрачные курсоры и дешёвая оценка числа результатов.
+
+Курсор хранит ключ сортировки последней строки страницы (например,
+[релевантность, id]), следующая страница читается условием «после этого
+ключа», поэтому глубокие страницы стоят столько же, сколько первая.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Optional
+import base64
+import binascii
+import json
+import logging
+
+from fastapi import Response
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Page:
+    """Страница результатов: строки, курсор следующей страницы и оценка общего числа"""
+    items: list = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    # Оценка считается только для первой страницы (без курсора)
+    total: Optional[int] = None
+    total_exact: bool = True
+
+
+class Ranking:
+    """
+    Запрос поиска без сортировки и его порядок для keyset-пагинации: по
+    score (если есть; по возрастанию или убыванию), затем по id_column по
+    возрастанию. Первая колонка запроса — сущность страницы или её id.
+    """
+
+    def __init__(self, stmt: Select, id_column, score=None, descending: bool = False):
+        self.stmt = stmt
+        self.id_column = id_column
+        self.score = score
+        self.descending = descending
+
+    def page_stmt(self, after: Optional[list], limit: int) -> Select:
+        """Запрос страницы после ключа `after` ([score, id] или [id]); на одну строку больше limit"""
+        stmt = self.stmt
+        order = [self.id_column]
+        if self.score is not None:
+            stmt = stmt.add_columns(self.score)
+            order.insert(0, self.score.desc() if self.descending else self.score)
+        if after is not None:
+            if self.score is None:
+                stmt = stmt.where(self.id_column > after[0])
+            else:
+                last_score, last_id = after
+                beyond = self.score < last_score if self.descending else self.score > last_score
+                stmt = stmt.where(or_(beyond, and_(self.score == last_score, self.id_column > last_id)))
+        return stmt.order_by(*order).limit(limit + 1)
+
+    def key(self, row) -> list:
+        """Ключ строки результата `page_stmt` для курсора (score — последняя колонка)"""
+        first = row[0]
+        row_id = first if isinstance(first, int) else first.id
+        return [row[-1], row_id] if self.score is not None else [row_id]
+
+
+def encode_cursor(payload: dict) -> str:
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, **expected: Any) -> dict:
+    """
+    Разбирает курсор и проверяет, что он выдан для тех же параметров запроса
+    (`expected`). При ошибке — ValueError.
+    """
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Некорректный курсор") from e
+    if not isinstance(payload, dict) or not isinstance(payload.get("key"), list):
+        raise ValueError("Некорректный курсор")
+    for name, value in expected.items():
+        if payload.get(name) != value:
+            raise ValueError("Курсор выдан для другого запроса")
+    return payload
+
+
+async def estimate_total(db: AsyncSession, stmt: Select) -> tuple[int, bool]:
+    """
+    Оценка числа строк запроса без полного COUNT(*): в PostgreSQL — оценка
+    планировщика (EXPLAIN), в остальных БД — подсчёт не больше
+    PAGINATION_COUNT_CAP строк. Возвращает (число, точно ли оно).
+    """
+    stmt = stmt.order_by(None).limit(None)
+    cap = config.PAGINATION_COUNT_CAP
+
+    if db.bind.dialect.name == "postgresql":
+        # Запрос компилируется с параметрами и уходит в драйвер как есть: текст
+        # поиска (например, «:белая») не подставляется в SQL и не разбирается
+        # повторно как именованный параметр
+        compiled = stmt.compile(dialect=db.bind.dialect)
+        params = compiled.construct_params()
+        if compiled.positional:
+            params = tuple(params[name] for name in compiled.positiontup)
+        connection = await db.connection()
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"]), False
+
+    capped = stmt.limit(cap + 1).subquery()
+    count = (await db.execute(select(func.count()).select_from(capped))).scalar_one()
+    if count > cap:
+        return cap, False
+    return count, True
+
+
+def set_page_headers(response: Response, page: Page) -> None:
+    """Курсор следующей страницы и оценка общего числа — в заголовках ответа"""
+    if page.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if page.total is not None:
+        response.headers["X-Total-Estimate"] = str(page.total)
+        response.headers["X-Total-Exact"] = "true" if page.total_exact else "false"
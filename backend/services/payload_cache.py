@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from hashlib import sha256
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
+import logging
+import zlib
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config import config
+from models.sima_land_payloads import SimaLandPage, SimaLandPayload
+from services.database import AsyncSessionLocal, dialect_insert
+from services.sima_land_client import SimaLandClient, parse_page
+
+logger = logging.getLogger(__name__)
+
+
+class PayloadCache:
+    """
+    Кеш сырых ответов Sima-Land API в БД.
+
+    Ответы хранятся сжатыми (zlib) и адресуются по sha256 содержимого,
+    страница каталога ссылается на последний полученный ответ. Это позволяет
+    пропускать недавно загруженные страницы и переигрывать сохранённые
+    ответы (перемаппинг, бэкфилл новых колонок) без обращений к API.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal):
+        self.session_factory = session_factory
+
+    async def get(self, page_number: int, max_age: Optional[float] = None) -> Optional[bytes]:
+        """Сырой ответ для страницы или None, если его нет или он старше max_age секунд"""
+        stmt = (
+            select(SimaLandPayload.data)
+            .join(SimaLandPage, SimaLandPage.payload_hash == SimaLandPayload.sha256)
+            .where(SimaLandPage.page_number == page_number)
+        )
+        if max_age is not None:
+            stmt = stmt.where(SimaLandPage.fetched_at >= datetime.now() - timedelta(seconds=max_age))
+
+        async with self.session_factory() as db:
+            data = await db.scalar(stmt)
+        return zlib.decompress(data) if data is not None else None
+
+    async def store(self, page_number: int, raw: bytes) -> str:
+        """Сохраняет ответ для страницы и возвращает его sha256"""
+        digest = sha256(raw).hexdigest()
+        now = datetime.now()
+
+        async with self.session_factory() as db:
+            insert = dialect_insert(db)
+            await db.execute(
+                insert(SimaLandPayload)
+                .values(sha256=digest, data=zlib.compress(raw, 6), size=len(raw), created_at=now, updated_at=now)
+                .on_conflict_do_nothing(index_elements=[SimaLandPayload.sha256])
+            )
+            stmt = insert(SimaLandPage).values(
+                page_number=page_number, payload_hash=digest, fetched_at=now, created_at=now, updated_at=now
+            )
+            await db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[SimaLandPage.page_number],
+                    set_={"payload_hash": digest, "fetched_at": now, "updated_at": now},
+                )
+            )
+            await db.commit()
+        return digest
+
+    def cached_fetch(
+        self,
+        client: SimaLandClient,
+        max_age: Optional[float] = None,
+    ) -> Callable[[int], Awaitable[list[dict]]]:
+        """
+        Функция загрузки страницы для `SimaLandClient.iter_pages`: свежая
+        страница (не старше max_age секунд, по умолчанию SIMA_LAND_CACHE_TTL)
+        берётся из кеша, остальные запрашиваются из API и сохраняются.
+        """
+        if max_age is None:
+            max_age = config.SIMA_LAND_CACHE_TTL
+
+        async def fetch(page_number: int) -> list[dict]:
+            if max_age > 0:
+                raw = await self.get(page_number, max_age=max_age)
+                if raw is not None:
+                    logger.debug("[PAYLOAD_CACHE] Страница %d взята из кеша", page_number)
+                    return parse_page(raw)
+            raw = await client.fetch_page_raw(page_number)
+            await self.store(page_number, raw)
+            return parse_page(raw)
+
+        return fetch
+
+    async def replay(self, pages: Iterable[int]) -> AsyncIterator[tuple[int, Optional[list[dict]]]]:
+        """Отдаёт сохранённые страницы по порядку без сети; для отсутствующих — None"""
+        for page_number in pages:
+            raw = await self.get(page_number)
+            yield page_number, parse_page(raw) if raw is not None else None
+
+
+payload_cache = PayloadCache()
@@ -0,0 +1,125 @@
+"""
+Стеммер русского языка (алгоритм Snowball/Портера для русского).
+
+Используется там, где нет стемминга на стороне БД: для префиксных запросов
+к SQLite FTS5 и в поисковых индексах в памяти.
+"""
+import re
+
+VOWELS = "аеёиоуыэюя"
+
+PERFECTIVE_GERUND = (("в", "вши", "вшись"), ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"))
+ADJECTIVE = (
+    (),
+    (
+        "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+        "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+    ),
+)
+PARTICIPLE = (("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+REFLEXIVE = ((), ("ся", "сь"))
+VERB = (
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"),
+    (
+        "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым",
+        "ен", "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю",
+    ),
+)
+NOUN = (
+    (),
+    (
+        "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой",
+        "ий", "й", "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь",
+        "ию", "ью", "ю", "ия", "ья", "я",
+    ),
+)
+DERIVATIONAL = ((), ("ост", "ость"))
+SUPERLATIVE = ((), ("ейш", "ейше"))
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Слова не длиннее этого ищутся по префиксу целиком: у коротких слов основа
+# слишком короткая («чай» → «ча*» нашёл бы «чашку»)
+SHORT_WORD = 4
+
+
+def _region_after_vowel_consonant(word: str, start: int) -> int:
+    """Начало региона после первой пары «гласная + согласная», начиная с start"""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _remove_ending(word: str, region: int, groups: tuple[tuple[str, ...], tuple[str, ...]]) -> str | None:
+    """
+    Отрезает самое длинное окончание из групп, лежащее в регионе.
+    Окончания первой группы допустимы только после «а» или «я».
+    Возвращает None, если окончание не найдено.
+    """
+    best = None
+    for group_index, group in enumerate(groups):
+        for ending in group:
+            if word.endswith(ending) and (best is None or len(ending) > len(best[0])):
+                best = (ending, group_index)
+    if best is None:
+        return None
+
+    ending, group_index = best
+    cut = len(word) - len(ending)
+    if cut < region:
+        return None
+    if group_index == 0 and (cut - 1 < region or word[cut - 1] not in "ая"):
+        return None
+    return word[:cut]
+
+
+def stem(word: str) -> str:
+    """Основа слова; слова без гласных и не кириллица возвращаются в нижнем регистре как есть"""
+    word = word.lower()
+    rv = next((i + 1 for i, ch in enumerate(word) if ch in VOWELS), len(word))
+    if rv >= len(word):
+        return word
+    r1 = _region_after_vowel_consonant(word, 0)
+    r2 = _region_after_vowel_consonant(word, r1)
+
+    # Шаг 1: деепричастие, иначе возвратное окончание и прилагательное/глагол/существительное
+    result = _remove_ending(word, rv, PERFECTIVE_GERUND)
+    if result is None:
+        word = _remove_ending(word, rv, REFLEXIVE) or word
+        adjectival = _remove_ending(word, rv, ADJECTIVE)
+        if adjectival is not None:
+            result = _remove_ending(adjectival, rv, PARTICIPLE) or adjectival
+        else:
+            result = _remove_ending(word, rv, VERB) or _remove_ending(word, rv, NOUN)
+    word = result or word
+
+    # Шаг 2: конечное «и»
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Шаг 3: словообразовательное окончание в R2
+    word = _remove_ending(word, r2, DERIVATIONAL) or word
+
+    # Шаг 4: превосходная степень, двойное «н», мягкий знак
+    if word.endswith("нн") and len(word) - 1 >= rv:
+        return word[:-1]
+    superlative = _remove_ending(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+        if word.endswith("нн"):
+            word = word[:-1]
+        return word
+    if word.endswith("ь") and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Слова текста в нижнем регистре"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def search_prefix(token: str) -> str:
+    """Префикс, которым ищется слово запроса: основа, у коротких слов — само слово"""
+    return token if len(token) <= SHORT_WORD else stem(token)
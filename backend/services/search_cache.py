@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import logging
+
+from config import config
+from services.catalog_events import CatalogChange, add_listener
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str, mode: str) -> str:
+    """
+    Запрос в том виде, в котором он ищется и попадает в ключ кеша: без
+    крайних и повторных пробелов, в режимах fulltext и fuzzy — в нижнем
+    регистре (регистр там не влияет на результат; в substring/similar он
+    может влиять в SQLite, поэтому сохраняется).
+    """
+    query = " ".join(query.split())
+    return query.lower() if mode in ("fulltext", "fuzzy") else query
+
+
+class SearchResultCache:
+    """
+    LRU-кеш результатов поиска по каталогу в памяти процесса.
+
+    Ключ записи включает версию каталога, которая увеличивается после
+    каждого коммита записи каталога (`services.catalog_events`: загрузчик,
+    загрузка из Excel), поэтому запись никогда не переживает изменение
+    каталога — без TTL. Результат, вычисленный во время записи каталога,
+    сохраняется под версией, с которой поиск начинался, и не будет отдан.
+    Кешируется только «каталожная» часть ответа, общая для всех
+    пользователей.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = config.SEARCH_CACHE_SIZE if max_entries is None else max_entries
+        self.version = 0
+        self._entries: OrderedDict[tuple, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Значение для ключа при текущей версии каталога или None"""
+        if not self.max_entries:
+            return None
+        value = self._entries.get((self.version, key))
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((self.version, key))
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any, version: int) -> None:
+        """Сохраняет значение, вычисленное при версии `version` (устаревшее не сохраняется)"""
+        if not self.max_entries or version != self.version:
+            return
+        self._entries[(version, key)] = value
+        self._entries.move_to_end((version, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Новая версия каталога: все записи становятся недоступны и удаляются"""
+        self.version += 1
+        self.invalidations += 1
+        self._entries.clear()
+
+    def on_catalog_change(self, changes: list[CatalogChange]) -> None:
+        """Подписчик `services.catalog_events`"""
+        self.invalidate()
+        logger.debug("[SEARCH_CACHE] Каталог изменён (%d товаров), версия %d", len(changes), self.version)
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+search_result_cache = SearchResultCache()
+# Подписка сразу при импорте: кеш не должен пропустить ни одной записи каталога
+add_listener(search_result_cache.on_catalog_change)
@@ -0,0 +1,368 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, Optional
+import asyncio
+import logging
+import math
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import config
+from models.catalog_items import CatalogItem
+from services.catalog_browse import ITEM_COLUMNS
+from services.catalog_events import CatalogChange, add_listener, remove_listener
+from services.database import AsyncSessionLocal
+from services.fast_json import row_dicts
+from services.russian_stemmer import search_prefix, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Слово названия весит как NAME_WEIGHT слов slug
+NAME_WEIGHT = 2
+MAX_TF = 255
+MAX_DOC_LEN = 65535
+# Кешированные веса терма пересчитываются, когда число товаров изменилось больше чем на эту долю
+SCORE_CACHE_DRIFT = 0.05
+# Новые термы просматриваются перебором, пока их не больше этого; затем вливаются в сортированный словарь
+TERM_DELTA_LIMIT = 1000
+
+# Слова запросов повторяются, а стемминг — самая дорогая часть разбора запроса
+cached_prefix = lru_cache(maxsize=200_000)(search_prefix)
+
+
+class CatalogSearchIndex:
+    """
+    Инвертированный индекс каталога в памяти с ранжированием BM25.
+
+    Термы — слова name и slug в нижнем регистре. Слово запроса ищется, как в
+    FTS5 (`services.catalog_search.fts5_query`): по префиксу — основе слова
+    (стеммер Snowball), у коротких слов — самому слову; совпадают все термы с
+    этим префиксом (бинарный поиск по сортированному словарю), так что
+    находятся и словоформы, и недописанное слово. Документы нумеруются
+    внутренними номерами по порядку добавления, поэтому списки вхождений
+    только дописываются и всегда отсортированы; хранятся они компактно —
+    `array('I')` номеров и `array('B')` частот на терм. Изменённый товар
+    добавляется под новым номером, а старый помечается удалённым (документ
+    пропускается при поиске), так что индекс обновляется без перестроения.
+    Частота терма (df) для idf считается по всем вхождениям, включая
+    удалённые, — при редких изменениях это несущественно. Числа из slug
+    (артикулы) не индексируются: для поиска по артикулу есть режим substring.
+
+    Веса BM25 всех вхождений терма вычисляются при первом запросе и
+    кешируются до изменения списка вхождений, поэтому запрос по частому
+    слову — это выборка из готового массива и частичная сортировка.
+
+    Индекс строится из БД при старте (`start`) и обновляется событиями
+    `services.catalog_events` после коммита записей каталога.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+        self._clear()
+
+    def _clear(self) -> None:
+        self._terms: dict[str, int] = {}
+        self._postings: list[array] = []
+        self._frequencies: list[array] = []
+        # Внутренний номер документа → id товара, длина, признак «жив»
+        self._doc_ids = array('I')
+        self._doc_len = array('H')
+        self._alive = bytearray()
+        # id товара → текущий внутренний номер
+        self._doc_by_id: dict[int, int] = {}
+        self._total_len = 0
+        # Терм → (длина списка вхождений, число товаров, веса BM25 вхождений)
+        self._score_cache: dict[int, tuple[int, int, np.ndarray]] = {}
+        # Сортированный словарь для поиска по префиксу (строится при первом
+        # запросе) и термы, добавленные после его построения
+        self._sorted_terms: Optional[list[str]] = None
+        self._new_terms: list[str] = []
+
+    @property
+    def documents(self) -> int:
+        return len(self._doc_by_id)
+
+    def _analyze(self, name: str, slug: str) -> Counter:
+        counts: Counter = Counter()
+        for token in tokenize(name or ""):
+            counts[token] += NAME_WEIGHT
+        for token in tokenize(slug or ""):
+            if not token.isdigit():
+                counts[token] += 1
+        return counts
+
+    def _kill(self, doc: int) -> None:
+        self._alive[doc] = 0
+        self._total_len -= self._doc_len[doc]
+
+    def upsert(self, changes: Iterable[CatalogChange]) -> None:
+        """Добавляет товары; уже проиндексированные заменяются новой версией"""
+        for change in changes:
+            previous = self._doc_by_id.get(change.id)
+            if previous is not None:
+                self._kill(previous)
+
+            doc = len(self._doc_ids)
+            counts = self._analyze(change.name, change.slug)
+            length = min(sum(counts.values()), MAX_DOC_LEN)
+            self._doc_ids.append(change.id)
+            self._doc_len.append(length)
+            self._alive.append(1)
+            self._doc_by_id[change.id] = doc
+            self._total_len += length
+
+            for term, frequency in counts.items():
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    term_id = self._terms[term] = len(self._postings)
+                    self._postings.append(array('I'))
+                    self._frequencies.append(array('B'))
+                    if self._sorted_terms is not None:
+                        self._new_terms.append(term)
+                self._postings[term_id].append(doc)
+                self._frequencies[term_id].append(min(frequency, MAX_TF))
+
+    def remove(self, ids: Iterable[int]) -> None:
+        for item_id in ids:
+            doc = self._doc_by_id.pop(item_id, None)
+            if doc is not None:
+                self._kill(doc)
+
+    def on_catalog_change(self, changes: list[CatalogChange]) -> None:
+        """Подписчик `services.catalog_events`"""
+        self.upsert(changes)
+
+    @property
+    def deleted_documents(self) -> int:
+        return len(self._doc_ids) - self.documents
+
+    def _term_scores(self, term_id: int) -> np.ndarray:
+        """Веса BM25 всех вхождений терма (float32, в порядке списка вхождений)"""
+        docs = self._postings[term_id]
+        cached = self._score_cache.get(term_id)
+        if (
+            cached is not None and cached[0] == len(docs)
+            and abs(cached[1] - self.documents) <= SCORE_CACHE_DRIFT * self.documents
+        ):
+            return cached[2]
+
+        df = len(docs)
+        avg_len = self._total_len / self.documents
+        idf = math.log(1 + (self.documents - df + 0.5) / (df + 0.5))
+        lengths = np.frombuffer(self._doc_len, dtype=np.uint16)[np.frombuffer(docs, dtype=np.uint32)]
+        tf = np.frombuffer(self._frequencies[term_id], dtype=np.uint8).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths / avg_len)
+        scores = (idf * tf * (self.k1 + 1) / (tf + norm)).astype(np.float32)
+        self._score_cache[term_id] = (df, self.documents, scores)
+        return scores
+
+    def _expand(self, prefix: str) -> list[int]:
+        """Термы, начинающиеся с префикса"""
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._terms)
+            self._new_terms = []
+        elif len(self._new_terms) > TERM_DELTA_LIMIT:
+            # Два отсортированных участка timsort сливает за линейное время
+            self._sorted_terms += sorted(self._new_terms)
+            self._sorted_terms.sort()
+            self._new_terms = []
+
+        terms = self._sorted_terms
+        found = []
+        position = bisect_left(terms, prefix)
+        while position < len(terms) and terms[position].startswith(prefix):
+            found.append(self._terms[terms[position]])
+            position += 1
+        found.extend(self._terms[term] for term in self._new_terms if term.startswith(prefix))
+        return found
+
+    def _prefix_postings(self, prefix: str) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """
+        Документы (по возрастанию) с термами на префикс и сумма весов BM25
+        этих термов в каждом; None, если таких термов нет
+        """
+        term_ids = self._expand(prefix)
+        if not term_ids:
+            return None
+        if len(term_ids) == 1:
+            return np.frombuffer(self._postings[term_ids[0]], dtype=np.uint32), self._term_scores(term_ids[0])
+        docs = np.concatenate([np.frombuffer(self._postings[term_id], dtype=np.uint32) for term_id in term_ids])
+        scores = np.concatenate([self._term_scores(term_id) for term_id in term_ids])
+        docs, inverse = np.unique(docs, return_inverse=True)
+        return docs, np.bincount(inverse, weights=scores).astype(np.float32)
+
+    def search_scored(
+        self, query: str, limit: int = 100, after: Optional[list] = None
+    ) -> tuple[list[tuple[int, float]], int]:
+        """
+        Пары (id товара, вес BM25) для товаров, содержащих все слова запроса
+        (по префиксам, как FTS5), по убыванию веса, при равенстве — по id;
+        `after` — ключ [вес, id] последнего товара предыдущей страницы. Второе
+        значение — общее число найденных товаров (без учёта `after`).
+        """
+        prefixes = {cached_prefix(token) for token in tokenize(query)}
+        if not prefixes or not self.documents:
+            return [], 0
+        matches = []
+        for prefix in prefixes:
+            postings = self._prefix_postings(prefix)
+            if postings is None:
+                return [], 0
+            matches.append(postings)
+        # Пересечение начинаем с самого короткого списка
+        matches.sort(key=lambda pair: len(pair[0]))
+
+        candidates, scores = matches[0]
+        if self.deleted_documents:
+            keep = np.frombuffer(self._alive, dtype=np.uint8)[candidates].astype(bool)
+            candidates, scores = candidates[keep], scores[keep]
+
+        for docs, doc_scores in matches[1:]:
+            if not len(candidates):
+                return [], 0
+            positions = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+            hit = docs[positions] == candidates
+            candidates = candidates[hit]
+            scores = scores[hit] + doc_scores[positions[hit]]
+
+        total = len(candidates)
+        item_ids = np.frombuffer(self._doc_ids, dtype=np.uint32)[candidates]
+        if after is not None:
+            last_score, last_id = np.float32(after[0]), after[1]
+            beyond = (scores < last_score) | ((scores == last_score) & (item_ids > last_id))
+            item_ids, scores = item_ids[beyond], scores[beyond]
+        item_ids, scores = top_scored(item_ids, scores, limit)
+        return list(zip(item_ids.tolist(), scores.astype(float).tolist())), total
+
+    def search(self, query: str, limit: int = 100) -> list[int]:
+        """id товаров по запросу в порядке релевантности (см. `search_scored`)"""
+        return [item_id for item_id, _ in self.search_scored(query, limit)[0]]
+
+    async def fetch(self, db: AsyncSession, query: str, limit: int = 100) -> list[dict]:
+        """Товары по запросу в порядке релевантности"""
+        return await load_items(db, self.search(query, limit))
+
+    async def build(self, session_factory: async_sessionmaker, chunk_size: Optional[int] = None) -> None:
+        """Строит индекс по всему каталогу, читая его порциями по id"""
+        chunk_size = chunk_size or config.SEARCH_INDEX_BUILD_CHUNK
+        started = time.monotonic()
+        self.ready = False
+        self._clear()
+        last_id = 0
+        async with session_factory() as db:
+            while True:
+                result = await db.execute(
+                    select(CatalogItem.id, CatalogItem.name, CatalogItem.slug)
+                    .where(CatalogItem.id > last_id)
+                    .order_by(CatalogItem.id)
+                    .limit(chunk_size)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                self.upsert(CatalogChange(*row) for row in rows)
+                last_id = rows[-1][0]
+                # Отдаём управление циклу событий между порциями
+                await asyncio.sleep(0)
+        self.ready = True
+        logger.info(
+            "[SEARCH_INDEX] Индекс построен: %d товаров, %d термов за %.1f с",
+            self.documents, len(self._terms), time.monotonic() - started,
+        )
+
+    async def start(self, session_factory: async_sessionmaker = AsyncSessionLocal) -> None:
+        """
+        Подписывается на изменения каталога и строит индекс в фоне. Подписка
+        идёт до построения: изменения, пришедшие во время чтения каталога,
+        заменяют прочитанные версии товаров.
+        """
+        add_listener(self.on_catalog_change)
+        self._task = asyncio.create_task(self.build(session_factory))
+
+    async def stop(self) -> None:
+        remove_listener(self.on_catalog_change)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.ready = False
+
+    def memory_report(self) -> dict:
+        """Оценка памяти индекса по структурам (байты)"""
+        postings = sum(sys.getsizeof(docs) for docs in self._postings) + sys.getsizeof(self._postings)
+        frequencies = sum(sys.getsizeof(freq) for freq in self._frequencies) + sys.getsizeof(self._frequencies)
+        vocabulary = sys.getsizeof(self._terms) + sum(
+            sys.getsizeof(term) + sys.getsizeof(term_id) for term, term_id in self._terms.items()
+        ) + sys.getsizeof(self._sorted_terms or []) + sys.getsizeof(self._new_terms)
+        documents = sys.getsizeof(self._doc_ids) + sys.getsizeof(self._doc_len) + sys.getsizeof(self._alive)
+        # Ключи и значения словаря — отдельные объекты int
+        id_map = sys.getsizeof(self._doc_by_id) + len(self._doc_by_id) * 2 * sys.getsizeof(2 ** 20)
+        score_cache = sys.getsizeof(self._score_cache) + sum(
+            scores.nbytes for _, _, scores in self._score_cache.values()
+        )
+        total = postings + frequencies + vocabulary + documents + id_map + score_cache
+        return {
+            "ready": self.ready,
+            "documents": self.documents,
+            "deleted_documents": self.deleted_documents,
+            "terms": len(self._terms),
+            "postings": sum(len(docs) for docs in self._postings),
+            "bytes": {
+                "postings": postings,
+                "frequencies": frequencies,
+                "vocabulary": vocabulary,
+                "documents": documents,
+                "id_map": id_map,
+                "score_cache": score_cache,
+            },
+            "total_bytes": total,
+            "total_mb": round(total / 2 ** 20, 2),
+        }
+
+
+async def load_items(db: AsyncSession, ids: list[int]) -> list[dict]:
+    """
+    Товары по первичному ключу в порядке `ids` — словари колонок
+    ITEM_COLUMNS, без ORM-объектов; удалённые из БД пропускаются
+    """
+    if not ids:
+        return []
+    result = await db.execute(select(*ITEM_COLUMNS).where(CatalogItem.id.in_(ids)))
+    by_id = {item["id"]: item for item in row_dicts(result.all(), ITEM_COLUMNS)}
+    return [by_id[item_id] for item_id in ids if item_id in by_id]
+
+
+def top_scored(item_ids: np.ndarray, scores: np.ndarray, limit: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    `limit` лучших по (вес по убыванию, id по возрастанию), отсортированные.
+    Без полной сортировки: argpartition находит порог веса, а из товаров с
+    весом, равным порогу, берутся наименьшие id.
+    """
+    if len(scores) > limit:
+        # Много одинаковых весов замедляет argpartition в разы: разводим
+        # равные веса по порядку документов
+        keys = scores.astype(np.float64) - np.arange(len(scores)) * 1e-12
+        threshold = scores[np.argpartition(-keys, limit - 1)[:limit]].min()
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)
+        need = max(limit - len(above), 0)
+        if need == 0:
+            ties = ties[:0]
+        elif len(ties) > need:
+            ties = ties[np.argpartition(item_ids[ties], need - 1)[:need]]
+        chosen = np.concatenate([above, ties])
+        item_ids, scores = item_ids[chosen], scores[chosen]
+    order = np.lexsort((item_ids, -scores))
+    return item_ids[order], scores[order]
+
+
+catalog_search_index = CatalogSearchIndex()
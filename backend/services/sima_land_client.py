@@ -0,0 +1,202 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
+import json
+import logging
+import random
+
+import httpx
+
+from config import config
+from services.adaptive_limiter import AdaptiveLimiter
+
+logger = logging.getLogger(__name__)
+
+# Ответы, после которых запрос повторяется, а лимит запросов снижается
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах: число секунд или HTTP-дата; None, если заголовка нет или он некорректен"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def parse_page(raw: bytes) -> list[dict]:
+    """Список товаров из тела ответа `/item/`"""
+    return json.loads(raw).get("items", [])
+
+
+def map_api_data_to_item(api_data: dict) -> dict:
+    """Маппинг данных из Sima-Land API в структуру Item"""
+    return {
+        "id_item": str(api_data.get("id", "")),
+        "uid": str(api_data.get("uid", "")),
+        "sid": str(api_data.get("sid", "")),
+        "balance": (
+            int(api_data.get("balance", 0))
+            if api_data.get("balance") not in [None, ""]
+            else 0
+        ),
+        "name": api_data.get("name", ""),
+        "slug": api_data.get("slug", ""),
+        "stuff": api_data.get("stuff"),
+        "category_id": str(api_data.get("category_id", "")),
+        "photoUrl": api_data.get("photoUrl"),
+        "image_title": api_data.get("image_title"),
+        "price": float(api_data.get("price", 0.0)),
+    }
+
+
+class SimaLandClient:
+    """
+    Клиент Sima-Land API с постоянным пулом соединений.
+    Страницы каталога запрашиваются параллельно, но отдаются строго в порядке
+    номеров страниц. Число одновременных запросов подстраивается под API
+    (`AdaptiveLimiter`, не больше `concurrency`); страница, получившая
+    429/5xx или сетевую ошибку, повторяется с экспоненциальной задержкой
+    со случайным разбросом или через `Retry-After`.
+    """
+
+    def __init__(
+        self,
+        base_url: str = config.SIMA_LAND_BASE_URL,
+        concurrency: int = config.SIMA_LAND_CONCURRENCY,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_retries: int = config.SIMA_LAND_MAX_RETRIES,
+        retry_base_delay: float = config.SIMA_LAND_RETRY_BASE_DELAY,
+        retry_max_delay: float = config.SIMA_LAND_RETRY_MAX_DELAY,
+    ):
+        self.base_url = base_url
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.limiter = AdaptiveLimiter(
+            max_limit=self.concurrency,
+            min_limit=config.SIMA_LAND_MIN_CONCURRENCY,
+            initial_limit=max(1, self.concurrency // 2),
+        )
+
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Общий httpx-клиент; пересоздаётся, если был закрыт при остановке приложения"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={'Content-Type': 'application/json'},
+                timeout=httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+                follow_redirects=False,
+                transport=self.transport,
+            )
+        return self._client
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Экспоненциальная задержка со случайным разбросом (full jitter)"""
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    async def fetch_page_raw(self, page_number: int) -> bytes:
+        """
+        Загружает одну страницу каталога и возвращает тело ответа как есть.
+        429/5xx и сетевые ошибки повторяются до `max_retries` раз, прочие
+        ошибки (4xx) пробрасываются сразу и лимит запросов не увеличивают.
+        """
+        attempt = 0
+        while True:
+            started = await self.limiter.acquire()
+            # None — исход без сигнала о нагрузке (4xx, отмена): лимит не растёт
+            ok, retry_after = None, None
+            try:
+                response = await self.client.get("/item/", params={"page": page_number})
+                if response.status_code in RETRYABLE_STATUSES:
+                    ok = False
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if retry_after is not None:
+                        retry_after = min(retry_after, self.retry_max_delay)
+                response.raise_for_status()
+                ok = True
+                return response.content
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if isinstance(e, httpx.TransportError):
+                    ok = False
+                if ok is None or attempt >= self.max_retries:
+                    self.limiter.stats.errors += 1
+                    raise
+                error = e
+            finally:
+                self.limiter.release(started, ok=ok, retry_after=retry_after)
+
+            delay = retry_after if retry_after is not None else self._retry_delay(attempt)
+            attempt += 1
+            self.limiter.stats.retries += 1
+            logger.warning(
+                "[SIMA_LAND] Страница %d: %s, повтор %d/%d через %.1f с",
+                page_number, error, attempt, self.max_retries, delay,
+            )
+            await asyncio.sleep(delay)
+
+    async def fetch_page(self, page_number: int) -> list[dict]:
+        """Загружает одну страницу каталога и возвращает список товаров"""
+        return parse_page(await self.fetch_page_raw(page_number))
+
+    async def iter_pages(
+        self,
+        pages: Iterable[int],
+        fetch: Optional[Callable[[int], Awaitable[list[dict]]]] = None,
+    ) -> AsyncIterator[tuple[int, list[dict]]]:
+        """
+        Параллельно загружает страницы и отдаёт пары (номер страницы, товары)
+        в исходном порядке. Ошибка загрузки страницы пробрасывается в момент,
+        когда до неё доходит очередь; незавершённые запросы при этом отменяются.
+        `fetch` позволяет подменить загрузку страницы (например, кешем).
+        """
+        fetch = fetch or self.fetch_page
+        pages_iter = iter(pages)
+        in_flight: deque[tuple[int, asyncio.Task]] = deque()
+
+        def schedule_next() -> None:
+            page_number = next(pages_iter, None)
+            if page_number is not None:
+                in_flight.append((page_number, asyncio.create_task(fetch(page_number))))
+
+        try:
+            for _ in range(self.concurrency):
+                schedule_next()
+
+            while in_flight:
+                page_number, task = in_flight.popleft()
+                items = await task
+                schedule_next()
+                yield page_number, items
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*(task for _, task in in_flight), return_exceptions=True)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+
+
+sima_land_client = SimaLandClient()
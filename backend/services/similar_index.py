@@ -0,0 +1,311 @@
+from array import array
+from collections import Counter
+from typing import Iterable, Optional
+import asyncio
+import logging
+import math
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import config
+from models.catalog_items import CatalogItem
+from services.catalog_events import CatalogChange, add_listener, remove_listener
+from services.database import AsyncSessionLocal
+from services.russian_stemmer import tokenize
+from services.search_index import top_scored
+
+logger = logging.getLogger(__name__)
+
+# Длина символьной n-граммы; слова дополняются пробелами по краям
+NGRAM = 3
+# Нормы товаров пересчитываются с новыми idf, когда число товаров изменилось больше чем на эту долю
+NORM_DRIFT = 0.05
+# Сколько вхождений столбцов n-грамм просматривается при отборе кандидатов
+# и сколько лучших кандидатов пересчитывается точно (см. `similar`)
+CANDIDATE_POSTINGS = 300_000
+CANDIDATES = 2000
+# Товаров на шаг построения между передачами управления циклу событий
+BUILD_BATCH = 1000
+
+
+def item_text(name: Optional[str], stuff: Optional[str], image_title: Optional[str]) -> str:
+    """Текст товара для сравнения: название, материал и заголовок изображения"""
+    return " ".join(part for part in (name, stuff, image_title) if part)
+
+
+def char_ngrams(text: str) -> Counter:
+    """Символьные n-граммы слов текста (нижний регистр, ё → е) с частотами"""
+    counts: Counter = Counter()
+    for token in tokenize(text.replace("ё", "е").replace("Ё", "Е")):
+        padded = f" {token} "
+        counts.update(padded[i:i + NGRAM] for i in range(max(len(padded) - NGRAM + 1, 1)))
+    return counts
+
+
+class CatalogSimilarIndex:
+    """
+    Похожие товары по TF-IDF символьных n-грамм текста товара (название,
+    материал, заголовок изображения) и косинусной близости — локально, без
+    внешних сервисов эмбеддингов.
+
+    Матрица TF-IDF разреженная и хранится по столбцам: для каждой n-граммы —
+    номера товаров (`array('I')`) и сублинейные частоты 1 + log(tf)
+    (`array('f')`), плюс строки товаров (n-граммы и частоты подряд, границы
+    в `_row_ptr`) для вектора запроса. Скалярные произведения товара со всеми
+    остальными считаются одним `np.bincount` по спискам его n-грамм, веса
+    idf — по текущему числу товаров. Как в `services.search_index`,
+    изменённый товар добавляется под новым номером, старый помечается
+    удалённым; товар с тем же текстом (изменилась цена или остаток) не
+    переиндексируется.
+
+    Индекс строится из БД при старте (`start`) и обновляется событиями
+    `services.catalog_events` после коммита записей каталога.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+        # id товаров, изменённых событиями во время построения: прочитанные
+        # раньше строки не должны затереть их новые версии
+        self._touched: Optional[set[int]] = None
+        self._clear()
+
+    def _clear(self) -> None:
+        self._grams: dict[str, int] = {}
+        self._postings: list[array] = []
+        self._weights: list[array] = []
+        # Число товаров с n-граммой (включая удалённые версии)
+        self._df = array('I')
+        # Внутренний номер товара → id товара, признак «жив», хеш текста, норма вектора
+        self._doc_ids = array('I')
+        self._alive = bytearray()
+        self._text_hash = array('q')
+        self._norms = array('f')
+        self._row_ptr = array('Q', [0])
+        self._row_grams = array('I')
+        self._row_tf = array('f')
+        self._doc_by_id: dict[int, int] = {}
+        # Число товаров, при котором нормы посчитаны с одинаковыми idf
+        self._norms_docs = 0
+
+    @property
+    def documents(self) -> int:
+        return len(self._doc_by_id)
+
+    def _idf(self, gram_ids: np.ndarray) -> np.ndarray:
+        df = np.frombuffer(self._df, dtype=np.uint32)[gram_ids]
+        total = len(self._doc_ids)
+        return (np.log((total + 1) / (df + 1.0)) + 1).astype(np.float32)
+
+    def upsert(self, changes: Iterable[CatalogChange]) -> None:
+        """Добавляет товары; уже проиндексированные с другим текстом заменяются новой версией"""
+        for change in changes:
+            if self._touched is not None:
+                self._touched.add(change.id)
+            text = item_text(change.name, change.stuff, change.image_title)
+            text_hash = hash(text)
+            previous = self._doc_by_id.get(change.id)
+            if previous is not None:
+                if self._text_hash[previous] == text_hash:
+                    continue
+                self._alive[previous] = 0
+
+            doc = len(self._doc_ids)
+            self._doc_ids.append(change.id)
+            self._alive.append(1)
+            self._text_hash.append(text_hash)
+            self._doc_by_id[change.id] = doc
+
+            gram_ids, weights = [], []
+            for gram, frequency in char_ngrams(text).items():
+                gram_id = self._grams.get(gram)
+                if gram_id is None:
+                    gram_id = self._grams[gram] = len(self._postings)
+                    self._postings.append(array('I'))
+                    self._weights.append(array('f'))
+                    self._df.append(0)
+                weight = 1 + math.log(frequency)
+                self._postings[gram_id].append(doc)
+                self._weights[gram_id].append(weight)
+                self._df[gram_id] += 1
+                self._row_grams.append(gram_id)
+                self._row_tf.append(weight)
+                gram_ids.append(gram_id)
+                weights.append(weight)
+            self._row_ptr.append(len(self._row_grams))
+            vector = np.array(weights, dtype=np.float32) * self._idf(np.array(gram_ids, dtype=np.int64))
+            self._norms.append(float(np.linalg.norm(vector)))
+
+    def on_catalog_change(self, changes: list[CatalogChange]) -> None:
+        """Подписчик `services.catalog_events`"""
+        self.upsert(changes)
+
+    def _refresh_norms(self) -> None:
+        """Пересчитывает нормы всех векторов с текущими idf"""
+        total = len(self._doc_ids)
+        row_ptr = np.frombuffer(self._row_ptr, dtype=np.uint64).astype(np.int64)
+        grams = np.frombuffer(self._row_grams, dtype=np.uint32)
+        weights = np.frombuffer(self._row_tf, dtype=np.float32) * self._idf(grams)
+        docs = np.repeat(np.arange(total), np.diff(row_ptr))
+        norms = np.sqrt(np.bincount(docs, weights=weights.astype(np.float64) ** 2, minlength=total))
+        self._norms = array('f', norms.astype(np.float32).tobytes())
+        self._norms_docs = total
+
+    def _dots(self, gram_ids: np.ndarray, factors: np.ndarray, total: int) -> np.ndarray:
+        """Скалярные произведения со всеми товарами по столбцам n-грамм `gram_ids` с весами `factors`"""
+        docs = np.concatenate([np.frombuffer(self._postings[gram_id], dtype=np.uint32) for gram_id in gram_ids.tolist()])
+        weights = np.concatenate([
+            np.frombuffer(self._weights[gram_id], dtype=np.float32) * factor
+            for gram_id, factor in zip(gram_ids.tolist(), factors.tolist())
+        ])
+        return np.bincount(docs, weights=weights, minlength=total)
+
+    def _row_dots(self, docs: np.ndarray, gram_ids: np.ndarray, factors: np.ndarray) -> np.ndarray:
+        """Точные скалярные произведения товаров `docs` с вектором запроса — по строкам товаров"""
+        lookup = np.zeros(len(self._grams), dtype=np.float32)
+        lookup[gram_ids] = factors
+        row_ptr = np.frombuffer(self._row_ptr, dtype=np.uint64).astype(np.int64)
+        starts = row_ptr[docs]
+        lengths = row_ptr[docs + 1] - starts
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.repeat(starts - offsets, lengths) + np.arange(int(lengths.sum()))
+        owners = np.repeat(np.arange(len(docs)), lengths)
+        grams = np.frombuffer(self._row_grams, dtype=np.uint32)[positions]
+        weights = np.frombuffer(self._row_tf, dtype=np.float32)[positions] * lookup[grams]
+        return np.bincount(owners, weights=weights, minlength=len(docs))
+
+    def similar(self, item_id: int, limit: int = 10) -> list[tuple[int, float]]:
+        """
+        Пары (id товара, косинусная близость) для `limit` самых похожих на
+        товар живых товаров (без него самого), по убыванию близости, при
+        равенстве — по id. Товара нет в индексе — пустой список.
+
+        Если столбцы всех n-грамм товара вместе длиннее CANDIDATE_POSTINGS,
+        кандидаты отбираются по самым редким n-граммам в пределах этого
+        бюджета, и CANDIDATES лучших пересчитываются точно по своим строкам;
+        товары, общие с данным только частыми n-граммами, тогда не находятся.
+        """
+        doc = self._doc_by_id.get(item_id)
+        if doc is None:
+            return []
+        total = len(self._doc_ids)
+        if abs(total - self._norms_docs) > NORM_DRIFT * total:
+            self._refresh_norms()
+
+        start, stop = self._row_ptr[doc], self._row_ptr[doc + 1]
+        gram_ids = np.frombuffer(self._row_grams, dtype=np.uint32)[start:stop].copy()
+        idf = self._idf(gram_ids)
+        query = np.frombuffer(self._row_tf, dtype=np.float32)[start:stop] * idf
+        query_norm = float(np.linalg.norm(query))
+        if not query_norm:
+            return []
+        # Вес столбца n-граммы: её вес в запросе, умноженный на idf
+        factors = query * idf
+
+        df = np.frombuffer(self._df, dtype=np.uint32)[gram_ids]
+        order = np.argsort(df, kind="stable")
+        selective = order[:max(1, int(np.searchsorted(np.cumsum(df[order]), CANDIDATE_POSTINGS, side="right")))]
+        dots = self._dots(gram_ids[selective], factors[selective], total)
+
+        candidates = np.flatnonzero(dots)
+        candidates = candidates[
+            np.frombuffer(self._alive, dtype=np.uint8)[candidates].astype(bool) & (candidates != doc)
+        ]
+        if len(selective) < len(gram_ids):
+            if len(candidates) > CANDIDATES:
+                candidates = candidates[np.argpartition(-dots[candidates], CANDIDATES - 1)[:CANDIDATES]]
+            candidate_dots = self._row_dots(candidates, gram_ids, factors)
+        else:
+            candidate_dots = dots[candidates]
+
+        norms = np.frombuffer(self._norms, dtype=np.float32)[candidates]
+        scores = np.minimum(candidate_dots / (np.maximum(norms, 1e-9) * query_norm), 1.0).astype(np.float32)
+        item_ids, scores = top_scored(np.frombuffer(self._doc_ids, dtype=np.uint32)[candidates], scores, limit)
+        return list(zip(item_ids.tolist(), scores.astype(float).tolist()))
+
+    async def fetch(self, db: AsyncSession, item_id: int, limit: int = 10) -> list[tuple[CatalogItem, float]]:
+        """Похожие товары из БД с близостью в порядке `similar`; удалённые из БД пропускаются"""
+        pairs = self.similar(item_id, limit)
+        if not pairs:
+            return []
+        result = await db.execute(select(CatalogItem).where(CatalogItem.id.in_([found for found, _ in pairs])))
+        by_id = {item.id: item for item in result.scalars().all()}
+        return [(by_id[found], score) for found, score in pairs if found in by_id]
+
+    async def build(self, session_factory: async_sessionmaker, chunk_size: Optional[int] = None) -> None:
+        """Строит матрицу по всему каталогу, читая его порциями по id"""
+        chunk_size = chunk_size or config.SEARCH_INDEX_BUILD_CHUNK
+        started = time.monotonic()
+        self.ready = False
+        self._clear()
+        self._touched = set()
+        last_id = 0
+        try:
+            async with session_factory() as db:
+                while True:
+                    result = await db.execute(
+                        select(CatalogItem.id, CatalogItem.name, CatalogItem.stuff, CatalogItem.image_title)
+                        .where(CatalogItem.id > last_id)
+                        .order_by(CatalogItem.id)
+                        .limit(chunk_size)
+                    )
+                    rows = result.all()
+                    if not rows:
+                        break
+                    # n-граммы считаются в Python: отдаём управление циклу событий чаще, чем раз в порцию
+                    for offset in range(0, len(rows), BUILD_BATCH):
+                        self.upsert(
+                            CatalogChange(item_id, name, "", stuff=stuff, image_title=image_title)
+                            for item_id, name, stuff, image_title in rows[offset:offset + BUILD_BATCH]
+                            if item_id not in self._touched
+                        )
+                        await asyncio.sleep(0)
+                    last_id = rows[-1][0]
+        finally:
+            self._touched = None
+        self._refresh_norms()
+        self.ready = True
+        logger.info("[SIMILAR_INDEX] Индекс построен: %d товаров, %d n-грамм за %.1f с",
+                    self.documents, len(self._grams), time.monotonic() - started)
+
+    async def start(self, session_factory: async_sessionmaker = AsyncSessionLocal) -> None:
+        """Подписывается на изменения каталога и строит индекс в фоне"""
+        add_listener(self.on_catalog_change)
+        self._task = asyncio.create_task(self.build(session_factory))
+
+    async def stop(self) -> None:
+        remove_listener(self.on_catalog_change)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.ready = False
+
+    def memory_report(self) -> dict:
+        """Оценка памяти индекса по структурам (байты)"""
+        columns = sys.getsizeof(self._postings) + sys.getsizeof(self._weights) + sum(
+            sys.getsizeof(docs) + sys.getsizeof(weights) for docs, weights in zip(self._postings, self._weights)
+        )
+        rows = sys.getsizeof(self._row_ptr) + sys.getsizeof(self._row_grams) + sys.getsizeof(self._row_tf)
+        vocabulary = sys.getsizeof(self._grams) + sys.getsizeof(self._df) + sum(
+            sys.getsizeof(gram) + sys.getsizeof(gram_id) for gram, gram_id in self._grams.items()
+        )
+        documents = sum(sys.getsizeof(column) for column in (
+            self._doc_ids, self._alive, self._text_hash, self._norms
+        )) + sys.getsizeof(self._doc_by_id) + len(self._doc_by_id) * 2 * sys.getsizeof(2 ** 20)
+        total = columns + rows + vocabulary + documents
+        return {
+            "ready": self.ready,
+            "documents": self.documents,
+            "ngrams": len(self._grams),
+            "bytes": {"columns": columns, "rows": rows, "vocabulary": vocabulary, "documents": documents},
+            "total_bytes": total,
+            "total_mb": round(total / 2 ** 20, 2),
+        }
+
+
+catalog_similar_index = CatalogSimilarIndex()
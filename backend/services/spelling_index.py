@@ -0,0 +1,333 @@
+from array import array
+from collections import Counter
+from typing import Iterable, Optional
+import asyncio
+import logging
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config import config
+from models.catalog_items import CatalogItem
+from services.catalog_events import CatalogChange, add_listener, remove_listener
+from services.database import AsyncSessionLocal
+from services.russian_stemmer import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Удаления считаются только для первых PREFIX_LENGTH букв слова (SymSpell):
+# словарь удалений в разы меньше, а кандидаты всё равно проверяются по полному слову
+PREFIX_LENGTH = 7
+MAX_DISTANCE = 2
+# Слова короче исправляются не больше чем на одну правку, совсем короткие — не исправляются
+SHORT_WORD = 5
+MIN_WORD = 3
+
+
+def max_distance(word: str) -> int:
+    if len(word) < MIN_WORD:
+        return 0
+    return 1 if len(word) <= SHORT_WORD else MAX_DISTANCE
+
+
+def deletes(word: str, distance: int = MAX_DISTANCE) -> set[str]:
+    """Строки, получаемые из префикса слова удалением до `distance` букв (включая сам префикс)"""
+    result = {word[:PREFIX_LENGTH]}
+    frontier = result
+    for _ in range(distance):
+        frontier = {
+            variant[:position] + variant[position + 1:]
+            for variant in frontier if len(variant) > 1
+            for position in range(len(variant))
+        }
+        result |= frontier
+    return result
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Расстояние Дамерау — Левенштейна (вставка, удаление, замена, перестановка
+    соседних букв); если оно больше `limit`, возвращает limit + 1.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def merge_variants(
+    hashes: np.ndarray, targets: np.ndarray, delta: dict[int, list[int]]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Новые отсортированные массивы вариантов с влитой дельтой; исходные не меняются"""
+    if not delta:
+        return hashes, targets
+    new_hashes = np.fromiter(
+        (key for key, word_ids in delta.items() for _ in word_ids), dtype=np.int64
+    )
+    new_targets = np.fromiter(
+        (word_id for word_ids in delta.values() for word_id in word_ids), dtype=np.uint32
+    )
+    order = np.argsort(new_hashes, kind="stable")
+    new_hashes, new_targets = new_hashes[order], new_targets[order]
+    positions = np.searchsorted(hashes, new_hashes)
+    return np.insert(hashes, positions, new_hashes), np.insert(targets, positions, new_targets)
+
+
+def _words(text: str) -> list[str]:
+    """Слова названия, которые попадают в словарь: только буквы, не короче MIN_WORD"""
+    return [token for token in tokenize(text or "") if len(token) >= MIN_WORD and token.isalpha()]
+
+
+class CatalogSpellingIndex:
+    """
+    Исправление опечаток в запросах по словарю слов названий каталога
+    (SymSpell: словарь удалений).
+
+    Для каждого слова словаря заранее построены все варианты его префикса
+    с удалением до двух букв; слово запроса с опечаткой даёт такие же
+    варианты, поэтому кандидаты находятся поиском вариантов в словаре, а не
+    перебором слов. Кандидаты проверяются расстоянием Дамерау — Левенштейна,
+    из ближайших берётся самое частое в каталоге слово.
+
+    Варианты хранятся компактно — отсортированный массив хешей (int64) и
+    номера слов (uint32); новые слова сначала попадают в небольшой словарь
+    `_delta` и вливаются в массивы, когда их наберётся SPELLING_DELTA_LIMIT:
+    новые массивы собираются в отдельном потоке и подменяют старые в цикле
+    событий, а вливаемые варианты до этого ищутся в `_merging`.
+    Частоты слов только растут: слово, исчезнувшее из каталога при
+    переименовании товара, остаётся в словаре до перестроения.
+
+    Индекс строится из БД при старте (`start`) и обновляется событиями
+    `services.catalog_events` после коммита записей каталога.
+    """
+
+    def __init__(self, delta_limit: Optional[int] = None):
+        self.delta_limit = delta_limit or config.SPELLING_DELTA_LIMIT
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+        self._compaction: Optional[asyncio.Task] = None
+        self._clear()
+
+    def _clear(self) -> None:
+        self._words: list[str] = []
+        self._word_ids: dict[str, int] = {}
+        self._counts = array('I')
+        self._hashes = np.zeros(0, dtype=np.int64)
+        self._targets = np.zeros(0, dtype=np.uint32)
+        # Хеш варианта → номера слов, ещё не влитых в массивы
+        self._delta: dict[int, list[int]] = {}
+        self._delta_words = 0
+        # Варианты, которые сейчас вливаются в массивы в рабочем потоке
+        self._merging: dict[int, list[int]] = {}
+
+    @property
+    def words(self) -> int:
+        return len(self._words)
+
+    def add_words(self, words: Iterable[str]) -> None:
+        """Учитывает слова названий: новые добавляются в словарь, известным растёт частота"""
+        for word in words:
+            word_id = self._word_ids.get(word)
+            if word_id is not None:
+                self._counts[word_id] += 1
+                continue
+            word_id = self._word_ids[word] = len(self._words)
+            self._words.append(word)
+            self._counts.append(1)
+            for variant in deletes(word):
+                self._delta.setdefault(hash(variant), []).append(word_id)
+            self._delta_words += 1
+        # Во время построения массивы вливаются один раз в конце `build`
+        if self.ready and self._delta_words > self.delta_limit:
+            self._schedule_compaction()
+
+    def upsert(self, changes: Iterable[CatalogChange]) -> None:
+        for change in changes:
+            self.add_words(_words(change.name))
+
+    def on_catalog_change(self, changes: list[CatalogChange]) -> None:
+        """Подписчик `services.catalog_events`"""
+        self.upsert(changes)
+
+    def compact(self) -> None:
+        """Вливает варианты новых слов в отсортированные массивы (в текущем потоке)"""
+        self._hashes, self._targets = merge_variants(self._hashes, self._targets, self._take_delta())
+
+    def _take_delta(self) -> dict[int, list[int]]:
+        """Забирает накопленные варианты; новые слова дальше копятся в свежем `_delta`"""
+        delta, self._delta = self._delta, {}
+        self._delta_words = 0
+        return delta
+
+    def _schedule_compaction(self) -> None:
+        if self._compaction is not None and not self._compaction.done():
+            return
+        try:
+            self._compaction = asyncio.get_running_loop().create_task(self._merge_in_thread(self._take_delta()))
+        except RuntimeError:
+            # Вне цикла событий (тесты, скрипты) вливаем сразу
+            self.compact()
+
+    async def _merge_in_thread(self, delta: dict[int, list[int]]) -> None:
+        """
+        Вливает снимок дельты в рабочем потоке. Массивы читаются и подменяются
+        в цикле событий; пока слияние идёт, снимок ищется в `_merging`, а
+        новые слова копятся в свежем `_delta`.
+        """
+        started = time.monotonic()
+        merging = self._merging = delta
+        try:
+            hashes, targets = await asyncio.to_thread(merge_variants, self._hashes, self._targets, delta)
+        except BaseException:
+            # Снимок возвращается в дельту, чтобы его влило следующее слияние
+            if self._merging is merging:
+                self._merging = {}
+                for key, word_ids in delta.items():
+                    self._delta.setdefault(key, []).extend(word_ids)
+                self._delta_words += len({word_id for word_ids in delta.values() for word_id in word_ids})
+            raise
+        # После `_clear` (перестроение) результат относится к старому словарю
+        if self._merging is merging:
+            self._hashes, self._targets = hashes, targets
+            self._merging = {}
+            logger.info("[SPELLING_INDEX] Массивы пересобраны: %d вариантов за %.2f с",
+                        len(hashes), time.monotonic() - started)
+
+    def _candidates(self, word: str, distance: int) -> set[int]:
+        found: set[int] = set()
+        variants = deletes(word, distance)
+        keys = np.fromiter((hash(variant) for variant in variants), dtype=np.int64, count=len(variants))
+        low = np.searchsorted(self._hashes, keys, side="left")
+        high = np.searchsorted(self._hashes, keys, side="right")
+        for start, stop in zip(low.tolist(), high.tolist()):
+            if start != stop:
+                found.update(self._targets[start:stop].tolist())
+        for key in keys.tolist():
+            found.update(self._delta.get(key, ()))
+            found.update(self._merging.get(key, ()))
+        return found
+
+    def suggest(self, word: str) -> Optional[str]:
+        """
+        Ближайшее слово словаря (расстояние не больше 1–2 по длине слова,
+        при равенстве — самое частое) или None. Слово из словаря возвращается как есть.
+        """
+        word = word.lower()
+        if word in self._word_ids:
+            return word
+        distance = max_distance(word)
+        if not distance:
+            return None
+        best, best_key = None, None
+        for word_id in self._candidates(word, distance):
+            candidate = self._words[word_id]
+            found = edit_distance(word, candidate, distance)
+            if found > distance:
+                continue
+            key = (found, -self._counts[word_id], candidate)
+            if best_key is None or key < best_key:
+                best, best_key = candidate, key
+        return best
+
+    def correct(self, query: str) -> str:
+        """
+        Запрос с исправленными словами: слова, которых нет в словаре,
+        заменяются ближайшими; числа и слова без замены остаются как есть.
+        """
+        corrected = []
+        for token in tokenize(query):
+            replacement = self.suggest(token) if token.isalpha() else None
+            corrected.append(replacement or token)
+        return " ".join(corrected)
+
+    async def build(self, session_factory: async_sessionmaker, chunk_size: Optional[int] = None) -> None:
+        """Строит словарь по названиям всего каталога, читая его порциями по id"""
+        chunk_size = chunk_size or config.SEARCH_INDEX_BUILD_CHUNK
+        started = time.monotonic()
+        self.ready = False
+        self._clear()
+        counts: Counter = Counter()
+        last_id = 0
+        async with session_factory() as db:
+            while True:
+                result = await db.execute(
+                    select(CatalogItem.id, CatalogItem.name)
+                    .where(CatalogItem.id > last_id)
+                    .order_by(CatalogItem.id)
+                    .limit(chunk_size)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                for _, name in rows:
+                    counts.update(_words(name))
+                last_id = rows[-1][0]
+                await asyncio.sleep(0)
+
+        # Слова, пришедшие событиями во время чтения, уже в словаре
+        for number, (word, count) in enumerate(counts.items(), 1):
+            word_id = self._word_ids.get(word)
+            if word_id is None:
+                self.add_words([word])
+                word_id = self._word_ids[word]
+            self._counts[word_id] = max(self._counts[word_id], count)
+            if number % chunk_size == 0:
+                await asyncio.sleep(0)
+        await self._merge_in_thread(self._take_delta())
+        self.ready = True
+        logger.info("[SPELLING_INDEX] Словарь построен: %d слов, %d вариантов за %.1f с",
+                    self.words, len(self._hashes), time.monotonic() - started)
+
+    async def start(self, session_factory: async_sessionmaker = AsyncSessionLocal) -> None:
+        """Подписывается на изменения каталога и строит словарь в фоне"""
+        add_listener(self.on_catalog_change)
+        self._task = asyncio.create_task(self.build(session_factory))
+
+    async def stop(self) -> None:
+        remove_listener(self.on_catalog_change)
+        for task in (self._task, self._compaction):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._task = self._compaction = None
+        self.ready = False
+
+    def memory_report(self) -> dict:
+        """Оценка памяти словаря по структурам (байты)"""
+        vocabulary = sys.getsizeof(self._words) + sys.getsizeof(self._word_ids) + sum(
+            sys.getsizeof(word) for word in self._words
+        ) + sys.getsizeof(self._counts)
+        variants = self._hashes.nbytes + self._targets.nbytes
+        delta = sum(
+            sys.getsizeof(part) + sum(sys.getsizeof(ids) for ids in part.values())
+            for part in (self._delta, self._merging)
+        )
+        total = vocabulary + variants + delta
+        return {
+            "ready": self.ready,
+            "words": self.words,
+            "variants": len(self._hashes),
+            "bytes": {"vocabulary": vocabulary, "variants": variants, "delta": delta},
+            "total_bytes": total,
+            "total_mb": round(total / 2 ** 20, 2),
+        }
+
+
+catalog_spelling_index = CatalogSpellingIndex()
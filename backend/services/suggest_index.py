@@ -0,0 +1,364 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from typing import Iterable, NamedTuple, Optional
+import asyncio
+import logging
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config import config
+from models.catalog_items import CatalogItem
+from models.user_generations import UserGeneration
+from services.catalog_events import (
+    CatalogChange,
+    add_generation_listener,
+    add_listener,
+    remove_generation_listener,
+    remove_listener,
+)
+from services.database import AsyncSessionLocal
+from services.search_index import top_scored
+
+logger = logging.getLogger(__name__)
+
+# Остаток учитывается до этого значения и только при равном числе генераций
+BALANCE_CAP = 1_000_000
+
+
+def normalize(text: str) -> str:
+    """Ключ сравнения названий: нижний регистр, ё → е, одиночные пробелы"""
+    return " ".join(text.lower().replace("ё", "е").split())
+
+
+class _Run(NamedTuple):
+    """
+    Неизменяемый отсортированный массив названий: названия в UTF-8 подряд в
+    одном буфере (`offsets` — границы), упорядочены по `normalize(name)`;
+    `ids` — id товаров в том же порядке, `positions` — позиция по id товара
+    (-1 — товара нет).
+    """
+    buffer: bytes
+    offsets: np.ndarray
+    ids: np.ndarray
+    positions: np.ndarray
+
+    def name(self, position: int) -> str:
+        return self.buffer[self.offsets[position]:self.offsets[position + 1]].decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def _compile(entries: list[tuple[str, int, str]]) -> _Run:
+    """Массив из записей (ключ, id, название); выполняется в отдельном потоке"""
+    entries.sort()
+    encoded = [name.encode("utf-8") for _, _, name in entries]
+    offsets = np.zeros(len(entries) + 1, dtype=np.int64)
+    np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+    ids = np.fromiter((item_id for _, item_id, _ in entries), dtype=np.uint32, count=len(entries))
+    positions = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=np.int32)
+    positions[ids] = np.arange(len(ids), dtype=np.int32)
+    return _Run(b"".join(encoded), offsets, ids, positions)
+
+
+def _merge(run: _Run, alive: bytes, delta: list[tuple[str, int, str]]) -> _Run:
+    """Новый массив из живых записей `run` и дельты; выполняется в отдельном потоке"""
+    entries = [
+        (normalize(name), int(run.ids[position]), name)
+        for position in range(len(run)) if alive[position]
+        for name in (run.name(position),)
+    ]
+    return _compile(entries + delta)
+
+
+_EMPTY_RUN = _compile([])
+
+
+class CatalogSuggestIndex:
+    """
+    Подсказки по началу названия товара (typeahead) из памяти.
+
+    Названия хранятся отсортированными по нормализованному ключу, поэтому все
+    названия с данным началом — непрерывный диапазон, который находится
+    двоичным поиском. Из диапазона берутся самые популярные товары: сначала
+    по числу генераций, при равенстве — по остатку (`balance`), затем по id.
+
+    Основной массив неизменяем: изменённые и новые товары попадают в
+    небольшую отсортированную «дельту» (старая версия в массиве помечается
+    удалённой), а когда дельта вырастает больше SUGGEST_DELTA_LIMIT или
+    четверти массива, массив пересобирается в отдельном потоке без
+    остановки поиска. Число генераций и остаток лежат в массивах по id
+    товара и меняются на месте.
+
+    Индекс строится из БД при старте (`start`) и обновляется событиями
+    `services.catalog_events` после коммита.
+    """
+
+    def __init__(self, delta_limit: Optional[int] = None):
+        self.delta_limit = delta_limit or config.SUGGEST_DELTA_LIMIT
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+        self._compaction: Optional[asyncio.Task] = None
+        self._clear()
+
+    def _clear(self) -> None:
+        self._run = _EMPTY_RUN
+        self._alive = bytearray()
+        # Дельта: отсортированный список (ключ, id) и название по id
+        self._delta: list[tuple[str, int]] = []
+        self._delta_names: dict[int, str] = {}
+        # id, изменённые во время пересборки массива
+        self._changed_during_compaction: Optional[set[int]] = None
+        self._generations = np.zeros(0, dtype=np.int32)
+        self._balance = np.zeros(0, dtype=np.int32)
+
+    @property
+    def documents(self) -> int:
+        return len(self._alive) - self._alive.count(0) + len(self._delta_names)
+
+    def _reserve(self, item_id: int) -> None:
+        if item_id >= len(self._generations):
+            size = max(item_id + 1, 2 * len(self._generations), 1024)
+            self._generations = np.concatenate(
+                [self._generations, np.zeros(size - len(self._generations), dtype=np.int32)]
+            )
+            self._balance = np.concatenate(
+                [self._balance, np.zeros(size - len(self._balance), dtype=np.int32)]
+            )
+
+    def _unlink(self, item_id: int) -> None:
+        """Убирает текущую версию товара из массива и дельты"""
+        positions = self._run.positions
+        if item_id < len(positions) and positions[item_id] >= 0:
+            self._alive[positions[item_id]] = 0
+        name = self._delta_names.pop(item_id, None)
+        if name is not None:
+            self._delta.remove((normalize(name), item_id))
+        if self._changed_during_compaction is not None:
+            self._changed_during_compaction.add(item_id)
+
+    def upsert(self, changes: Iterable[CatalogChange]) -> None:
+        """Добавляет товары; уже известные заменяются новой версией"""
+        for change in changes:
+            self._unlink(change.id)
+            self._reserve(change.id)
+            self._balance[change.id] = min(max(change.balance or 0, 0), BALANCE_CAP)
+            self._delta_names[change.id] = change.name
+            insort(self._delta, (normalize(change.name), change.id))
+        # Во время построения массива его ещё нет — дельта сливается с ним в `build`
+        if self.ready and len(self._delta) > max(self.delta_limit, len(self._run) // 4):
+            self._schedule_compaction()
+
+    def remove(self, ids: Iterable[int]) -> None:
+        for item_id in ids:
+            self._unlink(item_id)
+
+    def add_generations(self, counts: Counter) -> None:
+        """Изменение числа генераций: {id товара: прирост}"""
+        for item_id, delta in counts.items():
+            self._reserve(item_id)
+            self._generations[item_id] = max(self._generations[item_id] + delta, 0)
+
+    def on_catalog_change(self, changes: list[CatalogChange]) -> None:
+        """Подписчик `services.catalog_events` (изменения каталога)"""
+        self.upsert(changes)
+
+    def on_generations_change(self, counts: Counter) -> None:
+        """Подписчик `services.catalog_events` (число генераций по пользователям и товарам)"""
+        by_item: Counter = Counter()
+        for (_, item_id), delta in counts.items():
+            by_item[item_id] += delta
+        self.add_generations(by_item)
+
+    def _schedule_compaction(self) -> None:
+        if self._compaction is not None and not self._compaction.done():
+            return
+        try:
+            self._compaction = asyncio.get_running_loop().create_task(self.compact())
+        except RuntimeError:
+            # Вне цикла событий (тесты, скрипты) пересобираем сразу
+            self._swap(_merge(*self._snapshot()))
+
+    def _snapshot(self) -> tuple[_Run, bytes, list[tuple[str, int, str]]]:
+        """Копия состояния для пересборки: массив неизменяем, копируются пометки и дельта"""
+        delta = [(key, item_id, self._delta_names[item_id]) for key, item_id in self._delta]
+        return self._run, bytes(self._alive), delta
+
+    def _swap(self, run: _Run) -> None:
+        changed = self._changed_during_compaction or set()
+        self._changed_during_compaction = None
+        self._run = run
+        self._alive = bytearray(b"\x01") * len(run)
+        # В дельте остаются только версии, появившиеся во время пересборки
+        self._delta = [entry for entry in self._delta if entry[1] in changed]
+        self._delta_names = {item_id: self._delta_names[item_id] for _, item_id in self._delta}
+        for item_id in changed:
+            if item_id < len(run.positions) and run.positions[item_id] >= 0:
+                self._alive[run.positions[item_id]] = 0
+
+    async def compact(self) -> None:
+        """Сливает дельту с основным массивом (сортировка — в отдельном потоке)"""
+        started = time.monotonic()
+        self._changed_during_compaction = set()
+        snapshot = self._snapshot()
+        try:
+            run = await asyncio.to_thread(_merge, *snapshot)
+        except BaseException:
+            self._changed_during_compaction = None
+            raise
+        self._swap(run)
+        logger.info("[SUGGEST_INDEX] Массив пересобран: %d названий за %.2f с",
+                    len(run), time.monotonic() - started)
+
+    def _range(self, key: str) -> tuple[int, int]:
+        """Диапазон позиций массива, ключи которых начинаются с `key`"""
+        run, width = self._run, len(key)
+        def prefix_at(position: int) -> str:
+            return normalize(run.name(position))[:width]
+        positions = range(len(run))
+        return bisect_left(positions, key, key=prefix_at), bisect_right(positions, key, key=prefix_at)
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[tuple[int, str]]:
+        """
+        До `limit` пар (id товара, название) с названиями, начинающимися с
+        `prefix` (без учёта регистра и ё), по популярности; одинаковые
+        названия возвращаются один раз.
+        """
+        key = normalize(prefix)
+        if not key or limit < 1:
+            return []
+        run = self._run
+        low, high = self._range(key)
+        positions = np.arange(low, high)
+        if self._alive.count(0):
+            positions = positions[np.frombuffer(self._alive, dtype=np.uint8)[low:high].astype(bool)]
+        width = len(key)
+        delta_low = bisect_left(self._delta, (key,))
+        delta_high = bisect_right(self._delta, key, lo=delta_low, key=lambda entry: entry[0][:width])
+        delta_ids = np.array([item_id for _, item_id in self._delta[delta_low:delta_high]], dtype=np.uint32)
+
+        item_ids = np.concatenate([run.ids[positions], delta_ids])
+        scores = (
+            self._generations[item_ids].astype(np.float64)
+            + self._balance[item_ids] / (BALANCE_CAP + 1)
+        )
+
+        # Берём с запасом на повторяющиеся названия и добираем, если не хватило
+        wanted = limit * 4
+        while True:
+            top_ids, _ = top_scored(item_ids, scores, wanted)
+            result, seen = [], set()
+            for item_id in top_ids.tolist():
+                name = self._name(item_id)
+                name_key = normalize(name)
+                if name_key not in seen:
+                    seen.add(name_key)
+                    result.append((item_id, name))
+                    if len(result) == limit:
+                        return result
+            if wanted >= len(item_ids):
+                return result
+            wanted *= 4
+
+    def _name(self, item_id: int) -> str:
+        name = self._delta_names.get(item_id)
+        if name is None:
+            name = self._run.name(int(self._run.positions[item_id]))
+        return name
+
+    def _entries(self, changes: Iterable[CatalogChange]) -> list[tuple[str, int, str]]:
+        """Записи массива для товаров; остаток запоминается сразу"""
+        entries = []
+        for change in changes:
+            self._reserve(change.id)
+            self._balance[change.id] = min(max(change.balance or 0, 0), BALANCE_CAP)
+            entries.append((normalize(change.name), change.id, change.name))
+        return entries
+
+    def load(self, changes: Iterable[CatalogChange]) -> None:
+        """Заменяет содержимое индекса товарами `changes` без чтения БД (скрипты, бенчмарки)"""
+        self._clear()
+        run = _compile(self._entries(changes))
+        self._run, self._alive = run, bytearray(b"\x01") * len(run)
+        self.ready = True
+
+    async def build(self, session_factory: async_sessionmaker, chunk_size: Optional[int] = None) -> None:
+        """Строит индекс по всему каталогу и числу генераций, читая каталог порциями по id"""
+        chunk_size = chunk_size or config.SEARCH_INDEX_BUILD_CHUNK
+        started = time.monotonic()
+        self.ready = False
+        self._clear()
+        entries = []
+        last_id = 0
+        async with session_factory() as db:
+            while True:
+                result = await db.execute(
+                    select(CatalogItem.id, CatalogItem.name, CatalogItem.balance)
+                    .where(CatalogItem.id > last_id)
+                    .order_by(CatalogItem.id)
+                    .limit(chunk_size)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                entries.extend(self._entries(CatalogChange(item_id, name, "", balance) for item_id, name, balance in rows))
+                last_id = rows[-1][0]
+                await asyncio.sleep(0)
+
+            result = await db.execute(
+                select(UserGeneration.catalog_item_id, func.count())
+                .group_by(UserGeneration.catalog_item_id)
+            )
+            self.add_generations(Counter(dict(result.all())))
+
+        # Изменения, пришедшие во время чтения, уже лежат в дельте и заменяют прочитанные версии
+        in_delta = set(self._delta_names)
+        run = await asyncio.to_thread(_compile, [entry for entry in entries if entry[1] not in in_delta])
+        self._run = run
+        self._alive = bytearray(b"\x01") * len(run)
+        self.ready = True
+        logger.info("[SUGGEST_INDEX] Индекс построен: %d названий за %.1f с",
+                    self.documents, time.monotonic() - started)
+
+    async def start(self, session_factory: async_sessionmaker = AsyncSessionLocal) -> None:
+        """Подписывается на изменения каталога и генераций и строит индекс в фоне"""
+        add_listener(self.on_catalog_change)
+        add_generation_listener(self.on_generations_change)
+        self._task = asyncio.create_task(self.build(session_factory))
+
+    async def stop(self) -> None:
+        remove_listener(self.on_catalog_change)
+        remove_generation_listener(self.on_generations_change)
+        for task in (self._task, self._compaction):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._task = self._compaction = None
+        self.ready = False
+
+    def memory_report(self) -> dict:
+        """Оценка памяти индекса по структурам (байты)"""
+        run = self._run
+        names = sys.getsizeof(run.buffer) + run.offsets.nbytes
+        ids = run.ids.nbytes + run.positions.nbytes + sys.getsizeof(self._alive)
+        delta = sys.getsizeof(self._delta) + sum(
+            sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(name)
+            for entry, name in zip(self._delta, self._delta_names.values())
+        ) + sys.getsizeof(self._delta_names)
+        popularity = self._generations.nbytes + self._balance.nbytes
+        total = names + ids + delta + popularity
+        return {
+            "ready": self.ready,
+            "documents": self.documents,
+            "delta": len(self._delta),
+            "bytes": {"names": names, "ids": ids, "delta": delta, "popularity": popularity},
+            "total_bytes": total,
+            "total_mb": round(total / 2 ** 20, 2),
+        }
+
+
+catalog_suggest_index = CatalogSuggestIndex()
@@ -0,0 +1,36 @@
+"""Фабрики тестовых данных, общие для тестов каталога и генераций"""
+from sqlalchemy import select
+
+from models.catalog_items import CatalogItem
+from models.users import User
+
+
+def make_item(id_item: str, name: str = "Кружка", price: float = 100.0) -> dict:
+    """Товар в формате API Sima-Land для upsert_catalog_items"""
+    return {
+        "id_item": id_item,
+        "uid": "",
+        "sid": "",
+        "balance": 5,
+        "name": name,
+        "slug": f"slug-{id_item}",
+        "stuff": None,
+        "category_id": "",
+        "photoUrl": None,
+        "image_title": None,
+        "price": price,
+    }
+
+
+async def make_user(db, email: str) -> int:
+    """Создаёт пользователя и возвращает его id"""
+    user = User(email=email, hashed_password="hashed_password")
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user.id
+
+
+async def item_id(db, id_item: str) -> int:
+    """id товара каталога по id_item"""
+    return (await db.execute(select(CatalogItem.id).where(CatalogItem.id_item == id_item))).scalar_one()
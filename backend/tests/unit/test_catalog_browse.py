@@ -0,0 +1,109 @@
+import pytest
+
+from services.bitmap import RoaringBitmap
+from services.catalog_browse import browse_catalog_page, catalog_facets, pending_items_page
+from services.catalog_events import CatalogChange
+from services.catalog_facets import BrowseFilters, CatalogFacetIndex, catalog_facet_index
+from services.catalog_writer import upsert_catalog_items
+from tests.factories import item_id, make_item
+
+
+def browse_item(id_item: str, category_id: str, price: float, stuff: str = None, balance: int = 5) -> dict:
+    return {**make_item(id_item, name=f"Товар {id_item}", price=price),
+            "category_id": category_id, "stuff": stuff, "balance": balance}
+
+
+class TestCatalogBrowse:
+    """Тесты просмотра каталога с фильтрами и фасетами"""
+
+    def test_facet_counts(self):
+        """Счётчик фасета учитывает все фильтры, кроме фильтра по нему самому"""
+        index = CatalogFacetIndex(edges=[100, 500])
+        index.upsert([
+            CatalogChange(1, "", "", 5, "посуда", 50.0, "стекло"),
+            CatalogChange(2, "", "", 0, "посуда", 150.0, "керамика"),
+            CatalogChange(3, "", "", 5, "посуда", 700.0, "стекло"),
+            CatalogChange(4, "", "", 5, "декор", 120.0, "стекло"),
+            CatalogChange(5, "", "", 5, None, 100.0, None),
+        ])
+
+        facets = index.facets(BrowseFilters(category_id="посуда", in_stock=True))
+        assert facets["total"] == 2
+        assert facets["category_id"] == [
+            {"value": "посуда", "count": 2},
+            {"value": "декор", "count": 1},
+            {"value": None, "count": 1},
+        ]
+        assert facets["stuff"] == [{"value": "стекло", "count": 2}]
+        assert [bucket["count"] for bucket in facets["price"]] == [1, 0, 1]
+        assert facets["price"][1] == {"min": 100.0, "max": 500.0, "count": 0}
+
+        # Изменение товара пересчитывает его корзину и категорию
+        index.upsert([CatalogChange(2, "", "", 3, "декор", 90.0, "стекло")])
+        assert index.count(BrowseFilters(category_id="декор", price_max=100, in_stock=True)) == 1
+        assert index.count(BrowseFilters(category_id="нет такой")) == 0
+        assert index.facets(BrowseFilters(), limit=1)["category_id"] == [{"value": "декор", "count": 2}]
+
+    @pytest.mark.asyncio
+    async def test_browse_pages_by_price(self, db_session):
+        """Страницы по цене с курсором; курсор привязан к фильтрам"""
+        await upsert_catalog_items(db_session, [
+            browse_item(f"br-{n}", "br-page", price) for n, price in enumerate([300, 100, 200, 200, 50])
+        ] + [browse_item("br-out", "br-page", 150, balance=0)])
+
+        filters = BrowseFilters(category_id="br-page", price_min=100, in_stock=True)
+        first = await browse_catalog_page(db_session, filters, sort="price_desc", limit=2)
+        assert [item.price for item in first.items] == [300, 200]
+        assert first.total == 4
+        second = await browse_catalog_page(db_session, filters, sort="price_desc", limit=2, cursor=first.next_cursor)
+        assert [item.id_item for item in second.items] == ["br-3", "br-1"]
+        assert second.next_cursor is None
+
+        with pytest.raises(ValueError):
+            await browse_catalog_page(db_session, BrowseFilters(category_id="br-page"), sort="price_desc",
+                                      cursor=first.next_cursor)
+
+    @pytest.mark.asyncio
+    async def test_memory_facets_match_sql(self, test_db, db_session):
+        """Фасеты из индекса в памяти совпадают с GROUP BY в БД"""
+        await upsert_catalog_items(db_session, [
+            browse_item("bf-1", "bf-a", 90, "дерево"),
+            browse_item("bf-2", "bf-a", 250, "дерево", balance=0),
+            browse_item("bf-3", "bf-b", 4000, "металл"),
+            browse_item("bf-4", "bf-b", 20000, None),
+        ])
+        cases = [
+            BrowseFilters(),
+            BrowseFilters(category_id="bf-a"),
+            BrowseFilters(stuff="дерево", in_stock=True),
+            BrowseFilters(category_id="bf-b", price_min=1000, price_max=10000),
+        ]
+        expected = [await catalog_facets(db_session, filters) for filters in cases]
+        assert expected[1]["total"] == 2
+
+        await catalog_facet_index.build(test_db, chunk_size=2)
+        try:
+            for filters, sql_facets in zip(cases, expected):
+                assert await catalog_facets(db_session, filters) == sql_facets
+        finally:
+            catalog_facet_index.ready = False
+            catalog_facet_index._clear()
+
+    @pytest.mark.asyncio
+    async def test_pending_items_pages(self, db_session):
+        """Несгенерированные товары — страницами от новых к старым, сгенерированные пропускаются"""
+        await upsert_catalog_items(db_session, [make_item(f"pi-{n}", name=f"Товар pi-{n}") for n in range(8)])
+        ids = [await item_id(db_session, f"pi-{n}") for n in range(8)]
+        # Подряд идущие сгенерированные товары просматриваются следующими порциями
+        generated = RoaringBitmap(ids[1:6])
+
+        first = await pending_items_page(db_session, generated, limit=2)
+        assert [item["id_item"] for item in first.items] == ["pi-7", "pi-6"]
+        assert set(first.items[0]) >= {"id", "name", "photoUrl", "price", "created_at"}
+        assert first.total is not None
+        second = await pending_items_page(db_session, generated, limit=2, cursor=first.next_cursor)
+        assert [item["id_item"] for item in second.items][:1] == ["pi-0"]
+        assert second.total is None
+
+        with pytest.raises(ValueError):
+            await pending_items_page(db_session, generated, cursor="bad")
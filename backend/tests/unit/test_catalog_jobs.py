@@ -0,0 +1,291 @@
+import asyncio
+import json
+import pytest
+import pytest_asyncio
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from config import config
+from models.base import Base
+from models.catalog_items import CatalogItem
+from models.catalog_load_jobs import CatalogLoadJob
+from services.catalog_jobs import CatalogJobManager
+from services.payload_cache import PayloadCache
+from services.sima_land_client import SimaLandClient
+
+
+def make_client(
+    prefix: str, requested_pages: list, fail_page: int | None = None, price: float = 10,
+    fail_times: int | None = None,
+) -> SimaLandClient:
+    """
+    Клиент с фейковым API: страница N содержит товары {prefix}-N-0..49.
+    Страница fail_page отвечает 503 (первые fail_times раз или всегда).
+    """
+    failures = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        requested_pages.append(page)
+        if page == fail_page and (fail_times is None or len(failures) < fail_times):
+            failures.append(page)
+            return httpx.Response(503, json={})
+        return httpx.Response(200, json={"items": [
+            {"id": f"{prefix}-{page}-{i}", "name": f"Товар {i}", "slug": "s", "price": price if i < 5 else 10}
+            for i in range(config.SIMA_LAND_PAGE_SIZE)
+        ]})
+
+    return SimaLandClient(
+        base_url="http://test", concurrency=2, transport=httpx.MockTransport(handler),
+        max_retries=2, retry_base_delay=0.001,
+    )
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    """
+    Отдельная файловая БД: воркер и тест работают параллельно в разных
+    соединениях, как в приложении (общий StaticPool из conftest для этого не подходит)
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+def make_manager(session_factory, client: SimaLandClient) -> CatalogJobManager:
+    return CatalogJobManager(session_factory=session_factory, client=client, cache=PayloadCache(session_factory))
+
+
+async def wait_finished(manager: CatalogJobManager, job_id: int) -> CatalogLoadJob:
+    for _ in range(1000):
+        job = await manager.get_job(job_id)
+        if job.status not in ("pending", "running"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("Задача не завершилась")
+
+
+async def _collect(stream) -> list[str]:
+    return [message async for message in stream]
+
+
+class TestCatalogJobManager:
+    """Тесты фоновых задач загрузки каталога"""
+
+    @pytest.mark.asyncio
+    async def test_job_runs_and_streams_progress(self, session_factory, monkeypatch):
+        """Задача выполняется в фоне, подписчик получает сводные JSON-события до конца"""
+        monkeypatch.setattr(config, "PROGRESS_INTERVAL", 60)
+        pages = []
+        manager = make_manager(session_factory, make_client("job", pages))
+        await manager.start()
+        try:
+            job = await manager.create_job(70)
+            events = [message async for message in manager.subscribe(job.id)]
+            job = await wait_finished(manager, job.id)
+        finally:
+            await manager.stop()
+
+        assert job.status == "completed"
+        assert job.processed_count == 70
+        assert job.inserted_count == 70
+        assert job.last_page == 2
+        parsed = [json.loads(message) for message in events]
+        # Без построчных событий: очередь, старт, итоговый прогресс, метрики, итог
+        assert [event["type"] for event in parsed] == ["status", "status", "progress", "metrics", "done"]
+        progress, done = parsed[2], parsed[-1]
+        assert progress["processed"] == 70 and progress["eta_seconds"] == 0
+        assert progress["rate"] > 0
+        assert done["status"] == "completed"
+        assert done["message"].startswith("✓ Загрузка в каталог завершена")
+        metrics = manager.get_metrics(job.id)
+        stages = {stage["stage"]: stage for stage in metrics["stages"]}
+        assert stages["write"]["items"] == 70
+        assert metrics["api"]["requests"] == 2
+
+        # Переподключение к завершённой задаче отдаёт историю
+        replay = [message async for message in manager.subscribe(job.id)]
+        assert replay == events
+
+        async with session_factory() as db:
+            count = len((await db.execute(
+                select(CatalogItem.id).where(CatalogItem.id_item.like("job-%"))
+            )).all())
+        assert count == 70
+
+    @pytest.mark.asyncio
+    async def test_subscribe_while_job_finishes(self, session_factory):
+        """Задача, завершившаяся во время чтения её из БД подписчиком, закрывает поток, а не вешает его"""
+        async with session_factory() as db:
+            job = CatalogLoadJob(requested_count=10, status="running")
+            db.add(job)
+            await db.commit()
+            job_id = job.id
+
+        manager = make_manager(session_factory, make_client("race", []))
+        manager._status(job_id, "Начинаю загрузку")
+        load_job = manager.get_job
+
+        async def get_job_then_finish(requested_id):
+            stale = await load_job(requested_id)
+            manager._publish(requested_id, json.dumps({"type": "done", "status": "completed"}))
+            manager._publish(requested_id, None)
+            return stale
+
+        manager.get_job = get_job_then_finish
+        events = await asyncio.wait_for(_collect(manager.subscribe(job_id)), timeout=2)
+        assert [json.loads(message)["type"] for message in events] == ["status", "done"]
+
+        # Повторное подключение к закрытому потоку отдаёт историю и завершается
+        replay = await asyncio.wait_for(_collect(manager.subscribe(job_id)), timeout=2)
+        assert replay == events
+
+    @pytest.mark.asyncio
+    async def test_job_resumes_from_checkpoint(self, session_factory):
+        """Задача, прерванная падением процесса, продолжается со следующей страницы"""
+        async with session_factory() as db:
+            job = CatalogLoadJob(
+                requested_count=120, last_page=1, processed_count=50,
+                inserted_count=50, status="running",
+            )
+            db.add(job)
+            await db.commit()
+            job_id = job.id
+
+        pages = []
+        manager = make_manager(session_factory, make_client("resume", pages))
+        await manager.start()
+        try:
+            job = await wait_finished(manager, job_id)
+        finally:
+            await manager.stop()
+
+        assert pages[0] == 2
+        assert 1 not in pages
+        assert job.status == "completed"
+        assert job.processed_count == 120
+        assert job.last_page == 3
+
+    @pytest.mark.asyncio
+    async def test_job_fails_on_api_error_and_keeps_checkpoint(self, session_factory):
+        """Ошибка API завершает задачу, чекпоинт остаётся на последней записанной странице"""
+        pages = []
+        manager = make_manager(session_factory, make_client("fail", pages, fail_page=2))
+        await manager.start()
+        try:
+            job = await manager.create_job(150)
+            job = await wait_finished(manager, job.id)
+        finally:
+            await manager.stop()
+
+        assert job.status == "failed"
+        assert "503" in job.error
+        assert job.last_page == 1
+        assert job.processed_count == 50
+        # Первая попытка и два повтора
+        assert pages.count(2) == 3
+
+    @pytest.mark.asyncio
+    async def test_job_retries_transient_errors(self, session_factory):
+        """Временная ошибка API повторяется, задача не падает; повторы видны в прогрессе"""
+        pages = []
+        manager = make_manager(session_factory, make_client("retry", pages, fail_page=2, fail_times=1))
+        await manager.start()
+        try:
+            job = await manager.create_job(120)
+            events = [message async for message in manager.subscribe(job.id)]
+            job = await wait_finished(manager, job.id)
+        finally:
+            await manager.stop()
+
+        assert job.status == "completed"
+        assert job.inserted_count == 120
+        assert pages.count(2) == 2
+        metrics = json.loads(events[-2])
+        assert metrics["type"] == "metrics"
+        assert metrics["api"]["retries"] == 1 and metrics["api"]["throttled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_large_job_writes_in_chunks(self, session_factory, monkeypatch):
+        """Режим large пишет чанками по несколько страниц с чекпоинтом на каждый чанк"""
+        monkeypatch.setattr(config, "LARGE_LOAD_CHUNK_SIZE", 100)
+        monkeypatch.setattr(config, "PROGRESS_EVERY_ITEMS", 100)
+        pages = []
+        manager = make_manager(session_factory, make_client("large", pages))
+        await manager.start()
+        try:
+            job = await manager.create_job(230, mode="large")
+            events = [message async for message in manager.subscribe(job.id)]
+            job = await wait_finished(manager, job.id)
+        finally:
+            await manager.stop()
+
+        assert job.status == "completed"
+        assert job.inserted_count == 230
+        assert job.last_page == 5
+        progress = [event for event in map(json.loads, events) if event["type"] == "progress"]
+        assert [(event["processed"], event["last_page"]) for event in progress] == [
+            (100, 2), (200, 4), (230, 5),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_sync_job_updates_only_changed(self, session_factory):
+        """Синхронизация считает новые, изменённые и неизменённые товары"""
+        pages = []
+        manager = make_manager(session_factory, make_client("sync", pages))
+        await manager.start()
+        try:
+            job = await manager.create_job(100)
+            await wait_finished(manager, job.id)
+
+            # У первых 5 товаров каждой страницы изменилась цена; кеш не используем
+            manager.client = make_client("sync", pages, price=99)
+            manager.cache_ttl = 0
+            job = await manager.create_job(120, mode="sync")
+            job = await wait_finished(manager, job.id)
+        finally:
+            await manager.stop()
+
+        assert job.status == "completed"
+        assert job.updated_count == 10
+        assert job.unchanged_count == 90
+        assert job.inserted_count == 20
+
+        async with session_factory() as db:
+            price = await db.scalar(select(CatalogItem.price).where(CatalogItem.id_item == "sync-1-0"))
+        assert price == 99
+
+    @pytest.mark.asyncio
+    async def test_cached_pages_are_not_refetched(self, session_factory):
+        """Свежие страницы берутся из кеша, replay не обращается к сети"""
+        pages = []
+        manager = make_manager(session_factory, make_client("cache", pages))
+        await manager.start()
+        try:
+            job = await manager.create_job(100)
+            await wait_finished(manager, job.id)
+            assert pages == [1, 2, 3]
+
+            # Повторная загрузка в пределах окна свежести — без запросов к API
+            job = await manager.create_job(100, mode="sync")
+            job = await wait_finished(manager, job.id)
+            assert pages == [1, 2, 3]
+            assert job.unchanged_count == 100
+
+            manager.client = SimaLandClient(
+                base_url="http://test", transport=httpx.MockTransport(lambda request: pytest.fail("сеть"))
+            )
+            job = await manager.create_job(200, mode="replay")
+            job = await wait_finished(manager, job.id)
+        finally:
+            await manager.stop()
+
+        assert job.status == "completed"
+        # Страница 3 была загружена заранее, но её товары в БД ещё не записаны;
+        # страниц 4-5 в кеше нет — перемаппинг останавливается на них
+        assert job.last_page == 3
+        assert job.unchanged_count == 100
+        assert job.inserted_count == 50
@@ -0,0 +1,237 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from models.catalog_items import CatalogItem
+from services.catalog_browse import ITEM_COLUMNS
+from services.catalog_events import CatalogChange
+from services.catalog_search import (
+    fts5_query, like_pattern, search_catalog, search_catalog_page, tsquery, word_similarity,
+)
+from services.pagination import encode_cursor, estimate_total
+from services.search_index import CatalogSearchIndex
+from services.russian_stemmer import stem, tokenize
+from tests.factories import make_item
+from services.catalog_writer import upsert_catalog_items
+
+
+class TestRussianStemmer:
+    """Тесты стеммера русского языка"""
+
+    def test_word_forms_share_stem(self):
+        """Разные формы слова сводятся к одной основе"""
+        assert stem("кружка") == stem("кружки") == stem("Кружкой")
+        assert stem("красный") == stem("красные") == stem("красная")
+
+    def test_non_cyrillic_kept(self):
+        """Латиница и числа не меняются, кроме регистра"""
+        assert stem("IKEA") == "ikea"
+        assert stem("2024") == "2024"
+
+    def test_tokenize(self):
+        assert tokenize("Кружка «белый», арт. 1234") == ["кружка", "белый", "арт", "1234"]
+
+
+class TestCatalogSearch:
+    """Тесты полнотекстового поиска по каталогу (SQLite FTS5)"""
+
+    def test_queries(self):
+        """Короткие слова ищутся целиком, длинные — по основе"""
+        assert fts5_query("Красные кружки") == '"красн"* "кружк"*'
+        assert fts5_query("чай") == '"чай"*'
+        assert fts5_query("«»!") is None
+        assert tsquery("красные кружки") == "красные:* & кружки:*"
+
+    @pytest.mark.asyncio
+    async def test_word_forms_match(self, db_session):
+        """Запрос в одной форме находит товары с другими формами слова"""
+        await upsert_catalog_items(db_session, [
+            make_item("fts-1", name="Пельменница алюминиевая"),
+            make_item("fts-2", name="Набор пельменниц"),
+            make_item("fts-3", name="Форма для вареников"),
+        ])
+
+        items = await search_catalog(db_session, "пельменницы")
+        assert sorted(item["id_item"] for item in items) == ["fts-1", "fts-2"]
+
+        items = await search_catalog(db_session, "алюминиевые пельменницы")
+        assert [item["id_item"] for item in items] == ["fts-1"]
+
+    @pytest.mark.asyncio
+    async def test_ranking(self, db_session):
+        """Совпадение в названии выше совпадения только в slug"""
+        slug_only = make_item("ftr-1", name="Подставка настольная")
+        slug_only["slug"] = "kofemolka-podstavka"
+        await upsert_catalog_items(db_session, [
+            slug_only,
+            make_item("ftr-2", name="Кофемолка ручная"),
+        ])
+
+        items = await search_catalog(db_session, "kofemolka")
+        assert [item["id_item"] for item in items] == ["ftr-1"]
+
+        items = await search_catalog(db_session, "кофемолка")
+        assert [item["id_item"] for item in items] == ["ftr-2"]
+
+        items = await search_catalog(db_session, "kofemolka подставка")
+        assert [item["id_item"] for item in items] == ["ftr-1"]
+
+    @pytest.mark.asyncio
+    async def test_index_follows_updates(self, db_session):
+        """Триггеры обновляют индекс при изменении и удалении товара"""
+        await upsert_catalog_items(db_session, [make_item("ftu-1", name="Самовар электрический")])
+        assert [item["id_item"] for item in await search_catalog(db_session, "самовары")] == ["ftu-1"]
+
+        item = (await db_session.execute(select(CatalogItem).where(CatalogItem.id_item == "ftu-1"))).scalar_one()
+        item.name = "Чайник электрический"
+        await db_session.commit()
+        assert await search_catalog(db_session, "самовар") == []
+        assert [item["id_item"] for item in await search_catalog(db_session, "чайники")] == ["ftu-1"]
+
+        await db_session.delete(item)
+        await db_session.commit()
+        assert await search_catalog(db_session, "чайник") == []
+
+    @pytest.mark.asyncio
+    async def test_empty_query(self, db_session):
+        assert await search_catalog(db_session, "  ") == []
+
+
+class TestTrigramSearch:
+    """Тесты поиска по подстроке и по сходству (SQLite FTS5 trigram)"""
+
+    def test_helpers(self):
+        assert like_pattern("50%_a") == "%50\\%\\_a%"
+        assert word_similarity("кружка", "Кружка белая") == 1.0
+        assert 0.5 < word_similarity("кружко", "Кружка белая") < 1.0
+        assert word_similarity("самовар", "Кружка белая") == 0.0
+
+    @pytest.mark.asyncio
+    async def test_substring(self, db_session):
+        """Фрагмент находится в середине слова, в slug и в артикуле"""
+        await upsert_catalog_items(db_session, [
+            make_item("trg-7731", name="Термокружка дорожная"),
+            make_item("trg-7732", name="Термос стальной"),
+        ])
+
+        items = await search_catalog(db_session, "РМОКРУ", mode="substring")
+        assert [item["id_item"] for item in items] == ["trg-7731"]
+
+        items = await search_catalog(db_session, "trg-773", mode="substring")
+        assert sorted(item["id_item"] for item in items) == ["trg-7731", "trg-7732"]
+
+        # Короче триграммы — полный просмотр без индекса
+        items = await search_catalog(db_session, "-7732", mode="substring")
+        assert [item["id_item"] for item in items] == ["trg-7732"]
+
+    @pytest.mark.asyncio
+    async def test_similar(self, db_session):
+        """Нечёткий поиск находит слово с опечаткой, точное совпадение выше"""
+        await upsert_catalog_items(db_session, [
+            make_item("sim-1", name="Мухоловка липкая"),
+            make_item("sim-2", name="Мухоловки уличные"),
+            make_item("sim-3", name="Подушка ортопедическая"),
+        ])
+
+        items = await search_catalog(db_session, "мухоловка", mode="similar")
+        assert [item["id_item"] for item in items] == ["sim-1", "sim-2"]
+        # Товары — словари колонок ответа, как у /get_items
+        assert list(items[0]) == [column.key for column in ITEM_COLUMNS]
+
+        items = await search_catalog(db_session, "мухаловка", mode="similar")
+        assert {item["id_item"] for item in items} == {"sim-1", "sim-2"}
+
+    @pytest.mark.asyncio
+    async def test_unknown_mode(self, db_session):
+        with pytest.raises(ValueError):
+            await search_catalog(db_session, "кружка", mode="regex")
+
+
+class TestSearchPagination:
+    """Тесты keyset-пагинации поиска по каталогу"""
+
+    async def collect(self, db, query, mode, limit):
+        pages = []
+        page = await search_catalog_page(db, query, limit=limit, mode=mode)
+        first = page
+        pages.append([item["id_item"] for item in page.items])
+        while page.next_cursor:
+            page = await search_catalog_page(db, query, limit=limit, mode=mode, cursor=page.next_cursor)
+            assert page.total is None
+            pages.append([item["id_item"] for item in page.items])
+        return first, pages
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_results_once(self, db_session):
+        """Страницы по курсору в сумме дают ту же выдачу, что и один большой запрос"""
+        await upsert_catalog_items(db_session, [
+            make_item(f"pg-{n:02d}", name=f"Гербарий {'настенный ' * (n % 3)}{n}") for n in range(23)
+        ])
+
+        for mode, query in (("fulltext", "гербарии"), ("substring", "ербари"), ("similar", "гербарий")):
+            everything = [item["id_item"] for item in await search_catalog(db_session, query, limit=100, mode=mode)]
+            first, pages = await self.collect(db_session, query, mode, limit=5)
+            assert [len(page) for page in pages] == [5, 5, 5, 5, 3], mode
+            assert sum(pages, []) == everything, mode
+            assert (first.total, first.total_exact) == (23, True), mode
+
+    def test_memory_index_pages(self):
+        """Индекс в памяти листается по ключу [вес, id] с равными весами"""
+        index = CatalogSearchIndex()
+        index.upsert(CatalogChange(n, f"Гобелен {'шёлковый ' * (n % 4)}", "") for n in range(1, 13))
+
+        pairs, total = index.search_scored("гобелен", limit=100)
+        expected = [item_id for item_id, _ in pairs]
+        seen, after = [], None
+        while True:
+            page, _ = index.search_scored("гобелен", limit=5, after=after)
+            seen += [item_id for item_id, _ in page]
+            if len(page) < 5:
+                break
+            after = [page[-1][1], page[-1][0]]
+        assert total == 12
+        assert seen == expected
+
+    @pytest.mark.asyncio
+    async def test_bad_cursor(self, db_session):
+        page_cursor = encode_cursor({"mode": "fulltext", "query": "кружка", "key": [1]})
+        with pytest.raises(ValueError):
+            await search_catalog_page(db_session, "тарелка", cursor=page_cursor)
+        with pytest.raises(ValueError):
+            await search_catalog_page(db_session, "кружка", cursor="не курсор")
+
+    @pytest.mark.asyncio
+    async def test_colon_in_query(self, db_session):
+        """Слово с двоеточием («:белая») ищется как текст, а не как параметр SQL"""
+        await upsert_catalog_items(db_session, [make_item("colon-1", name="Кружка :белая")])
+        for mode in ("substring", "similar"):
+            page = await search_catalog_page(db_session, "кружка :белая", mode=mode)
+            assert "colon-1" in [item["id_item"] for item in page.items], mode
+
+    @pytest.mark.asyncio
+    async def test_postgres_estimate_passes_params(self):
+        """EXPLAIN для оценки в PostgreSQL получает текст поиска параметром драйвера"""
+        executed = []
+
+        class Result:
+            def scalar_one(self):
+                return '[{"Plan": {"Plan Rows": 42}}]'
+
+        class Connection:
+            async def exec_driver_sql(self, sql, params):
+                executed.append((sql, params))
+                return Result()
+
+        async def connection():
+            return Connection()
+
+        db = SimpleNamespace(bind=SimpleNamespace(dialect=asyncpg.dialect()), connection=connection)
+        stmt = select(CatalogItem.id).where(CatalogItem.name.ilike(like_pattern(":белая")))
+        assert await estimate_total(db, stmt) == (42, False)
+
+        sql, params = executed[0]
+        assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+        assert "белая" not in sql
+        assert params == (like_pattern(":белая"),)
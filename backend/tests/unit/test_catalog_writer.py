@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import select
+
+from models.catalog_items import CatalogItem
+from models.log import Log
+from services.catalog_writer import compute_content_hash, sync_catalog_items, upsert_catalog_items
+from tests.factories import make_item
+
+
+class TestCatalogWriter:
+    """Тесты массовой записи товаров в каталог"""
+
+    @pytest.mark.asyncio
+    async def test_insert_and_skip_existing(self, db_session):
+        """Новые товары вставляются, существующие пропускаются"""
+        first = await upsert_catalog_items(db_session, [make_item("cw-1"), make_item("cw-2")])
+        assert sorted(first.inserted) == ["cw-1", "cw-2"]
+        assert first.skipped == []
+
+        second = await upsert_catalog_items(db_session, [make_item("cw-2"), make_item("cw-3")])
+        assert second.inserted == ["cw-3"]
+        assert second.skipped == ["cw-2"]
+
+        rows = await db_session.execute(
+            select(CatalogItem.id_item).where(CatalogItem.id_item.like("cw-%"))
+        )
+        assert sorted(rows.scalars().all()) == ["cw-1", "cw-2", "cw-3"]
+
+    @pytest.mark.asyncio
+    async def test_update_existing(self, db_session):
+        """В режиме update_existing существующие товары перезаписываются"""
+        await upsert_catalog_items(db_session, [make_item("cwu-1", price=10.0)])
+
+        result = await upsert_catalog_items(
+            db_session,
+            [make_item("cwu-1", price=20.0), make_item("cwu-2")],
+            update_existing=True,
+        )
+        assert result.inserted == ["cwu-2"]
+        assert result.updated == ["cwu-1"]
+
+        price = await db_session.scalar(select(CatalogItem.price).where(CatalogItem.id_item == "cwu-1"))
+        assert price == 20.0
+
+    @pytest.mark.asyncio
+    async def test_duplicates_in_batch_and_logs(self, db_session):
+        """Дубликаты внутри пачки схлопываются, лог пишется только для добавленных"""
+        result = await upsert_catalog_items(
+            db_session,
+            [make_item("cwl-1", name="Первая"), make_item("cwl-1", name="Вторая")],
+            log_action="catalog_load_test",
+        )
+        assert result.inserted == ["cwl-1"]
+
+        logs = await db_session.execute(select(Log).where(Log.action == "catalog_load_test"))
+        logs = logs.scalars().all()
+        assert len(logs) == 1
+        assert logs[0].item_id == "cwl-1"
+        assert "Вторая" in logs[0].message
+
+    @pytest.mark.asyncio
+    async def test_empty_batch(self, db_session):
+        """Пустая пачка не обращается к БД"""
+        result = await upsert_catalog_items(db_session, [])
+        assert result.inserted == [] and result.skipped == []
+
+
+class TestCatalogSync:
+    """Тесты дельта-синхронизации каталога по хешу содержимого"""
+
+    def test_content_hash_depends_on_content_only(self):
+        """Хеш меняется при изменении цены и не зависит от лишних ключей"""
+        item = make_item("h-1")
+        assert compute_content_hash(item) == compute_content_hash({**item, "created_at": "x"})
+        assert compute_content_hash(item) != compute_content_hash({**item, "price": 1.0})
+
+    @pytest.mark.asyncio
+    async def test_sync_counts_and_skips_unchanged(self, db_session):
+        """Неизменённые строки не пишутся, изменённые обновляются, новые вставляются"""
+        await upsert_catalog_items(db_session, [make_item("cs-1"), make_item("cs-2")])
+        before = await db_session.scalar(
+            select(CatalogItem.updated_at).where(CatalogItem.id_item == "cs-1")
+        )
+
+        result = await sync_catalog_items(db_session, [
+            make_item("cs-1"),
+            make_item("cs-2", price=150.0),
+            make_item("cs-3"),
+        ])
+        assert result.unchanged == ["cs-1"]
+        assert result.changed == ["cs-2"]
+        assert result.inserted == ["cs-3"]
+
+        rows = dict((await db_session.execute(
+            select(CatalogItem.id_item, CatalogItem.price).where(CatalogItem.id_item.like("cs-%"))
+        )).all())
+        assert rows == {"cs-1": 100.0, "cs-2": 150.0, "cs-3": 100.0}
+
+        after = await db_session.scalar(
+            select(CatalogItem.updated_at).where(CatalogItem.id_item == "cs-1")
+        )
+        assert after == before
+
+    @pytest.mark.asyncio
+    async def test_sync_write_budget(self, db_session):
+        """Сверх лимита записи изменения откладываются"""
+        result = await sync_catalog_items(
+            db_session, [make_item("csb-1"), make_item("csb-2"), make_item("csb-3")], write_budget=2
+        )
+        assert result.inserted == ["csb-1", "csb-2"]
+        assert result.deferred == ["csb-3"]
+        assert result.writes == 2
@@ -0,0 +1,58 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from models.user_generations import UserGeneration
+from routers.sima_land.getters import get_user_generations
+from schemas.catalog import UserGenerationView
+from services.catalog_writer import upsert_catalog_items
+from services.fast_json import FastJSONResponse, row_dicts
+from tests.factories import item_id, make_item, make_user
+
+
+class TestFastJSON:
+    """Тесты быстрого JSON-ответа списочных эндпоинтов"""
+
+    def test_row_dicts_and_render(self):
+        """Строки с вложенным объектом — словари; формат совпадает со стандартным ответом"""
+        columns = (SimpleNamespace(key="id"), SimpleNamespace(key="created_at"))
+        nested = ("catalog_item", (SimpleNamespace(key="id"), SimpleNamespace(key="price")))
+        rows = [(1, datetime(2026, 10, 17, 12, 30), 7, 99.0), (2, datetime(2026, 10, 17, 12, 30, 0, 5), None, None)]
+
+        assert row_dicts(rows, columns[:1]) == [{"id": 1}, {"id": 2}]
+        body = FastJSONResponse(row_dicts(rows, columns, nested=nested)).body
+        assert orjson.loads(body) == [
+            {"id": 1, "created_at": "2026-10-17T12:30:00", "catalog_item": {"id": 7, "price": 99.0}},
+            {"id": 2, "created_at": "2026-10-17T12:30:00.000005", "catalog_item": None},
+        ]
+        assert FastJSONResponse({"name": "Ёлка"}).body == '{"name":"Ёлка"}'.encode("utf-8")
+
+    @pytest.mark.asyncio
+    async def test_generations_match_view(self, db_session):
+        """Ответ /get_items_sellers совпадает с сериализацией через UserGenerationView"""
+        owner = await make_user(db_session, "fast-json@example.com")
+        await upsert_catalog_items(db_session, [make_item("fj-1", name="Плед флисовый", price=890.5)])
+        db_session.add_all([
+            UserGeneration(user_id=owner, catalog_item_id=await item_id(db_session, "fj-1"),
+                           ai_description="Мягкий плед", ai_keywords="плед, флис"),
+            UserGeneration(user_id=owner, catalog_item_id=await item_id(db_session, "fj-1"),
+                           generation_name="Второй вариант"),
+        ])
+        await db_session.commit()
+
+        response = await get_user_generations(
+            if_none_match=None, db=db_session, current_user=SimpleNamespace(id=owner)
+        )
+        result = await db_session.execute(
+            select(UserGeneration)
+            .where(UserGeneration.user_id == owner)
+            .options(selectinload(UserGeneration.catalog_item))
+            .order_by(UserGeneration.created_at.desc())
+        )
+        expected = [UserGenerationView.model_validate(gen).model_dump(mode="json") for gen in result.scalars()]
+        assert len(expected) == 2
+        assert orjson.loads(response.body) == expected
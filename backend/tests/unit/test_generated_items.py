@@ -0,0 +1,96 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from models.user_generations import UserGeneration
+from services.bitmap import ARRAY_LIMIT, RoaringBitmap
+from services.catalog_writer import upsert_catalog_items
+from services.generated_items import GeneratedItems, generated_items
+from tests.factories import item_id, make_item, make_user
+
+
+class TestRoaringBitmap:
+    """Тесты сжатого множества id"""
+
+    def test_matches_python_set(self):
+        """Добавление, удаление и проверки совпадают с set, в том числе при смене вида блока"""
+        rng = random.Random(7)
+        expected = {rng.randrange(300_000) for _ in range(3000)} | set(range(70_000, 70_000 + ARRAY_LIMIT + 10))
+        bitmap = RoaringBitmap(expected)
+        assert len(bitmap) == len(expected)
+
+        for value in list(expected)[:1500] + list(range(70_000, 70_020)):
+            bitmap.discard(value)
+            expected.discard(value)
+        for value in range(5, 5000, 7):
+            bitmap.add(value)
+            expected.add(value)
+
+        queries = np.array([rng.randrange(300_000) for _ in range(20_000)] + sorted(expected)[:100])
+        assert bitmap.contains_many(queries).tolist() == [int(value) in expected for value in queries]
+        assert all((int(value) in bitmap) == (int(value) in expected) for value in queries[:500])
+        assert bitmap.to_array().tolist() == sorted(expected)
+        assert len(bitmap) == len(expected)
+
+    def test_compact(self):
+        """Плотный блок — битовая карта 8 КБ, редкие id — по 2 байта"""
+        assert RoaringBitmap(range(65_536)).nbytes == 8192
+        assert RoaringBitmap(range(0, 1_000_000, 1000)).nbytes == 2000
+        assert RoaringBitmap().contains_many([1, 2]).tolist() == [False, False]
+
+
+class TestGeneratedItems:
+    """Тесты множеств сгенерированных товаров пользователей"""
+
+    @pytest.mark.asyncio
+    async def test_follows_generation_commits(self, db_session):
+        """Множество читается из БД и обновляется созданием и удалением генераций"""
+        user = await make_user(db_session, "bitmap-user@example.com")
+        await upsert_catalog_items(db_session, [make_item(f"bm-{n}", name=f"Ковш {n}") for n in range(3)])
+        first, second, third = [await item_id(db_session, f"bm-{n}") for n in range(3)]
+        db_session.add(UserGeneration(user_id=user, catalog_item_id=first))
+        await db_session.commit()
+
+        bitmap = await generated_items.bitmap(db_session, user)
+        assert bitmap.contains_many([first, second, third]).tolist() == [True, False, False]
+
+        # Две генерации одного товара: удаление одной оставляет товар сгенерированным
+        extra = [UserGeneration(user_id=user, catalog_item_id=second) for _ in range(2)]
+        db_session.add_all(extra)
+        await db_session.commit()
+        await db_session.delete(extra[0])
+        await db_session.commit()
+        assert second in await generated_items.bitmap(db_session, user)
+        await db_session.delete(extra[1])
+        await db_session.commit()
+        assert second not in await generated_items.bitmap(db_session, user)
+
+        # Откаченная генерация не попадает в множество
+        db_session.add(UserGeneration(user_id=user, catalog_item_id=third))
+        await db_session.flush()
+        await db_session.rollback()
+        assert third not in await generated_items.bitmap(db_session, user)
+
+        report = generated_items.memory_report()
+        entry = next(entry for entry in report["per_user"] if entry["user_id"] == user)
+        assert entry["items"] == 1
+        assert entry["bytes"] > 0
+
+    @pytest.mark.asyncio
+    async def test_load_racing_with_change_is_not_kept(self, db_session):
+        """Если во время чтения из БД пришло изменение, прочитанное множество не запоминается"""
+        user = await make_user(db_session, "bitmap-race@example.com")
+        registry = GeneratedItems(max_users=1)
+
+        class RacingSession:
+            async def execute(self, stmt):
+                result = await db_session.execute(stmt)
+                registry.on_generations_change(Counter({(user, 1): 1}))
+                return result
+
+        await registry.bitmap(RacingSession(), user)
+        assert registry.memory_report()["users"] == 0
+        await registry.bitmap(db_session, user)
+        assert registry.memory_report()["users"] == 1
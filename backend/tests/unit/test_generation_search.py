@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import select
+
+from models.catalog_items import CatalogItem
+from models.user_generations import UserGeneration
+from services.catalog_writer import upsert_catalog_items
+from services.generation_search import GENERATION_COLUMNS, search_generations_page
+from tests.factories import item_id, make_item, make_user
+
+
+class TestGenerationSearch:
+    """Тесты полнотекстового поиска по генерациям пользователя"""
+
+    @pytest.mark.asyncio
+    async def test_searches_name_keywords_and_description(self, db_session):
+        """Поиск идёт по названию товара, ключевым словам и описанию только своих генераций"""
+        owner = await make_user(db_session, "gen-search-owner@example.com")
+        other = await make_user(db_session, "gen-search-other@example.com")
+        await upsert_catalog_items(db_session, [
+            make_item("gs-1", name="Термос походный"),
+            make_item("gs-2", name="Фляга алюминиевая"),
+        ])
+        thermos, flask = await item_id(db_session, "gs-1"), await item_id(db_session, "gs-2")
+        db_session.add_all([
+            UserGeneration(user_id=owner, catalog_item_id=thermos, ai_description="Сохраняет тепло напитков"),
+            UserGeneration(user_id=owner, catalog_item_id=flask, ai_keywords="туризм, термосы, походы"),
+            UserGeneration(user_id=other, catalog_item_id=thermos, ai_description="Термос для рыбалки"),
+        ])
+        await db_session.commit()
+
+        page = await search_generations_page(db_session, owner, "термосы")
+        # Совпадение в названии весит больше, чем в ключевых словах
+        assert [gen["catalog_item_id"] for gen in page.items] == [thermos, flask]
+        assert all(gen["user_id"] == owner for gen in page.items)
+        assert page.items[0]["catalog_item"]["name"] == "Термос походный"
+        # Формат строк — как у /get_items_sellers, без колонки score
+        assert list(page.items[0]) == [column.key for column in GENERATION_COLUMNS] + ["catalog_item"]
+        assert "score" not in page.items[0]["catalog_item"]
+
+        page = await search_generations_page(db_session, owner, "холодные напитки")
+        assert page.items == []
+        page = await search_generations_page(db_session, owner, "напитки")
+        assert [gen["catalog_item_id"] for gen in page.items] == [thermos]
+        page = await search_generations_page(db_session, other, "рыбалка")
+        assert [gen["user_id"] for gen in page.items] == [other]
+
+    @pytest.mark.asyncio
+    async def test_index_follows_changes(self, db_session):
+        """Изменение генерации и переименование товара попадают в индекс"""
+        owner = await make_user(db_session, "gen-search-changes@example.com")
+        await upsert_catalog_items(db_session, [make_item("gsc-1", name="Грелка резиновая")])
+        generation = UserGeneration(user_id=owner, catalog_item_id=await item_id(db_session, "gsc-1"))
+        db_session.add(generation)
+        await db_session.commit()
+
+        generation.ai_keywords = "компресс"
+        item = (await db_session.execute(select(CatalogItem).where(CatalogItem.id_item == "gsc-1"))).scalar_one()
+        item.name = "Грелка электрическая"
+        await db_session.commit()
+
+        assert len((await search_generations_page(db_session, owner, "компрессы")).items) == 1
+        assert len((await search_generations_page(db_session, owner, "электрическая грелка")).items) == 1
+        assert (await search_generations_page(db_session, owner, "резиновая")).items == []
+
+        await db_session.delete(generation)
+        await db_session.commit()
+        assert (await search_generations_page(db_session, owner, "грелка")).items == []
+
+    @pytest.mark.asyncio
+    async def test_pages(self, db_session):
+        """Курсор листает выдачу без пропусков и повторов"""
+        owner = await make_user(db_session, "gen-search-pages@example.com")
+        await upsert_catalog_items(db_session, [make_item(f"gsp-{n}", name=f"Подстаканник {n}") for n in range(7)])
+        for n in range(7):
+            db_session.add(UserGeneration(user_id=owner, catalog_item_id=await item_id(db_session, f"gsp-{n}")))
+        await db_session.commit()
+
+        page = await search_generations_page(db_session, owner, "подстаканники", limit=3)
+        assert (page.total, page.total_exact) == (7, True)
+        seen = [gen["id"] for gen in page.items]
+        while page.next_cursor:
+            page = await search_generations_page(db_session, owner, "подстаканники", limit=3, cursor=page.next_cursor)
+            seen += [gen["id"] for gen in page.items]
+        assert len(seen) == len(set(seen)) == 7
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+
+from services.ingest_pipeline import IngestPipeline, PageBatch
+
+
+async def make_source(pages: int, fail_after: int | None = None):
+    for page in range(1, pages + 1):
+        if page == fail_after:
+            raise RuntimeError("источник упал")
+        yield page, [{"n": i} for i in range(10)]
+
+
+def transform(page_number, items):
+    return PageBatch(page_number, items, items=list(items), last=not items)
+
+
+class TestIngestPipeline:
+    """Тесты конвейера fetch → map → write"""
+
+    @pytest.mark.asyncio
+    async def test_writes_pages_in_order_with_backpressure(self):
+        """Страницы пишутся по порядку, очередь не растёт сверх ёмкости"""
+        written = []
+        depths = []
+
+        async def sink(batches):
+            depths.append(pipeline.fetched.qsize())
+            await asyncio.sleep(0.001)
+            written.extend(batch.page_number for batch in batches)
+            return sum(len(batch.items) for batch in batches)
+
+        pipeline = IngestPipeline(make_source(20), transform, sink, queue_size=2)
+        await pipeline.run()
+
+        assert written == list(range(1, 21))
+        assert max(depths) <= 2
+        metrics = {stage["stage"]: stage for stage in pipeline.metrics()}
+        assert metrics["fetch"]["items"] == 200
+        assert metrics["write"]["pages"] == 20
+        assert metrics["write"]["busy_seconds"] > 0
+        # Медленная запись — источник ждёт места в очереди
+        assert metrics["fetch"]["blocked_seconds"] > 0
+
+    @pytest.mark.asyncio
+    async def test_last_batch_stops_pipeline(self):
+        """Последняя страница останавливает конвейер"""
+        written = []
+
+        def limited(page_number, items):
+            return PageBatch(page_number, items, items=list(items), last=page_number == 3)
+
+        async def sink(batches):
+            written.extend(batch.page_number for batch in batches)
+            return sum(len(batch.items) for batch in batches)
+
+        await IngestPipeline(make_source(10), limited, sink).run()
+        assert written == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_source_error_after_written_pages(self):
+        """Ошибка источника всплывает после записи уже полученных страниц"""
+        written = []
+
+        async def sink(batches):
+            written.extend(batch.page_number for batch in batches)
+            return sum(len(batch.items) for batch in batches)
+
+        with pytest.raises(RuntimeError, match="источник упал"):
+            await IngestPipeline(make_source(10, fail_after=4), transform, sink).run()
+        assert written == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_batches_pages_into_chunks(self):
+        """С batch_items страницы пишутся чанками, хвост — отдельным чанком"""
+        chunks = []
+
+        async def sink(batches):
+            chunks.append([batch.page_number for batch in batches])
+            return sum(len(batch.items) for batch in batches)
+
+        pipeline = IngestPipeline(make_source(7), transform, sink, batch_items=30)
+        await pipeline.run()
+        assert chunks == [[1, 2, 3], [4, 5, 6], [7]]
+        assert pipeline.metrics()[2]["items"] == 70
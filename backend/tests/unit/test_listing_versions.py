@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+from models.user_generations import UserGeneration
+from routers.sima_land.edit import update_generation
+from routers.sima_land.getters import get_catalog_items, get_user_generations
+from services.catalog_writer import upsert_catalog_items
+from services.listing_versions import (
+    CATALOG_SCOPE,
+    bump_versions,
+    current_versions,
+    etag_matches,
+    generations_scope,
+)
+from tests.factories import item_id, make_item, make_user
+
+
+class TestListingVersions:
+    """Тесты версий списков и ответов 304 по ETag"""
+
+    def test_etag_matches(self):
+        assert etag_matches('"a1"', '"a1"')
+        assert etag_matches('"b2", W/"a1"', '"a1"')
+        assert etag_matches("*", '"a1"')
+        assert not etag_matches(None, '"a1"')
+        assert not etag_matches('"a2"', '"a1"')
+
+    @pytest.mark.asyncio
+    async def test_versions_bumped_in_transaction(self, db_session):
+        """Версия растёт вместе с коммитом записи и не меняется при откате"""
+        scope = generations_scope(987654)
+        assert await current_versions(db_session, [scope]) == [0]
+        await bump_versions(db_session, [scope, scope])
+        await db_session.commit()
+        assert await current_versions(db_session, [scope]) == [1]
+
+        await bump_versions(db_session, [scope])
+        await db_session.rollback()
+        assert await current_versions(db_session, [scope]) == [1]
+
+        before = await current_versions(db_session, [CATALOG_SCOPE])
+        await upsert_catalog_items(db_session, [make_item("lv-0")])
+        assert await current_versions(db_session, [CATALOG_SCOPE]) == [before[0] + 1]
+
+    @pytest.mark.asyncio
+    async def test_not_modified_without_listing_queries(self, db_session, monkeypatch):
+        """Повторный запрос с ETag — 304 без запроса списка; запись каталога или генерации меняет ETag"""
+        owner = await make_user(db_session, "listing-etag@example.com")
+        user = SimpleNamespace(id=owner)
+        await upsert_catalog_items(db_session, [make_item("lv-1", name="Скатерть льняная")])
+        generation = UserGeneration(user_id=owner, catalog_item_id=await item_id(db_session, "lv-1"))
+        db_session.add(generation)
+        await db_session.commit()
+        await db_session.refresh(generation)
+        generation_id = generation.id
+
+        items = await get_catalog_items(cursor=None, limit=10, if_none_match=None, db=db_session, current_user=user)
+        sellers = await get_user_generations(if_none_match=None, db=db_session, current_user=user)
+        assert items.status_code == sellers.status_code == 200
+        assert items.headers["ETag"] != sellers.headers["ETag"]
+        assert len(orjson.loads(sellers.body)) == 1
+
+        async def no_listing(*args, **kwargs):
+            raise AssertionError("Запрос списка при совпавшем ETag")
+
+        monkeypatch.setattr("routers.sima_land.getters.pending_items_page", no_listing)
+        cached = await get_catalog_items(
+            cursor=None, limit=10, if_none_match=items.headers["ETag"], db=db_session, current_user=user
+        )
+        assert cached.status_code == 304
+        assert cached.headers["ETag"] == items.headers["ETag"]
+        assert cached.body == b""
+        # Другие параметры страницы — другой ETag
+        with pytest.raises(AssertionError):
+            await get_catalog_items(
+                cursor=None, limit=20, if_none_match=items.headers["ETag"], db=db_session, current_user=user
+            )
+        monkeypatch.undo()
+
+        await upsert_catalog_items(db_session, [make_item("lv-2")])
+        fresh = await get_catalog_items(
+            cursor=None, limit=10, if_none_match=items.headers["ETag"], db=db_session, current_user=user
+        )
+        assert fresh.status_code == 200
+        assert fresh.headers["ETag"] != items.headers["ETag"]
+
+        sellers_etag = (await get_user_generations(if_none_match=None, db=db_session, current_user=user)).headers["ETag"]
+        assert (await get_user_generations(
+            if_none_match=sellers_etag, db=db_session, current_user=user
+        )).status_code == 304
+        await update_generation(generation_id, {"ai_keywords": "скатерть, лён"}, db=db_session, current_user=user)
+        updated = await get_user_generations(if_none_match=sellers_etag, db=db_session, current_user=user)
+        assert updated.status_code == 200
+        assert orjson.loads(updated.body)[0]["ai_keywords"] == "скатерть, лён"
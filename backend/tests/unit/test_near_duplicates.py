@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import select
+
+from models.catalog_duplicates import CatalogDuplicateBucket
+from models.catalog_items import CatalogItem
+from services.catalog_writer import sync_catalog_items, upsert_catalog_items
+from services.near_duplicates import (
+    BANDS,
+    band_keys,
+    jaccard,
+    rebuild_duplicate_groups,
+    shingles,
+    signature,
+)
+from tests.factories import make_item
+
+
+async def groups_of(db, prefix: str) -> dict[str, int]:
+    result = await db.execute(
+        select(CatalogItem.id_item, CatalogItem.id, CatalogItem.duplicate_group_id)
+        .where(CatalogItem.id_item.like(f"{prefix}%"))
+    )
+    rows = result.all()
+    ids = {item_id: id_item for id_item, item_id, _ in rows}
+    # Группа — id первого товара группы; в тесте — его id_item
+    return {id_item: ids.get(group, group) for id_item, _, group in rows}
+
+
+class TestNearDuplicates:
+    """Тесты групп почти-дубликатов по MinHash LSH"""
+
+    def test_signatures(self):
+        """Одинаковые названия дают одинаковые корзины, близкие — общую корзину, разные — нет"""
+        first = shingles("Кружка керамическая 300 мл, белая")
+        second = shingles("Кружка керамическая 300 мл, чёрная")
+        other = shingles("Гирлянда светодиодная 10 м")
+        assert 0.6 < jaccard(first, second) < 1
+        assert jaccard(first, other) < 0.1
+
+        keys = band_keys(signature(first))
+        assert len(keys) == BANDS
+        assert keys == band_keys(signature(shingles("КРУЖКА  керамическая 300 мл, белая")))
+        assert set(keys) & set(band_keys(signature(second)))
+        assert not set(keys) & set(band_keys(signature(other)))
+
+    @pytest.mark.asyncio
+    async def test_groups_on_ingestion(self, db_session):
+        """Варианты товара попадают в группу первого из них при загрузке и синхронизации"""
+        await upsert_catalog_items(db_session, [
+            make_item("nd-1", name="Ваза напольная керамическая 60 см, белая"),
+            make_item("nd-2", name="Ваза напольная керамическая 60 см, чёрная"),
+            make_item("nd-3", name="Светильник настольный на прищепке"),
+        ])
+        assert await groups_of(db_session, "nd-") == {"nd-1": "nd-1", "nd-2": "nd-1", "nd-3": None}
+
+        # Новый вариант присоединяется к группе, переименованный товар из неё выходит
+        await sync_catalog_items(db_session, [
+            make_item("nd-4", name="Ваза напольная керамическая 60 см, синяя"),
+            make_item("nd-2", name="Подставка под горячее бамбуковая"),
+        ])
+        assert await groups_of(db_session, "nd-") == {"nd-1": "nd-1", "nd-2": None, "nd-3": None, "nd-4": "nd-1"}
+
+        buckets = await db_session.execute(
+            select(CatalogDuplicateBucket.bucket)
+            .join(CatalogItem, CatalogItem.id == CatalogDuplicateBucket.catalog_item_id)
+            .where(CatalogItem.id_item == "nd-2")
+        )
+        assert len(buckets.all()) == BANDS
+
+    @pytest.mark.asyncio
+    async def test_rebuild(self, test_db, db_session):
+        """Пересчёт всего каталога восстанавливает те же группы"""
+        await upsert_catalog_items(db_session, [
+            make_item("ndr-1", name="Коврик для ванной комнаты 50х80 см, бежевый"),
+            make_item("ndr-2", name="Коврик для ванной комнаты 50х80 см, серый"),
+        ])
+        before = await groups_of(db_session, "ndr-")
+        assert before == {"ndr-1": "ndr-1", "ndr-2": "ndr-1"}
+
+        await rebuild_duplicate_groups(test_db, chunk_size=3)
+        db_session.expire_all()
+        assert await groups_of(db_session, "ndr-") == before
@@ -0,0 +1,69 @@
+import pytest
+import httpx
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from models.sima_land_payloads import SimaLandPage, SimaLandPayload
+from services.payload_cache import PayloadCache
+from services.sima_land_client import SimaLandClient
+
+
+@pytest.fixture
+def cache(test_db):
+    return PayloadCache(async_sessionmaker(test_db.kw["bind"], expire_on_commit=False))
+
+
+class TestPayloadCache:
+    """Тесты кеша сырых ответов Sima-Land"""
+
+    @pytest.mark.asyncio
+    async def test_store_and_get(self, cache):
+        """Ответ сохраняется сжатым и читается без изменений"""
+        raw = json.dumps({"items": [{"id": 1, "name": "Свеча"}]}, ensure_ascii=False).encode()
+        await cache.store(9001, raw)
+
+        assert await cache.get(9001) == raw
+        assert await cache.get(9002) is None
+
+    @pytest.mark.asyncio
+    async def test_identical_payloads_stored_once(self, cache):
+        """Одинаковые ответы разных страниц хранятся один раз"""
+        raw = b'{"items": []}'
+        digest = await cache.store(9101, raw)
+        assert await cache.store(9102, raw) == digest
+
+        async with cache.session_factory() as db:
+            count = await db.scalar(
+                select(func.count()).select_from(SimaLandPayload).where(SimaLandPayload.sha256 == digest)
+            )
+        assert count == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_fetch_respects_freshness(self, cache):
+        """Свежая страница берётся из кеша, устаревшая запрашивается заново"""
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.params["page"])
+            return httpx.Response(200, json={"items": [{"id": len(calls)}]})
+
+        client = SimaLandClient(base_url="http://test", transport=httpx.MockTransport(handler))
+        fetch = cache.cached_fetch(client, max_age=60)
+
+        assert await fetch(9201) == [{"id": 1}]
+        assert await fetch(9201) == [{"id": 1}]
+        assert len(calls) == 1
+
+        async with cache.session_factory() as db:
+            await db.execute(
+                update(SimaLandPage)
+                .where(SimaLandPage.page_number == 9201)
+                .values(fetched_at=datetime.now() - timedelta(minutes=5))
+            )
+            await db.commit()
+
+        assert await fetch(9201) == [{"id": 2}]
+        assert len(calls) == 2
+        await client.aclose()
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+from models.user_generations import UserGeneration
+from routers.sima_land.search import search_catalog_items
+from services.catalog_writer import upsert_catalog_items
+from services.search_cache import SearchResultCache, normalize_query, search_result_cache
+from services.search_index import catalog_search_index
+from tests.factories import item_id, make_item, make_user
+
+
+class TestSearchResultCache:
+    """Тесты кеша результатов поиска по каталогу"""
+
+    def test_version_and_lru(self):
+        """Запись недоступна после изменения каталога; старые записи вытесняются"""
+        cache = SearchResultCache(max_entries=2)
+        cache.put("a", 1, cache.version)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+
+        # Результат, посчитанный до изменения каталога, не сохраняется
+        version = cache.version
+        cache.invalidate()
+        cache.put("b", 2, version)
+        assert cache.get("a") is None
+        assert cache.get("b") is None
+
+        cache.put("a", 1, cache.version)
+        cache.put("b", 2, cache.version)
+        cache.get("a")
+        cache.put("c", 3, cache.version)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+
+        stats = cache.stats()
+        assert stats["hits"] == 3
+        assert stats["misses"] == 4
+        assert stats["hit_rate"] == round(3 / 7, 4)
+        assert stats["evictions"] == 1
+        assert stats["invalidations"] == 1
+
+    def test_normalize_query(self):
+        assert normalize_query("  Кружка   Белая ", "fulltext") == "кружка белая"
+        assert normalize_query(" Кр ", "substring") == "Кр"
+
+    @pytest.mark.asyncio
+    async def test_shared_between_users_and_invalidated_by_writes(self, db_session):
+        """Кеш общий для пользователей, флаг generated — свой; запись каталога сбрасывает кеш"""
+        first = await make_user(db_session, "cache-first@example.com")
+        second = await make_user(db_session, "cache-second@example.com")
+        await upsert_catalog_items(db_session, [make_item("sc-1", name="Дуршлаг металлический")])
+        colander = await item_id(db_session, "sc-1")
+        db_session.add(UserGeneration(user_id=first, catalog_item_id=colander))
+        await db_session.commit()
+
+        async def search(user_id: int, word: str) -> list[dict]:
+            response = await search_catalog_items(
+                word, mode="fulltext", cursor=None, limit=10,
+                db=db_session, current_user=SimpleNamespace(id=user_id),
+            )
+            return orjson.loads(response.body)
+
+        hits = search_result_cache.hits
+        assert [(item["id"], item["generated"]) for item in await search(first, "дуршлаг")] == [(colander, True)]
+        assert [(item["id"], item["generated"]) for item in await search(second, " Дуршлаг ")] == [(colander, False)]
+        assert search_result_cache.hits == hits + 1
+
+        version = search_result_cache.version
+        await upsert_catalog_items(db_session, [make_item("sc-2", name="Дуршлаг пластиковый")])
+        assert search_result_cache.version == version + 1
+        assert len(await search(second, "дуршлаг")) == 2
+
+    @pytest.mark.asyncio
+    async def test_keyed_by_ranking(self, test_db, db_session):
+        """Результат поиска в БД не отдаётся из кеша, когда построен индекс в памяти"""
+        user = await make_user(db_session, "cache-ranking@example.com")
+        await upsert_catalog_items(db_session, [make_item("scr-1", name="Мантоварка трёхъярусная")])
+
+        async def search() -> list[str]:
+            response = await search_catalog_items(
+                "мантоварки", mode="fulltext", cursor=None, limit=10,
+                db=db_session, current_user=SimpleNamespace(id=user),
+            )
+            return [item["id_item"] for item in orjson.loads(response.body)]
+
+        assert await search() == ["scr-1"]
+        await catalog_search_index.build(test_db)
+        try:
+            hits = search_result_cache.hits
+            assert await search() == ["scr-1"]
+            assert search_result_cache.hits == hits
+            assert await search() == ["scr-1"]
+            assert search_result_cache.hits == hits + 1
+        finally:
+            catalog_search_index.ready = False
+            catalog_search_index._clear()
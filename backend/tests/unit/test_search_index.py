@@ -0,0 +1,117 @@
+import pytest
+
+from services.catalog_events import CatalogChange, add_listener, remove_listener
+from services.catalog_search import search_catalog
+from services.catalog_writer import upsert_catalog_items
+from services.search_index import CatalogSearchIndex
+from tests.factories import make_item
+
+
+class TestCatalogSearchIndex:
+    """Тесты инвертированного индекса каталога в памяти"""
+
+    def test_search_and_ranking(self):
+        """Все слова запроса обязательны, формы слова совпадают, название весомее slug"""
+        index = CatalogSearchIndex()
+        index.upsert([
+            CatalogChange(1, "Кружка керамическая", "kruzhka"),
+            CatalogChange(2, "Набор кружек и блюдец", "nabor"),
+            CatalogChange(3, "Тарелка глубокая", "kruzhka-tarelka"),
+            CatalogChange(4, "Кружки керамические, 2 шт", "kruzhki"),
+        ])
+
+        assert index.search("кружки керамические") == [1, 4]
+        assert index.search("керамика") == []
+        assert index.search("kruzhka") == [1, 3]
+        assert index.search("неизвестное") == []
+        assert index.search("   ") == []
+
+    def test_prefixes(self):
+        """Недописанное слово и формы с основой короче слова находятся по префиксу"""
+        index = CatalogSearchIndex()
+        index.upsert([
+            CatalogChange(1, "Кружка керамическая", ""),
+            CatalogChange(2, "Стакан гранёный", ""),
+            CatalogChange(3, "Подстаканник", ""),
+            CatalogChange(4, "Чай чёрный", ""),
+            CatalogChange(5, "Чайник", ""),
+        ])
+        assert index.search("круж") == [1]
+        assert index.search("керамич") == [1]
+        assert index.search("стаканы") == [2]
+        assert sorted(index.search("чай")) == [4, 5]
+        # Термы, добавленные после построения словаря, тоже ищутся
+        index.upsert([CatalogChange(6, "Кружевная салфетка", "")])
+        assert sorted(index.search("круж")) == [1, 6]
+
+    def test_limit(self):
+        index = CatalogSearchIndex()
+        index.upsert(CatalogChange(item_id, f"Свеча {item_id}", "") for item_id in range(1, 51))
+        assert index.search("свеча", limit=5) == [1, 2, 3, 4, 5]
+
+    def test_update_and_remove(self):
+        """Изменённый товар ищется по новым словам, удалённый не ищется"""
+        index = CatalogSearchIndex()
+        index.upsert([CatalogChange(1, "Самовар электрический", ""), CatalogChange(2, "Самовар угольный", "")])
+        index.upsert([CatalogChange(1, "Чайник электрический", "")])
+
+        assert index.search("самовар") == [2]
+        assert index.search("чайник") == [1]
+        assert index.documents == 2
+
+        index.remove([2])
+        assert index.search("самовар") == []
+        report = index.memory_report()
+        assert report["documents"] == 1
+        assert report["deleted_documents"] == 2
+        assert report["total_bytes"] > 0
+
+    @pytest.mark.asyncio
+    async def test_follows_committed_writes(self, db_session):
+        """Индекс обновляется после коммита записи каталога и не видит откатанные записи"""
+        index = CatalogSearchIndex()
+        add_listener(index.on_catalog_change)
+        try:
+            await upsert_catalog_items(db_session, [make_item("six-1", name="Блендер складной")])
+            found = await index.fetch(db_session, "блендеры")
+            assert [item["id_item"] for item in found] == ["six-1"]
+
+            await upsert_catalog_items(db_session, [make_item("six-2", name="Блендер настольный")], commit=False)
+            await db_session.rollback()
+            assert len(index.search("блендер")) == 1
+        finally:
+            remove_listener(index.on_catalog_change)
+
+    @pytest.mark.asyncio
+    async def test_build_from_database(self, test_db, db_session):
+        """Индекс строится из каталога порциями"""
+        await upsert_catalog_items(db_session, [
+            make_item(f"sib-{n}", name=f"Вафельница бытовая {n}") for n in range(5)
+        ])
+        index = CatalogSearchIndex()
+        await index.build(test_db, chunk_size=2)
+
+        assert index.ready
+        found = await index.fetch(db_session, "вафельницы", limit=10)
+        assert sorted(item["id_item"] for item in found) == [f"sib-{n}" for n in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_matches_database_fulltext(self, test_db, db_session):
+        """Индекс в памяти находит те же товары, что и полнотекстовый поиск в БД"""
+        await upsert_catalog_items(db_session, [
+            make_item("sip-1", name="Кружка керамическая"),
+            make_item("sip-2", name="Свеча ароматическая"),
+            make_item("sip-3", name="Стакан гранёный"),
+            make_item("sip-4", name="Подстаканник латунный"),
+            make_item("sip-5", name="Чай чёрный листовой"),
+            make_item("sip-6", name="Чайник заварочный"),
+        ])
+        index = CatalogSearchIndex()
+        await index.build(test_db)
+
+        for query in ("керамич", "аромат", "круж", "кружки керамические", "свечи аромат",
+                      "стаканы", "чай", "латунь", "заварочные чайники"):
+            in_database = {item["id"] for item in await search_catalog(db_session, query, limit=1000)}
+            in_memory = set(index.search(query, limit=1000))
+            assert in_memory == in_database, query
+            assert in_memory, query
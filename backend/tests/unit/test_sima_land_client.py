@@ -0,0 +1,172 @@
+import asyncio
+import time
+import pytest
+import httpx
+
+from services.adaptive_limiter import AdaptiveLimiter
+from services.sima_land_client import SimaLandClient, parse_retry_after
+
+
+def make_transport(state: dict, fail_page: int | None = None) -> httpx.MockTransport:
+    """Транспорт, отдающий страницы с задержкой, обратной номеру страницы"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        try:
+            # Поздние страницы отвечают быстрее ранних, чтобы проверить порядок
+            await asyncio.sleep(0.01 / page)
+            if page == fail_page:
+                return httpx.Response(500, json={})
+            return httpx.Response(200, json={"items": [{"id": page}]})
+        finally:
+            state["active"] -= 1
+
+    return httpx.MockTransport(handler)
+
+
+class TestSimaLandClient:
+    """Тесты для клиента Sima-Land API"""
+
+    @pytest.mark.asyncio
+    async def test_iter_pages_keeps_order(self):
+        """Страницы отдаются в порядке номеров, несмотря на параллельную загрузку"""
+        state = {"active": 0, "max_active": 0}
+        client = SimaLandClient(base_url="http://test", concurrency=4, transport=make_transport(state))
+
+        pages = [page async for page in client.iter_pages(range(1, 11))]
+        await client.aclose()
+
+        assert [number for number, _ in pages] == list(range(1, 11))
+        assert [items[0]["id"] for _, items in pages] == list(range(1, 11))
+
+    @pytest.mark.asyncio
+    async def test_iter_pages_respects_concurrency(self):
+        """Одновременно выполняется не больше `concurrency` запросов"""
+        state = {"active": 0, "max_active": 0}
+        client = SimaLandClient(base_url="http://test", concurrency=3, transport=make_transport(state))
+
+        async for _ in client.iter_pages(range(1, 20)):
+            pass
+        await client.aclose()
+
+        assert 1 < state["max_active"] <= 3
+
+    @pytest.mark.asyncio
+    async def test_iter_pages_raises_http_error(self):
+        """Ошибка страницы пробрасывается вызывающему коду"""
+        state = {"active": 0, "max_active": 0}
+        client = SimaLandClient(
+            base_url="http://test", concurrency=2, transport=make_transport(state, fail_page=3), max_retries=0
+        )
+
+        received = []
+        with pytest.raises(httpx.HTTPStatusError):
+            async for number, _ in client.iter_pages(range(1, 6)):
+                received.append(number)
+        await client.aclose()
+
+        assert received == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_client_recreated_after_close(self):
+        """После aclose клиент пересоздаётся при следующем обращении"""
+        client = SimaLandClient(base_url="http://test")
+        first = client.client
+        await client.aclose()
+
+        assert client.client is not first
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_honoured(self):
+        """429 повторяется после паузы из Retry-After, лимит запросов снижается"""
+        attempts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                return httpx.Response(429, headers={"Retry-After": "0.1"}, json={})
+            return httpx.Response(200, json={"items": [{"id": 1}]})
+
+        client = SimaLandClient(base_url="http://test", concurrency=4, transport=httpx.MockTransport(handler))
+        items = await client.fetch_page(1)
+        await client.aclose()
+
+        assert items == [{"id": 1}]
+        assert attempts[1] - attempts[0] >= 0.1
+        assert client.limiter.stats.retries == 1
+        assert client.limiter.stats.throttled == 1
+        assert client.limiter.limit < 4
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self):
+        """4xx кроме 429 не повторяются"""
+        attempts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(request)
+            return httpx.Response(404, json={})
+
+        client = SimaLandClient(base_url="http://test", concurrency=8, transport=httpx.MockTransport(handler))
+        limit = client.limiter.limit
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.fetch_page(1)
+        await client.aclose()
+
+        assert len(attempts) == 1
+        assert client.limiter.stats.errors == 1
+        # Ошибка клиента не говорит о нагрузке: лимит не растёт и не падает
+        assert client.limiter.limit == limit
+        assert client.limiter.stats.throttled == 0
+
+    def test_parse_retry_after(self):
+        """Retry-After в секундах и в виде HTTP-даты"""
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+        assert parse_retry_after("мусор") is None
+        assert parse_retry_after(None) is None
+
+
+class TestAdaptiveLimiter:
+    """Тесты адаптивного лимита одновременных запросов"""
+
+    @pytest.mark.asyncio
+    async def test_grows_on_success_and_halves_on_overload(self):
+        """Лимит растёт при успешных ответах и уменьшается вдвое при перегрузке"""
+        limiter = AdaptiveLimiter(max_limit=8, initial_limit=2)
+        for _ in range(10):
+            limiter.release(await limiter.acquire())
+        assert limiter.limit > 4
+
+        before = limiter.limit
+        first = await limiter.acquire()
+        second = await limiter.acquire()
+        limiter.release(first, ok=False)
+        # Запрос, начатый до снижения, лимит повторно не уменьшает
+        limiter.release(second, ok=False)
+        assert limiter.limit == pytest.approx(before / 2)
+        assert limiter.stats.throttled == 2
+
+    @pytest.mark.asyncio
+    async def test_neutral_release_keeps_limit(self):
+        """ok=None освобождает место, не меняя лимит"""
+        limiter = AdaptiveLimiter(max_limit=8, initial_limit=2)
+        for _ in range(10):
+            limiter.release(await limiter.acquire(), ok=None)
+        assert limiter.limit == 2
+        assert limiter.snapshot()["in_flight"] == 0
+        assert limiter.stats.throttled == 0
+
+    @pytest.mark.asyncio
+    async def test_waits_for_free_slot(self):
+        """Сверх лимита запрос ждёт освобождения места"""
+        limiter = AdaptiveLimiter(max_limit=1)
+        started = await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        limiter.release(started)
+        limiter.release(await asyncio.wait_for(waiter, 1))
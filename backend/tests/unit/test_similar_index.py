@@ -0,0 +1,76 @@
+import pytest
+
+from services.catalog_events import CatalogChange
+from services.catalog_writer import upsert_catalog_items
+from services.similar_index import CatalogSimilarIndex, catalog_similar_index, char_ngrams
+from tests.factories import item_id, make_item
+
+
+def change(number: int, name: str, stuff: str = None, image_title: str = None) -> CatalogChange:
+    return CatalogChange(number, name, "", stuff=stuff, image_title=image_title)
+
+
+class TestCatalogSimilarIndex:
+    """Тесты похожих товаров по TF-IDF символьных n-грамм"""
+
+    def test_char_ngrams(self):
+        assert char_ngrams("Ёж") == {" еж": 1, "еж ": 1}
+        assert char_ngrams("ааа")["ааа"] == 1
+
+    def test_similar_ranking(self):
+        """Самые похожие — с общими словами и материалом; сам товар и удалённые версии не возвращаются"""
+        index = CatalogSimilarIndex()
+        index.upsert([
+            change(1, "Кружка керамическая белая", "керамика"),
+            change(2, "Кружка керамическая чёрная", "керамика"),
+            change(3, "Кружки керамические, набор 2 шт", "керамика"),
+            change(4, "Свеча ароматическая", "воск"),
+            change(5, "Тарелка обеденная белая", "фарфор"),
+        ])
+
+        found = index.similar(1, limit=3)
+        assert [item_id for item_id, _ in found] == [2, 3, 5]
+        assert 0 < found[-1][1] < found[0][1] <= 1
+        assert index.similar(99) == []
+
+        # Товар переименован: старая версия больше не находится
+        index.upsert([change(2, "Свеча в стакане", "воск")])
+        assert [item_id for item_id, _ in index.similar(1, limit=2)] == [3, 5]
+        assert index.similar(4, limit=1)[0][0] == 2
+
+    def test_candidates_by_rare_ngrams(self, monkeypatch):
+        """С малым бюджетом кандидаты отбираются по редким n-граммам и пересчитываются точно"""
+        index = CatalogSimilarIndex()
+        index.upsert(change(n, f"Свеча декоративная {n}", "воск") for n in range(1, 40))
+        index.upsert([change(50, "Свеча декоративная лаванда", "воск"), change(51, "Мыло лаванда", "глицерин")])
+        exact = index.similar(50, limit=5)
+
+        monkeypatch.setattr("services.similar_index.CANDIDATE_POSTINGS", 10)
+        monkeypatch.setattr("services.similar_index.CANDIDATES", 3)
+        found = index.similar(50, limit=2)
+        # «Мыло лаванда» — единственный товар с редкими n-граммами «лаванды»
+        assert found[0] == next(pair for pair in exact if pair[0] == 51)
+        assert found == sorted(found, key=lambda pair: -pair[1])
+
+    def test_same_text_not_reindexed(self):
+        """Изменение цены или остатка без изменения текста не добавляет версию товара"""
+        index = CatalogSimilarIndex()
+        index.upsert([change(1, "Ваза стеклянная", "стекло")])
+        index.upsert([CatalogChange(1, "Ваза стеклянная", "", 10, None, 500.0, "стекло")])
+        assert len(index._doc_ids) == 1
+        assert index.memory_report()["documents"] == 1
+
+    @pytest.mark.asyncio
+    async def test_build_and_fetch(self, test_db, db_session):
+        """Индекс строится из БД и отдаёт похожие товары строками каталога"""
+        await upsert_catalog_items(db_session, [
+            {**make_item("sim-1", name="Лейка садовая пластиковая"), "image_title": "Лейка 5 л"},
+            {**make_item("sim-2", name="Лейка садовая металлическая"), "image_title": "Лейка 10 л"},
+        ])
+        await catalog_similar_index.build(test_db, chunk_size=3)
+        try:
+            found = await catalog_similar_index.fetch(db_session, await item_id(db_session, "sim-1"), limit=1)
+            assert [item.id_item for item, _ in found] == ["sim-2"]
+        finally:
+            catalog_similar_index.ready = False
+            catalog_similar_index._clear()
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.catalog_events import CatalogChange
+from services.catalog_search import search_catalog, search_catalog_page
+from services.catalog_writer import upsert_catalog_items
+from services import spelling_index
+from services.spelling_index import (
+    CatalogSpellingIndex, catalog_spelling_index, deletes, edit_distance, merge_variants,
+)
+from tests.factories import make_item
+
+
+class TestSpellingIndex:
+    """Тесты исправления опечаток в запросах"""
+
+    def test_edit_distance(self):
+        assert edit_distance("кружка", "кружка", 2) == 0
+        assert edit_distance("кружька", "кружка", 2) == 1
+        # Перестановка соседних букв — одна правка
+        assert edit_distance("крукжа", "кружка", 2) == 1
+        assert edit_distance("свеча", "плеер", 2) == 3
+        assert deletes("кот", 1) == {"кот", "от", "кт", "ко"}
+
+    def test_corrects_words(self):
+        """Слова с 1–2 опечатками заменяются ближайшим, при равенстве — частым словом каталога"""
+        index = CatalogSpellingIndex()
+        index.upsert([
+            CatalogChange(1, "Свеча ароматическая", ""),
+            CatalogChange(2, "Кружка керамическая", ""),
+            CatalogChange(3, "Кружка эмалированная", ""),
+            CatalogChange(4, "Крышка стеклянная", ""),
+        ])
+        index.compact()
+
+        assert index.correct("кружька") == "кружка"
+        assert index.correct("Свеча ароматичесская 3 шт") == "свеча ароматическая 3 шт"
+        # «крушка» на одну правку и от «кружка», и от «крышка» — «кружка» чаще
+        assert index.correct("крушка") == "кружка"
+        assert index.suggest("зонт") is None
+        assert index.suggest("кр") is None
+
+    def test_new_words_before_and_after_compaction(self):
+        """Новые слова исправляются сразу и после вливания в массивы"""
+        index = CatalogSpellingIndex(delta_limit=2)
+        index.ready = True
+        index.upsert([CatalogChange(1, "Гирлянда", "")])
+        assert index.suggest("гирлядна") == "гирлянда"
+
+        index.upsert([CatalogChange(2, "Мишура новогодняя блестящая", "")])
+        assert not index._delta
+        assert index.suggest("гирлядна") == "гирлянда"
+        assert index.suggest("новогдняя") == "новогодняя"
+        assert index.memory_report()["variants"] == len(index._hashes) > 0
+
+    @pytest.mark.asyncio
+    async def test_words_added_during_build_merge(self, test_db, monkeypatch):
+        """Слово, пришедшее событием во время слияния массивов при построении, не теряется"""
+        index = CatalogSpellingIndex()
+
+        def merge_with_event(hashes, targets, delta):
+            # Событие каталога, доставленное циклом событий, пока слияние идёт в потоке
+            index.add_words(["подсвечник"])
+            return merge_variants(hashes, targets, delta)
+
+        monkeypatch.setattr(spelling_index, "merge_variants", merge_with_event)
+        await index.build(test_db, chunk_size=100)
+        assert index.ready
+        assert index.suggest("подсвечнек") == "подсвечник"
+        monkeypatch.undo()
+        index.compact()
+        assert not index._delta
+        assert index.suggest("подсвечнек") == "подсвечник"
+
+    @pytest.mark.asyncio
+    async def test_compaction_runs_off_the_event_loop(self, monkeypatch):
+        """Готовый словарь вливает дельту фоновой задачей в потоке; слова ищутся и во время слияния"""
+        index = CatalogSpellingIndex(delta_limit=2)
+        index.ready = True
+        merging = asyncio.Event()
+        release = threading.Event()
+
+        def slow_merge(hashes, targets, delta):
+            merging.set()
+            release.wait(5)
+            return merge_variants(hashes, targets, delta)
+
+        monkeypatch.setattr(spelling_index, "merge_variants", slow_merge)
+        index.add_words(["гирлянда", "мишура", "хлопушка"])
+        # add_words только запланировал слияние и вернулся, не трогая массивы
+        assert len(index._hashes) == 0 and not index._delta
+        await asyncio.wait_for(merging.wait(), 5)
+        index.add_words(["серпантин"])
+        assert index.suggest("гирлядна") == "гирлянда"
+        assert index.suggest("серпантен") == "серпантин"
+
+        release.set()
+        await asyncio.wait_for(index._compaction, 5)
+        assert len(index._hashes) > 0 and not index._merging
+        assert index.suggest("хлопушко") == "хлопушка"
+        assert index.suggest("серпантен") == "серпантин"
+
+    @pytest.mark.asyncio
+    async def test_fuzzy_search_mode(self, test_db, db_session):
+        """Режим fuzzy находит товары по запросу с опечатками"""
+        await upsert_catalog_items(db_session, [
+            make_item("fz-1", name="Салатница стеклянная"),
+            make_item("fz-2", name="Салфетница деревянная"),
+        ])
+        assert await search_catalog(db_session, "салатнеца стекляная", mode="fulltext") == []
+
+        await catalog_spelling_index.build(test_db, chunk_size=1)
+        try:
+            found = await search_catalog(db_session, "салатнеца стекляная", mode="fuzzy")
+            assert [item["id_item"] for item in found] == ["fz-1"]
+        finally:
+            catalog_spelling_index.ready = False
+            catalog_spelling_index._clear()
+
+    @pytest.mark.asyncio
+    async def test_cursor_rejected_when_ranking_changes(self, test_db, db_session):
+        """Курсор нечёткого поиска по сходству не читается ранжировкой fulltext после построения словаря"""
+        await upsert_catalog_items(db_session, [
+            make_item(f"fzc-{n}", name=f"Скатерть льняная {n}") for n in range(4)
+        ])
+        page = await search_catalog_page(db_session, "скатерть льняная", limit=2, mode="fuzzy")
+        assert page.next_cursor
+
+        await catalog_spelling_index.build(test_db, chunk_size=100)
+        try:
+            with pytest.raises(ValueError):
+                await search_catalog_page(db_session, "скатерть льняная", limit=2, mode="fuzzy",
+                                          cursor=page.next_cursor)
+            # Новая выдача листается курсором своей ранжировки
+            page = await search_catalog_page(db_session, "скатерть льняная", limit=2, mode="fuzzy")
+            page = await search_catalog_page(db_session, "скатерть льняная", limit=2, mode="fuzzy",
+                                             cursor=page.next_cursor)
+            assert len(page.items) == 2
+        finally:
+            catalog_spelling_index.ready = False
+            catalog_spelling_index._clear()
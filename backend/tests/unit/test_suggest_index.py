@@ -0,0 +1,105 @@
+import pytest
+
+from models.user_generations import UserGeneration
+from services.catalog_events import (
+    CatalogChange,
+    add_generation_listener,
+    add_listener,
+    remove_generation_listener,
+    remove_listener,
+)
+from services.catalog_writer import upsert_catalog_items
+from services.suggest_index import CatalogSuggestIndex, _merge
+from tests.factories import item_id, make_item, make_user
+
+
+def ready_index(changes: list[CatalogChange], delta_limit: int = 100) -> CatalogSuggestIndex:
+    index = CatalogSuggestIndex(delta_limit=delta_limit)
+    index.ready = True
+    index.upsert(changes)
+    return index
+
+
+class TestCatalogSuggestIndex:
+    """Тесты подсказок по началу названия товара"""
+
+    def test_prefix_and_popularity(self):
+        """Подсказки — по началу названия без учёта регистра и ё, популярные первыми"""
+        index = ready_index([
+            CatalogChange(1, "Кружка белая", "", 5),
+            CatalogChange(2, "Кружка чёрная", "", 50),
+            CatalogChange(3, "Крышка для банки", "", 500),
+            CatalogChange(4, "Тарелка", "", 1),
+            CatalogChange(5, "кружка  БЕЛАЯ", "", 1),
+        ])
+
+        assert index.suggest("кр") == [(3, "Крышка для банки"), (2, "Кружка чёрная"), (1, "Кружка белая")]
+        assert index.suggest("КРУЖКА ЧЕ") == [(2, "Кружка чёрная")]
+        assert index.suggest("кружка", limit=1) == [(2, "Кружка чёрная")]
+        assert index.suggest("белая") == []
+        assert index.suggest("  ") == []
+
+        # Число генераций важнее остатка
+        index.add_generations({1: 2, 5: 1})
+        assert index.suggest("кружка") == [(1, "Кружка белая"), (2, "Кружка чёрная")]
+
+    def test_updates_and_compaction(self):
+        """Переименованный товар подсказывается по новому названию, и до, и после пересборки"""
+        index = ready_index([CatalogChange(n, f"Свеча {n}", "", n) for n in range(1, 11)], delta_limit=5)
+        assert len(index._run) == 10
+        assert index.documents == 10
+
+        index.upsert([CatalogChange(3, "Подсвечник", "", 3)])
+        index.remove([4])
+        assert index.suggest("под") == [(3, "Подсвечник")]
+        assert [item_id for item_id, _ in index.suggest("свеча", limit=20)] == [10, 9, 8, 7, 6, 5, 2, 1]
+
+        index.upsert(CatalogChange(n, f"Свечка {n}", "", 0) for n in range(20, 30))
+        assert len(index._delta) == 0
+        assert len(index._run) == 19
+        assert index.suggest("под") == [(3, "Подсвечник")]
+        assert len(index.suggest("свеч", limit=50)) == 18
+        assert index.memory_report()["total_bytes"] > 0
+
+    def test_changes_during_compaction(self):
+        """Изменения, пришедшие во время пересборки в потоке, не теряются"""
+        index = ready_index([CatalogChange(n, f"Ваза {n}", "", 0) for n in range(1, 5)], delta_limit=3)
+        index._changed_during_compaction = set()
+        snapshot = index._snapshot()
+        index.upsert([CatalogChange(1, "Горшок", "", 0), CatalogChange(7, "Ваза новая", "", 0)])
+        index._swap(_merge(*snapshot))
+        assert index.suggest("горш") == [(1, "Горшок")]
+        assert [item_id for item_id, _ in index.suggest("ваза")] == [2, 3, 4, 7]
+
+    @pytest.mark.asyncio
+    async def test_follows_catalog_and_generations(self, test_db, db_session):
+        """Индекс строится из БД и обновляется после коммитов каталога и генераций"""
+        user = await make_user(db_session, "suggest-user@example.com")
+        await upsert_catalog_items(db_session, [
+            make_item("sug-1", name="Гирлянда светодиодная"),
+            make_item("sug-2", name="Гирлянда бумажная"),
+        ])
+        first, second = await item_id(db_session, "sug-1"), await item_id(db_session, "sug-2")
+        db_session.add(UserGeneration(user_id=user, catalog_item_id=second))
+        await db_session.commit()
+
+        index = CatalogSuggestIndex()
+        await index.build(test_db, chunk_size=1)
+        add_listener(index.on_catalog_change)
+        add_generation_listener(index.on_generations_change)
+        try:
+            assert [pair[0] for pair in index.suggest("гирлянда")] == [second, first]
+
+            db_session.add_all([UserGeneration(user_id=user, catalog_item_id=first) for _ in range(2)])
+            await db_session.commit()
+            await upsert_catalog_items(db_session, [make_item("sug-3", name="Гирлянда-штора")])
+            third = await item_id(db_session, "sug-3")
+            assert [pair[0] for pair in index.suggest("гирлянда")] == [first, second, third]
+
+            db_session.add(UserGeneration(user_id=user, catalog_item_id=third))
+            await db_session.flush()
+            await db_session.rollback()
+            assert index._generations[third] == 0
+        finally:
+            remove_listener(index.on_catalog_change)
+            remove_generation_listener(index.on_generations_change)
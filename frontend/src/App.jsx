@@ -27,6 +27,9 @@ export default function App() {
 
   // Data states
   const [mainItems, setMainItems] = useState([])
+  // Курсор следующей страницы /get_items и оценка общего числа товаров
+  const [mainCursor, setMainCursor] = useState(null)
+  const [mainTotal, setMainTotal] = useState(null)
   const [aiItems, setAiItems] = useState([])
   const [logs, setLogs] = useState([])
 
@@ -202,13 +205,29 @@ export default function App() {
 
   const fetchMainItems = async () => {
     try {
-      const data = await apiClient.getItems()
-      setMainItems(Array.isArray(data) ? data : [])
+      const page = await apiClient.getItems()
+      setMainItems(Array.isArray(page.items) ? page.items : [])
+      setMainCursor(page.nextCursor)
+      setMainTotal(page.total)
     } catch (err) {
       console.error('Error fetching main items:', err)
     }
   }
 
+  // Догружаем следующую страницу, когда пагинация доходит до конца загруженных товаров
+  useEffect(() => {
+    if (!mainCursor || currentPageAll * pageSize <= mainItems.length) return
+    let cancelled = false
+    apiClient.getItems(mainCursor)
+      .then(page => {
+        if (cancelled) return
+        setMainItems(prev => prev.concat(page.items))
+        setMainCursor(page.nextCursor)
+      })
+      .catch(err => console.error('Error fetching main items:', err))
+    return () => { cancelled = true }
+  }, [mainCursor, currentPageAll, pageSize, mainItems.length])
+
   const fetchAiItems = async () => {
     try {
       const data = await apiClient.getItemsSellers()
@@ -280,6 +299,8 @@ export default function App() {
       } else {
         const data = await apiClient.searchItems(searchWord)
         setMainItems(Array.isArray(data) ? data : [])
+        setMainCursor(null)
+        setMainTotal(null)
         setCurrentPageAll(1)
       }
     } catch (err) {
@@ -289,6 +310,28 @@ export default function App() {
     }
   }
 
+  // Событие прогресса загрузки каталога (JSON) → строка для панели прогресса
+  const formatLoadEvent = (data) => {
+    let event
+    try {
+      event = JSON.parse(data)
+    } catch {
+      return data
+    }
+    if (event.type === 'progress') {
+      const eta = event.eta_seconds != null ? `, осталось ~${Math.ceil(event.eta_seconds / 60)} мин` : ''
+      const changed = event.mode === 'sync' || event.mode === 'replay'
+        ? `новых ${event.inserted}, изменено ${event.updated}, без изменений ${event.unchanged}`
+        : `добавлено ${event.inserted}, уже было ${event.skipped}`
+      const errors = event.error_samples?.length ? ` | ⚠ ${event.error_samples[0]}` : ''
+      return `Обработано ${event.processed} из ${event.requested}: ${changed}, ошибок ${event.errors} ` +
+        `(${event.rate} тов/с${eta})${errors}`
+    }
+    // Метрики конвейера нужны для диагностики, в панели не показываются
+    if (event.type === 'metrics') return null
+    return event.message
+  }
+
   const handleLoadItems = async (e) => {
     e?.preventDefault()
     setIsUploadingApi(true)
@@ -311,22 +354,21 @@ export default function App() {
 
       const reader = response.body.getReader()
       const decoder = new TextDecoder()
+      let buffer = ''
 
       while (true) {
         const { done, value } = await reader.read()
         if (done) break
 
-        const text = decoder.decode(value)
-        const lines = text.split('\n')
+        // Событие может прийти частями — разбираем только завершённые строки
+        buffer += decoder.decode(value, { stream: true })
+        const lines = buffer.split('\n')
+        buffer = lines.pop()
 
         for (const line of lines) {
-          if (line.startsWith('data: ')) {
-            const message = line.slice(6)
-            setUploadProgress(message)
-          } else if (line.trim()) {
-            // В некоторых ответах сервер шлёт просто текст без префикса
-            setUploadProgress(line.trim())
-          }
+          if (!line.startsWith('data: ')) continue
+          const message = formatLoadEvent(line.slice(6))
+          if (message) setUploadProgress(message)
         }
       }
 
@@ -428,7 +470,8 @@ export default function App() {
     return aiItemsWithGenerating.slice(start, start + pageSize)
   }
 
-  const totalAll = mainItems.length
+  // Пока есть курсор, следующая страница доступна, даже если оценка числа занижена
+  const totalAll = mainCursor ? Math.max(mainItems.length + 1, mainTotal || 0) : mainItems.length
   const totalAi = aiItemsWithGenerating.length
   const pagesAll = Math.max(1, Math.ceil(totalAll / pageSize))
   const pagesAi = Math.max(1, Math.ceil(totalAi / pageSize))
@@ -683,7 +726,7 @@ export default function App() {
                       <input
                         type="number"
                         min="1"
-                        max="10000"
+                        max="999999"
                         value={loadCount}
                         onChange={(e) => setLoadCount(parseInt(e.target.value))}
                         className="form-input"
@@ -81,12 +81,20 @@ export const apiClient = {
   },
 
   // === ITEMS ===
-  async getItems() {
-    const response = await fetch(`${API_BASE}/sima-land/get_items`, {
+  // Страница несгенерированных товаров: курсор следующей и оценка общего числа — из заголовков
+  async getItems(cursor = null, limit = 200) {
+    const params = new URLSearchParams({ limit: String(limit) })
+    if (cursor) params.set('cursor', cursor)
+    const response = await fetch(`${API_BASE}/sima-land/get_items?${params}`, {
       headers: getHeaders(),
     })
     if (!response.ok) throw new Error('Failed to fetch items')
-    return response.json()
+    const total = response.headers.get('X-Total-Estimate')
+    return {
+      items: await response.json(),
+      nextCursor: response.headers.get('X-Next-Cursor'),
+      total: total === null ? null : parseInt(total),
+    }
   },
 
   async getItemsSellers() {